@@ -2,6 +2,7 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 import tempfile
+import shutil
 import time
 from typing import List, Dict, Any
 
@@ -11,11 +12,13 @@ load_dotenv()
 # Import our modules
 from src.document_processing.markdown_processor import MarkdownProcessor
 from src.vector_store.store_builder import VectorStoreBuilder
+from src.ingestion.incremental import IncrementalIndexer
 from src.ui.components import UIComponents, Callbacks
 from src.utils.caching import SessionState
 
 # Configuration
 VECTOR_DB_PATH = "_vector_db"
+UPLOAD_SOURCE_PREFIX = "uploads"
 
 # Set page config
 st.set_page_config(
@@ -82,18 +85,34 @@ def process_documents(uploaded_files):
     # Process the markdown files
     markdown_processor = MarkdownProcessor(folder_path=temp_dir)
     
-    with st.spinner("Loading documents..."):
-        markdown_processor.load_markdown_files()
-    
-    with st.spinner("Extracting document chunks..."):
-        document_chunks = markdown_processor.extract_chunks()
-    
-    # Build the vector store from the document chunks
-    with st.spinner("Building vector store..."):
-        vector_store_builder = VectorStoreBuilder(storage_path=VECTOR_DB_PATH)
-        vector_store_builder.build_and_save(document_chunks)
-    
-    st.success(f"Successfully processed {len(uploaded_files)} documents and created {len(document_chunks)} chunks!")
+    try:
+        with st.spinner("Loading documents..."):
+            documents = markdown_processor.load_markdown_files()
+        
+        # Key documents by upload name rather than the random temp path, so chunk IDs
+        # are stable and a re-uploaded file replaces its previous chunks
+        for doc in documents:
+            relative_path = os.path.relpath(doc.metadata.get("source", ""), temp_dir)
+            doc.metadata["source"] = f"{UPLOAD_SOURCE_PREFIX}/{relative_path.replace(os.sep, '/')}"
+        
+        # Upsert by deterministic chunk ID: unchanged files are skipped, changed files
+        # only embed their new chunks and drop the ones that disappeared
+        with st.spinner("Updating vector store..."):
+            indexer = IncrementalIndexer(folder_path=temp_dir, storage_path=VECTOR_DB_PATH)
+            try:
+                stats = indexer.index_documents(documents)
+            except ValueError as e:
+                st.error(str(e))
+                return
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    st.success(
+        f"Successfully processed {len(uploaded_files)} documents: "
+        f"{stats['added_chunks']} new chunks added, {stats['kept_chunks']} unchanged chunks kept, "
+        f"{stats['deleted_chunks']} outdated chunks removed "
+        f"({stats['unchanged_files']} files were already up to date)."
+    )
 
 def main():
     """
@@ -0,0 +1,246 @@
+from langchain.schema.document import Document
+from src.vector_store.fake_embeddings import FakeEmbeddings
+from src.vector_store.store_builder import VectorStoreBuilder, get_collection
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+# One line per upsert batch would drown the results
+logging.getLogger("src.vector_store.store_builder").setLevel(logging.WARNING)
+
+def parse_list(value, cast):
+    """Parse a comma-separated command line list"""
+    return [cast(item) for item in value.split(",") if item.strip()]
+
+def load_store_vectors(storage_path, limit, batch_size=5000):
+    """Read up to limit stored embeddings from an existing vector store"""
+    collection = get_collection(VectorStoreBuilder(storage_path=storage_path, embedder=FakeEmbeddings()).load())
+    vectors = []
+    offset = 0
+    while len(vectors) < limit:
+        page = collection.get(limit=min(batch_size, limit - len(vectors)), offset=offset, include=["embeddings"])
+        if not len(page["ids"]):
+            break
+        vectors.extend(page["embeddings"])
+        offset += len(page["ids"])
+    return np.asarray(vectors, dtype=np.float32)
+
+def synthetic_vectors(num_vectors, dim, clusters, seed):
+    """Unit vectors drawn around random centres, roughly like topic-clustered text embeddings"""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, num_vectors)] + 0.5 * rng.standard_normal((num_vectors, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def make_queries(vectors, num_queries, noise, seed):
+    """Queries near stored vectors, as real questions are near the chunks that answer them"""
+    rng = np.random.default_rng(seed + 1)
+    queries = vectors[rng.integers(0, len(vectors), num_queries)]
+    queries = queries + noise * rng.standard_normal(queries.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+def exact_neighbours(vectors, queries, k, space):
+    """Brute-force top-k row indices under the same distance Chroma uses"""
+    if space == "cosine":
+        normed = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        distances = -(queries / np.linalg.norm(queries, axis=1, keepdims=True)) @ normed.T
+    elif space == "ip":
+        distances = -(queries @ vectors.T)
+    else:
+        distances = (queries ** 2).sum(axis=1, keepdims=True) - 2 * queries @ vectors.T + (vectors ** 2).sum(axis=1)
+    top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    order = np.take_along_axis(distances, top, axis=1).argsort(axis=1)
+    return np.take_along_axis(top, order, axis=1)
+
+def directory_mb(path):
+    """Total size of the files under path in MB"""
+    total = sum(
+        os.path.getsize(os.path.join(folder, name))
+        for folder, _, names in os.walk(path) for name in names
+    )
+    return round(total / (1024 * 1024), 2)
+
+def set_search_ef(collection, search_ef):
+    """
+    Change hnsw:search_ef of a built collection in place.
+    
+    search_ef only affects queries, but Chroma reads it from the segment metadata
+    when it loads the index, and collection.modify() changes neither. The loaded
+    hnswlib index is therefore updated directly, so one build serves every
+    search_ef value. This relies on chromadb internals.
+    
+    Returns:
+        False if this chromadb version does not expose the loaded index, in which
+        case the collection has to be rebuilt for the new search_ef
+    """
+    try:
+        from chromadb.segment import VectorReader
+        segment = collection._client._manager.get_segment(collection.id, VectorReader)
+        segment._params.search_ef = search_ef
+        segment._index.set_ef(search_ef)
+    except (ImportError, AttributeError, KeyError, TypeError) as e:
+        logger.debug(f"Cannot change search_ef in place: {e!r}")
+        return False
+    return True
+
+def build_collection(vectors, hnsw_config, batch_size, store_dir):
+    """Build a collection with one set of HNSW build settings and time it"""
+    builder = VectorStoreBuilder(
+        storage_path=store_dir, embedder=FakeEmbeddings(size=vectors.shape[1]),
+        backend="chroma", hnsw_config=hnsw_config
+    )
+    builder.load()
+    collection = get_collection(builder.vector_store)
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        rows = range(offset, min(offset + batch_size, len(vectors)))
+        builder.upsert_embeddings(
+            [Document(page_content=f"vector {row}", metadata={"row": row}) for row in rows],
+            vectors[offset:offset + len(rows)].tolist(),
+            [str(row) for row in rows]
+        )
+    return collection, time.perf_counter() - start
+
+def measure_queries(collection, queries, truth, k):
+    """Measure recall against exact search and per-query latency"""
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        response = collection.query(query_embeddings=[query.tolist()], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(id_) for id_ in response["ids"][0]} & set(expected.tolist()))
+
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {
+        f"recall@{k}": round(hits / (k * len(queries)), 4),
+        "p50_ms": round(float(p50), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+def main():
+    """Sweep Chroma HNSW settings and report recall against exact search, latency and build time"""
+    parser = argparse.ArgumentParser(description="Measure Chroma HNSW recall/latency trade-offs")
+    parser.add_argument("--store", default=None,
+                      help="Take vectors from this vector store instead of generating them")
+    parser.add_argument("--num-vectors", type=int, default=20000,
+                      help="Number of vectors to index (limit when reading from --store)")
+    parser.add_argument("--dim", type=int, default=1536,
+                      help="Dimension of generated vectors")
+    parser.add_argument("--clusters", type=int, default=100,
+                      help="Topic clusters in generated vectors")
+    parser.add_argument("--queries", type=int, default=200,
+                      help="Number of measured queries")
+    parser.add_argument("--query-noise", type=float, default=0.05,
+                      help="Noise added to the stored vectors that queries are drawn from")
+    parser.add_argument("--k", type=int, default=10,
+                      help="Neighbours per query (recall@k)")
+    parser.add_argument("--space", default="cosine",
+                      help="Comma-separated distance spaces (l2, cosine, ip)")
+    parser.add_argument("--m", default="8,16,32",
+                      help="Comma-separated hnsw:M values")
+    parser.add_argument("--construction-ef", default="100,200",
+                      help="Comma-separated hnsw:construction_ef values")
+    parser.add_argument("--search-ef", default="10,50,100,200",
+                      help="Comma-separated hnsw:search_ef values")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                      help="Vectors per upsert while building")
+    parser.add_argument("--seed", type=int, default=0,
+                      help="Random seed for generated vectors and queries")
+    parser.add_argument("--output", default="hnsw_sweep.json",
+                      help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    if args.store:
+        vectors = load_store_vectors(args.store, args.num_vectors)
+        if not len(vectors):
+            logger.error(f"No vectors found in {args.store}")
+            sys.exit(1)
+        logger.info(f"Loaded {len(vectors)} vectors of dimension {vectors.shape[1]} from {args.store}")
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dim, args.clusters, args.seed)
+    queries = make_queries(vectors, args.queries, args.query_noise, args.seed)
+    k = min(args.k, len(vectors))
+
+    # search_ef is a query-time setting, so each build is reused for all its values
+    builds = list(itertools.product(
+        parse_list(args.space, str), parse_list(args.m, int), parse_list(args.construction_ef, int)
+    ))
+    search_efs = parse_list(args.search_ef, int)
+    truths = {space: exact_neighbours(vectors, queries, k, space) for space in {setting[0] for setting in builds}}
+
+    work_dir = tempfile.mkdtemp(prefix="hnsw_sweep_")
+    results = []
+    rebuild_warned = False
+    try:
+        for number, (space, m, construction_ef) in enumerate(builds):
+            store_dir = os.path.join(work_dir, f"store_{number}")
+            store_dirs = [store_dir]
+            collection, build_seconds = build_collection(
+                vectors, {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_efs[0]},
+                args.batch_size, store_dir
+            )
+            index_mb = directory_mb(store_dir)
+            collection_ef = search_efs[0]
+            for search_ef in search_efs:
+                if search_ef != collection_ef and not set_search_ef(collection, search_ef):
+                    if not rebuild_warned:
+                        logger.warning("This chromadb version cannot change search_ef in place; "
+                                       "rebuilding the collection for each search_ef value")
+                        rebuild_warned = True
+                    store_dirs.append(os.path.join(work_dir, f"store_{number}_ef{search_ef}"))
+                    collection, _ = build_collection(
+                        vectors, {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef},
+                        args.batch_size, store_dirs[-1]
+                    )
+                collection_ef = search_ef
+                result = {
+                    "hnsw": {"space": space, "m": m, "construction_ef": construction_ef, "search_ef": search_ef},
+                    "build_seconds": round(build_seconds, 3),
+                    **measure_queries(collection, queries, truths[space], k),
+                    "index_mb": index_mb,
+                }
+                results.append(result)
+                logger.info(
+                    f"space={space} M={m} construction_ef={construction_ef} search_ef={search_ef}: "
+                    f"recall@{k} {result[f'recall@{k}']:.3f}, p50 {result['p50_ms']:.2f} ms, "
+                    f"p99 {result['p99_ms']:.2f} ms, build {build_seconds:.1f} s"
+                )
+            # Chroma keeps files open per path, so each build gets its own directory
+            for path in store_dirs:
+                shutil.rmtree(path, ignore_errors=True)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "num_vectors": len(vectors),
+        "dim": int(vectors.shape[1]),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
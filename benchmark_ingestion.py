@@ -0,0 +1,150 @@
+from src.document_processing.markdown_processor import MarkdownProcessor
+from src.document_processing.synthetic_corpus import generate_corpus
+from src.vector_store.fake_embeddings import FakeEmbeddings
+from src.vector_store.store_builder import VectorStoreBuilder
+from src.utils.profiling import StageProfiler
+from src.ingestion.manifest import assign_chunk_ids
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+def merge_profiles(profiles):
+    """Combine per-batch profiles into one stage result"""
+    peaks = [p.peak_rss for p in profiles if p.peak_rss is not None]
+    starts = [p.start_rss for p in profiles if p.start_rss is not None]
+    mb = lambda value: round(value / (1024 * 1024), 2)
+    return {
+        "seconds": round(sum(p.seconds for p in profiles), 4),
+        "start_rss_mb": mb(starts[0]) if starts else None,
+        "peak_rss_mb": mb(max(peaks)) if peaks else None,
+    }
+
+def run_benchmark(num_docs, args, work_dir):
+    """Generate a corpus of num_docs files and time every ingestion stage"""
+    corpus_dir = os.path.join(work_dir, f"corpus_{num_docs}")
+    store_dir = os.path.join(work_dir, f"store_{num_docs}")
+
+    logger.info(f"Generating synthetic corpus with {num_docs} documents...")
+    paths = generate_corpus(
+        corpus_dir, num_docs,
+        header_depth=args.header_depth,
+        sections_per_level=args.sections_per_level,
+        section_words=args.section_words,
+        seed=args.seed
+    )
+    corpus_bytes = sum(os.path.getsize(path) for path in paths)
+
+    processor = MarkdownProcessor(folder_path=corpus_dir, workers=args.workers)
+    stages = {}
+
+    # Silence the per-document progress prints so they do not skew the timings
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        with StageProfiler("load_markdown_files") as profile:
+            processor.load_markdown_files()
+        stages["load_markdown_files"] = profile.as_dict()
+
+        with StageProfiler("extract_chunks") as profile:
+            chunks = processor.extract_chunks()
+        stages["extract_chunks"] = profile.as_dict()
+
+    processor.loaded_docs = []
+    ids = assign_chunk_ids(chunks)
+    embedder = FakeEmbeddings(size=args.dim)
+    builder = VectorStoreBuilder(storage_path=store_dir, embedder=embedder)
+
+    embed_profiles, upsert_profiles = [], []
+    for start in range(0, len(chunks), args.batch_size):
+        batch = chunks[start:start + args.batch_size]
+        with StageProfiler("embedding") as profile:
+            vectors = embedder.embed_documents([chunk.page_content for chunk in batch])
+        embed_profiles.append(profile)
+
+        if not args.skip_upsert:
+            with StageProfiler("chroma_upsert") as profile:
+                builder.upsert_embeddings(batch, vectors, ids[start:start + args.batch_size])
+            upsert_profiles.append(profile)
+
+    stages["embedding"] = merge_profiles(embed_profiles)
+    if upsert_profiles:
+        stages["chroma_upsert"] = merge_profiles(upsert_profiles)
+
+    return {
+        "num_docs": num_docs,
+        "num_chunks": len(chunks),
+        "corpus_mb": round(corpus_bytes / (1024 * 1024), 2),
+        "total_seconds": round(sum(stage["seconds"] for stage in stages.values()), 4),
+        "stages": stages,
+    }
+
+def main():
+    """Benchmark ingestion on synthetic corpora of increasing size"""
+    parser = argparse.ArgumentParser(description="Benchmark markdown ingestion with a local fake embedder")
+    parser.add_argument("--sizes", default="10,100,1000",
+                      help="Comma-separated corpus sizes (number of documents)")
+    parser.add_argument("--header-depth", type=int, default=3,
+                      help="Deepest markdown header level in generated documents (1-4)")
+    parser.add_argument("--sections-per-level", type=int, default=2,
+                      help="Sub-sections generated under each header")
+    parser.add_argument("--section-words", type=int, default=80,
+                      help="Approximate words of prose per section")
+    parser.add_argument("--dim", type=int, default=1536,
+                      help="Dimension of the fake embeddings")
+    parser.add_argument("--batch-size", type=int, default=512,
+                      help="Chunks per embedding/upsert batch")
+    parser.add_argument("--workers", type=int, default=1,
+                      help="Processes used by MarkdownProcessor")
+    parser.add_argument("--seed", type=int, default=0,
+                      help="Random seed for the corpus generator")
+    parser.add_argument("--skip-upsert", action="store_true",
+                      help="Do not write to Chroma (measure loading, splitting and embedding only)")
+    parser.add_argument("--output", default="bench_output.json",
+                      help="Path of the JSON results file")
+    parser.add_argument("--keep", action="store_true",
+                      help="Keep the generated corpora and stores")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    work_dir = tempfile.mkdtemp(prefix="ingestion_bench_")
+    results = []
+    try:
+        for num_docs in sizes:
+            result = run_benchmark(num_docs, args, work_dir)
+            results.append(result)
+            logger.info(
+                f"{num_docs} docs / {result['num_chunks']} chunks: "
+                + ", ".join(f"{name} {stage['seconds']:.2f}s" for name, stage in result["stages"].items())
+            )
+    finally:
+        if args.keep:
+            logger.info(f"Benchmark data kept in {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "keep")},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
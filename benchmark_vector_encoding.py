@@ -0,0 +1,148 @@
+from langchain.schema.document import Document
+from src.vector_store.fake_embeddings import FakeEmbeddings
+from src.vector_store.numpy_store import VECTOR_ENCODINGS
+from src.vector_store.store_builder import VectorStoreBuilder
+from benchmark_hnsw import directory_mb, exact_neighbours, load_store_vectors, make_queries, parse_list, synthetic_vectors
+import argparse
+import json
+import logging
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import os
+
+import numpy as np
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+# One line per upsert batch would drown the results
+logging.getLogger("src.vector_store.store_builder").setLevel(logging.WARNING)
+
+def run_encoding(vectors, queries, truth, k, encoding, rerank_factor, batch_size, store_dir):
+    """Build a numpy index with one vector encoding and measure memory, recall and latency"""
+    builder = VectorStoreBuilder(
+        storage_path=store_dir, embedder=FakeEmbeddings(size=vectors.shape[1]),
+        backend="numpy", vector_encoding=encoding
+    )
+    store = builder.load()
+    store.rerank_factor = rerank_factor
+
+    start = time.perf_counter()
+    for offset in range(0, len(vectors), batch_size):
+        rows = range(offset, min(offset + batch_size, len(vectors)))
+        builder.upsert_embeddings(
+            [Document(page_content=f"vector {row}", metadata={"row": row}) for row in rows],
+            vectors[offset:offset + len(rows)].tolist(),
+            [str(row) for row in rows]
+        )
+    build_seconds = time.perf_counter() - start
+
+    latencies = []
+    hits = 0
+    for query, expected in zip(queries, truth):
+        start = time.perf_counter()
+        ranked = store.search_rows([query.tolist()], k)[0]
+        latencies.append(time.perf_counter() - start)
+        hits += len({int(id_) for id_, _ in ranked} & set(expected.tolist()))
+
+    stats = store.memory_stats()
+    p50, p99 = np.percentile(np.asarray(latencies) * 1000, [50, 99])
+    return {
+        "encoding": encoding,
+        "rerank_factor": rerank_factor if encoding != "float32" else None,
+        "build_seconds": round(build_seconds, 3),
+        f"recall@{k}": round(hits / (k * len(queries)), 4),
+        "p50_ms": round(float(p50), 3),
+        "p99_ms": round(float(p99), 3),
+        "full_mb": round(stats["full_bytes"] / (1024 * 1024), 2),
+        "scanned_mb": round(stats["scanned_bytes"] / (1024 * 1024), 2),
+        "compression_ratio": stats["compression_ratio"],
+        "index_mb": directory_mb(store_dir),
+    }
+
+def main():
+    """Compare numpy index vector encodings on memory, recall against exact search and latency"""
+    parser = argparse.ArgumentParser(description="Measure float16 / product quantization memory and recall trade-offs")
+    parser.add_argument("--store", default=None,
+                      help="Take vectors from this vector store instead of generating them")
+    parser.add_argument("--num-vectors", type=int, default=20000,
+                      help="Number of vectors to index (limit when reading from --store)")
+    parser.add_argument("--dim", type=int, default=1536,
+                      help="Dimension of generated vectors")
+    parser.add_argument("--clusters", type=int, default=100,
+                      help="Topic clusters in generated vectors")
+    parser.add_argument("--queries", type=int, default=200,
+                      help="Number of measured queries")
+    parser.add_argument("--query-noise", type=float, default=0.05,
+                      help="Noise added to the stored vectors that queries are drawn from")
+    parser.add_argument("--k", type=int, default=10,
+                      help="Neighbours per query (recall@k)")
+    parser.add_argument("--encodings", default=",".join(VECTOR_ENCODINGS),
+                      help="Comma-separated vector encodings (float32, float16, pq)")
+    parser.add_argument("--rerank-factor", default="1,10",
+                      help="Comma-separated shortlist sizes per result for the compressed encodings")
+    parser.add_argument("--batch-size", type=int, default=1000,
+                      help="Vectors per upsert while building")
+    parser.add_argument("--seed", type=int, default=0,
+                      help="Random seed for generated vectors and queries")
+    parser.add_argument("--output", default="vector_encoding_benchmark.json",
+                      help="Path of the JSON results file")
+    args = parser.parse_args()
+
+    if args.store:
+        vectors = load_store_vectors(args.store, args.num_vectors)
+        if not len(vectors):
+            logger.error(f"No vectors found in {args.store}")
+            sys.exit(1)
+        logger.info(f"Loaded {len(vectors)} vectors of dimension {vectors.shape[1]} from {args.store}")
+    else:
+        vectors = synthetic_vectors(args.num_vectors, args.dim, args.clusters, args.seed)
+    queries = make_queries(vectors, args.queries, args.query_noise, args.seed)
+    k = min(args.k, len(vectors))
+    truth = exact_neighbours(vectors, queries, k, "cosine")
+
+    settings = []
+    for encoding in parse_list(args.encodings, str):
+        if encoding not in VECTOR_ENCODINGS:
+            parser.error(f"Unknown encoding '{encoding}', expected one of {VECTOR_ENCODINGS}")
+        factors = [1] if encoding == "float32" else parse_list(args.rerank_factor, int)
+        settings.extend((encoding, factor) for factor in factors)
+
+    work_dir = tempfile.mkdtemp(prefix="vector_encoding_")
+    results = []
+    try:
+        for number, (encoding, factor) in enumerate(settings):
+            store_dir = os.path.join(work_dir, f"store_{number}")
+            result = run_encoding(vectors, queries, truth, k, encoding, factor, args.batch_size, store_dir)
+            shutil.rmtree(store_dir, ignore_errors=True)
+            results.append(result)
+            logger.info(
+                f"{encoding} (rerank x{factor}): recall@{k} {result[f'recall@{k}']:.3f}, "
+                f"p50 {result['p50_ms']:.2f} ms, p99 {result['p99_ms']:.2f} ms, "
+                f"scanned {result['scanned_mb']:.1f} MB of {result['full_mb']:.1f} MB"
+            )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "num_vectors": len(vectors),
+        "dim": int(vectors.shape[1]),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
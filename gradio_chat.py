@@ -6,7 +6,7 @@ from typing import List, Dict, Any
 from gradio.themes import Size
 # Import our modules
 from src.vector_store.store_builder import VectorStoreBuilder
-from src.tools.search_tool import VectorStoreSearchTool, AskForClarificationsTool
+from src.tools.search_tool import VectorStoreSearchTool, MultiQueryVectorStoreSearchTool, AskForClarificationsTool
 from src.agents.crew import AgentCrewBuilder
 
 # Load environment variables
@@ -17,19 +17,23 @@ VECTOR_DB_PATH = "_vector_db"
 
 # Create singleton instances of tools and crew
 search_tool = None
+multi_search_tool = None
 clarification_tool = None
 agent_crew = None
 vector_store = None
 
 def initialize_tools_and_crew():
     """Initialize the tools and crew once at startup."""
-    global search_tool, clarification_tool, agent_crew
+    global search_tool, multi_search_tool, clarification_tool, agent_crew
     
     # Only initialize if not already done
     if search_tool is None:
         print("Initializing search tool and vector store...")
         search_tool = VectorStoreSearchTool(storage_path=VECTOR_DB_PATH)
     
+    if multi_search_tool is None:
+        multi_search_tool = MultiQueryVectorStoreSearchTool(storage_path=VECTOR_DB_PATH)
+    
     if clarification_tool is None:
         print("Initializing clarification tool...")
         clarification_tool = AskForClarificationsTool()
@@ -38,13 +42,13 @@ def initialize_tools_and_crew():
     if agent_crew is None:
         print("Building agent crew...")
         # Create the agent crew
-        crew_builder = AgentCrewBuilder(tools=[search_tool, clarification_tool])
+        crew_builder = AgentCrewBuilder(tools=[search_tool, multi_search_tool, clarification_tool])
         
         # Build the analyst task with template
         analyst_task_template = """# Follow these step-by-step instructions:
 1. Understand the user request: Read and analyze thoroughly, taking conversation history into account.
 2. [OPTIONAL] Only ask for clarifications if the request is unclear or ambiguous.
-3. Use the search tool repeatedly as needed to collect relevant information.
+3. Use the search tools as needed to collect relevant information. When several pieces of information are needed, look them up together with the multi-query search tool.
 4. Perform any necessary calculations or analyses.
 5. Synthesize gathered data into a comprehensive response.
 6. Provide a detailed answer supported by references.
@@ -59,6 +63,7 @@ def initialize_tools_and_crew():
 - You MUST only use information found via the search tool.
 - Do NOT rely on external knowledge.
 - When using the search tool, only provide the query parameter.
+- When using the multi-query search tool, only provide the queries parameter as a list of strings.
 """
         
         # Build the crew
@@ -244,8 +249,9 @@ def process_message(message, history):
 
 def reset_tools_and_crew():
     """Reset the tools and crew for a fresh start."""
-    global search_tool, clarification_tool, agent_crew
+    global search_tool, multi_search_tool, clarification_tool, agent_crew
     search_tool = None
+    multi_search_tool = None
     clarification_tool = None
     agent_crew = None
     
@@ -341,8 +347,9 @@ demo = gr.ChatInterface(
 def handle_flag(flag_value):
     if flag_value == "Restart System":
         # Reset tools and crew
-        global search_tool, clarification_tool, agent_crew
+        global search_tool, multi_search_tool, clarification_tool, agent_crew
         search_tool = None
+        multi_search_tool = None
         clarification_tool = None
         agent_crew = None
         initialize_tools_and_crew()
@@ -8,7 +8,7 @@ load_dotenv()
 
 # Import our modules
 from src.vector_store.store_builder import VectorStoreBuilder
-from src.tools.search_tool import VectorStoreSearchTool, AskForClarificationsTool
+from src.tools.search_tool import VectorStoreSearchTool, MultiQueryVectorStoreSearchTool, AskForClarificationsTool
 from src.agents.crew import AgentCrewBuilder
 from src.ui.components import UIComponents, Callbacks
 from src.utils.caching import SessionState
@@ -53,16 +53,17 @@ def get_agent_crew(vector_store):
     """
     # Create search tool with the vector store
     search_tool = VectorStoreSearchTool(storage_path=VECTOR_DB_PATH)
+    multi_search_tool = MultiQueryVectorStoreSearchTool(storage_path=VECTOR_DB_PATH)
     clarification_tool = AskForClarificationsTool()
     
     # Create the agent crew
-    crew_builder = AgentCrewBuilder(tools=[search_tool, clarification_tool])
+    crew_builder = AgentCrewBuilder(tools=[search_tool, multi_search_tool, clarification_tool])
     
     # Build the analyst task with template
     analyst_task_template = """# Follow these step-by-step instructions:
 1. Understand the user request: Read and analyze thoroughly, taking conversation history into account.
 2. [OPTIONAL] Only ask for clarifications if the request is unclear or ambiguous.
-3. Use the search tool repeatedly as needed to collect relevant information.
+3. Use the search tools as needed to collect relevant information. When several pieces of information are needed, look them up together with the multi-query search tool.
 4. Perform any necessary calculations or analyses.
 5. Synthesize gathered data into a comprehensive response.
 6. Provide a detailed answer supported by references.
@@ -2,7 +2,8 @@ import streamlit as st
 import os
 from dotenv import load_dotenv
 import logging
-from process_crew import analyst_crew
+from process_crew import analyst_crew, vector_db_path
+from src.vector_store.registry import get_shared_store
 import time
 
 # Load environment variables
@@ -36,6 +37,9 @@ def run_query(query, conversation_history=""):
         with st.spinner("Processing your query... This may take a few moments."):
             start_time = time.time()
             
+            # Open the shared store before the agents start searching with it
+            get_shared_store(vector_db_path)
+            
             # Run the crew with the inputs
             result = analyst_crew.run(inputs=inputs)
             
@@ -5,7 +5,8 @@ import logging
 import time
 import os
 import sys
-from src.vector_store.store_builder import VectorStoreBuilder
+from src.vector_store.registry import get_shared_section_store, lease_shared_store
+from src.tools.query_filters import parse_query_filters
 
 # Load environment variables from .env file
 load_dotenv()
@@ -39,15 +40,22 @@ def search_documents(query: str) -> str:
     """
     try:
         logger.info(f"Searching for: {query}")
-        store = VectorStoreBuilder(storage_path=vector_db_path)
-        results = store.similarity_search(query, k=5)
+        # Opened once per process; later calls reuse the store and HTTP connections
+        with lease_shared_store(vector_db_path) as store:
+            # Section names in the query are matched against the header titles of the index
+            where = parse_query_filters(query, get_shared_section_store(store.storage_path).titles())
+            # Embedded once; the vector is also shared with the search tool's cache
+            embedding = store.embed_query(query)
+            results = store.hybrid_search(query, k=5, where=where, embedding=embedding) if where else []
+            if not results:
+                results = store.hybrid_search(query, k=5, embedding=embedding)
         
         if not results:
             return "No relevant information found."
         
         output = "Here is the relevant information I found:\n\n"
         for i, doc in enumerate(results, 1):
-            source = doc.metadata.get('source_filename', 'Unknown source')
+            source = doc.metadata.get('source_filenames') or doc.metadata.get('source_filename', 'Unknown source')
             output += f"--- Result {i} (from {source}) ---\n"
             output += f"{doc.page_content}\n\n"
         
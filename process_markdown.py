@@ -1,6 +1,15 @@
 from src.document_processing.markdown_processor import MarkdownProcessor
 from src.vector_store.store_builder import VectorStoreBuilder
+from src.vector_store.section_store import SectionStore
+from src.vector_store.generations import (
+    collect_generations, discard_generation, new_generation, publish_generation
+)
+from src.ingestion.incremental import IncrementalIndexer
+from src.ingestion.pipeline import StreamingIngestionPipeline
+from src.ingestion.embedding_scheduler import EmbeddingScheduler, OpenAIEmbeddingEndpoint
+from src.ingestion.manifest import IndexManifest, assign_chunk_ids
 from langchain_community.document_loaders import TextLoader
+import argparse
 import logging
 import time
 import os
@@ -25,7 +34,96 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def create_embedding_scheduler(concurrency, embedder):
+    """Create a concurrent embedding scheduler using rate limits from the environment"""
+    return EmbeddingScheduler(
+        endpoint=OpenAIEmbeddingEndpoint(model=getattr(embedder, "model", "text-embedding-ada-002")),
+        max_concurrency=concurrency,
+        max_batch_tokens=int(os.getenv("EMBEDDING_BATCH_TOKENS", "8000")),
+        requests_per_minute=float(os.getenv("EMBEDDING_RPM", "3000")),
+        tokens_per_minute=float(os.getenv("EMBEDDING_TPM", "1000000")),
+        cache=getattr(embedder, "cache", None)
+    )
+
+def run_incremental(folder_path, workers, processor_options):
+    """Re-embed only new or changed chunks and drop chunks of removed files"""
+    try:
+        logger.info("Running incremental sync against the index manifest...")
+        indexer = IncrementalIndexer(
+            folder_path=folder_path,
+            storage_path=vector_db_path,
+            workers=workers,
+            processor_options=processor_options
+        )
+        stats = indexer.sync()
+        logger.info(
+            f"Files: {stats['changed_files']} changed, {stats['unchanged_files']} unchanged, "
+            f"{stats['removed_files']} removed. Chunks: {stats['added_chunks']} embedded, "
+            f"{stats['kept_chunks']} kept, {stats['deleted_chunks']} deleted"
+        )
+    except Exception as e:
+        logger.error(f"Error during incremental sync: {str(e)}")
+        sys.exit(1)
+
+def run_streaming(folder_path, workers, batch_size, processor_options):
+    """Stream files through load -> split -> embed -> upsert with bounded memory"""
+    try:
+        logger.info(f"Running streaming ingestion with batches of {batch_size} chunks...")
+        vector_store_builder = VectorStoreBuilder(storage_path=vector_db_path)
+        if not processor_options:
+            # Keep splitting files the way the existing index was chunked
+            manifest = IndexManifest(vector_store_builder.storage_path).load()
+            processor_options = manifest.options.get("chunking", {})
+        pipeline = StreamingIngestionPipeline(
+            processor=MarkdownProcessor(folder_path=folder_path, workers=workers, **processor_options),
+            vector_store_builder=vector_store_builder,
+            batch_size=batch_size
+        )
+        stats = pipeline.run()
+        logger.info(
+            f"Files: {stats['changed_files']} changed, {stats['unchanged_files']} unchanged, "
+            f"{stats['removed_files']} removed. Chunks: {stats['added_chunks']} embedded, "
+            f"{stats['kept_chunks']} kept, {stats['deleted_chunks']} deleted"
+        )
+    except Exception as e:
+        logger.error(f"Error during streaming ingestion: {str(e)}")
+        sys.exit(1)
+
 def main():
+    parser = argparse.ArgumentParser(description="Process markdown files into the vector store")
+    parser.add_argument("--incremental", action="store_true",
+                      help="Only embed new or changed chunks using the index manifest")
+    parser.add_argument("--workers", type=int, default=1,
+                      help="Number of processes used to load and split files (1 = serial)")
+    parser.add_argument("--streaming", action="store_true",
+                      help="Stream chunks to the store in bounded batches, checkpointing progress")
+    parser.add_argument("--batch-size", type=int, default=256,
+                      help="Chunks per embedding/upsert batch in streaming mode")
+    parser.add_argument("--embed-concurrency", type=int, default=0,
+                      help="Embedding requests kept in flight during a full build (0 = LangChain default)")
+    parser.add_argument("--dedup", action="store_true",
+                      help="Store near-duplicate chunks once (MinHash/LSH) during a full build")
+    parser.add_argument("--dedup-threshold", type=float, default=0.9,
+                      help="Estimated Jaccard similarity at which chunks count as near-duplicates")
+    parser.add_argument("--chunker", choices=["recursive", "token"], default=None,
+                      help="Chunking strategy: header + 250-character splitter, or single-pass token-aware chunker "
+                           "(default: recursive for full builds, the index's chunker for updates)")
+    parser.add_argument("--max-chunk-tokens", type=int, default=256,
+                      help="Maximum tiktoken tokens per chunk with --chunker token")
+    parser.add_argument("--shard-by", choices=["source", "period", "hash"], default=None,
+                      help="Split a full build into shards built and searched in parallel; source makes one shard "
+                           "per file, so prefer hash for many files (default: SHARD_STRATEGY)")
+    parser.add_argument("--shards", type=int, default=None,
+                      help="Number of shards with --shard-by hash (default: SHARD_COUNT or 8)")
+    args = parser.parse_args()
+    if args.dedup and (args.incremental or args.streaming):
+        # Updates file by file cannot keep one copy of chunks shared across files
+        parser.error("--dedup is only supported for full builds, not with --incremental or --streaming")
+    # Without --chunker, updates follow the chunking recorded in the index manifest
+    processor_options = {}
+    if args.chunker:
+        processor_options = {"chunker": args.chunker, "max_chunk_tokens": args.max_chunk_tokens}
+    
     try:
         # Set UTF-8 encoding for TextLoader to handle special characters
         TextLoader.autodetect_encoding = True
@@ -33,8 +131,23 @@ def main():
         start_time = time.time()
         logger.info("Starting markdown processing pipeline")
         
+        if args.incremental or args.streaming:
+            if args.streaming:
+                run_streaming("./markdown_files", args.workers, args.batch_size, processor_options)
+            else:
+                run_incremental("./markdown_files", args.workers, processor_options)
+            elapsed_time = time.time() - start_time
+            logger.info(f"Processing completed in {elapsed_time:.2f} seconds")
+            return
+        
         # Run the processing
-        markdown_processor = MarkdownProcessor(folder_path="./markdown_files")
+        markdown_processor = MarkdownProcessor(
+            folder_path="./markdown_files",
+            workers=args.workers,
+            deduplicate=args.dedup,
+            dedup_threshold=args.dedup_threshold,
+            **processor_options
+        )
         
         try:
             logger.info("Loading markdown files...")
@@ -54,16 +167,42 @@ def main():
             logger.error(f"Error extracting chunks: {str(e)}")
             sys.exit(1)
         
+        # Build into a new index generation; readers keep using the live one until
+        # it is published, so a rebuild never serves half-populated results
+        generation_path = new_generation(vector_db_path)
         try:
             # Build and save vector store
-            logger.info(f"Building vector store with {len(chunks)} chunks...")
-            vector_store = VectorStoreBuilder(storage_path=vector_db_path)
-            vector_store.build_and_save(chunks)
-            logger.info(f"Successfully built and saved vector store to {vector_db_path}")
+            logger.info(f"Building vector store with {len(chunks)} chunks in {generation_path}...")
+            vector_store = VectorStoreBuilder(
+                storage_path=generation_path, shard_strategy=args.shard_by, num_shards=args.shards
+            )
+            chunk_ids = assign_chunk_ids(chunks)
+            scheduler = None
+            if args.embed_concurrency > 0:
+                scheduler = create_embedding_scheduler(args.embed_concurrency, vector_store.embedder)
+            vector_store.build_and_save(chunks, ids=chunk_ids, scheduler=scheduler)
+            
+            # Record what was written so later runs can use --incremental
+            manifest = IndexManifest(generation_path)
+            manifest.options["deduplicate"] = args.dedup
+            manifest.check_chunking(processor_options)
+            manifest.record_documents(markdown_processor.loaded_docs, chunks, chunk_ids)
+            manifest.save()
+            # Full sections let search return the context around matched chunks
+            SectionStore(generation_path).replace_documents(
+                markdown_processor.parent_sections(markdown_processor.loaded_docs)
+            )
+            
+            publish_generation(vector_db_path, generation_path)
+            logger.info(f"Successfully built and saved vector store to {generation_path}")
         except Exception as e:
+            discard_generation(generation_path)
             logger.error(f"Error building vector store: {str(e)}")
             sys.exit(1)
         
+        # Generations retired long enough ago that no reader still uses them
+        collect_generations(vector_db_path)
+        
         elapsed_time = time.time() - start_time
         logger.info(f"Processing completed in {elapsed_time:.2f} seconds")
     
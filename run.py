@@ -60,11 +60,22 @@ def run_gradio_direct():
     
     return gradio_process
 
+def run_watcher():
+    """Run the markdown watcher that auto-ingests changed files"""
+    print("Starting markdown watcher...")
+    watcher_process = subprocess.Popen(
+        [sys.executable, "watch_markdown.py"],
+        text=True
+    )
+    return watcher_process
+
 def main():
     """Main function to run the application"""
     parser = argparse.ArgumentParser(description="Run Multi-Agent Chat Application")
     parser.add_argument("--mode", choices=["streamlit", "gradio", "both"], default="streamlit",
                       help="Which interface to run: streamlit, gradio, or both")
+    parser.add_argument("--watch", action="store_true",
+                      help="Also run a background watcher that re-indexes changed markdown files")
     
     args = parser.parse_args()
     
@@ -76,6 +87,11 @@ def main():
     
     processes = []
     
+    # Run the markdown watcher alongside the chat interfaces
+    if args.watch:
+        watcher_process = run_watcher()
+        processes.append(watcher_process)
+    
     # Run Streamlit
     if args.mode in ["streamlit", "both"]:
         streamlit_process = run_streamlit()
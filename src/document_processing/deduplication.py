@@ -0,0 +1,134 @@
+from langchain.schema.document import Document
+from typing import Dict, List, Tuple
+import hashlib
+import re
+import zlib
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _choose_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick the LSH (bands, rows) split whose S-curve midpoint (1/b)^(1/r)
+    is closest to the similarity threshold.
+    """
+    best = None
+    for bands in range(1, num_perm + 1):
+        if num_perm % bands:
+            continue
+        rows = num_perm // bands
+        midpoint = (1.0 / bands) ** (1.0 / rows)
+        if best is None or abs(midpoint - threshold) < best[0]:
+            best = (abs(midpoint - threshold), bands, rows)
+    return best[1], best[2]
+
+
+class MinHashDeduplicator:
+    """
+    Near-duplicate chunk elimination with MinHash signatures and LSH banding.
+
+    Chunks are reduced to character shingles, hashed into MinHash signatures and
+    bucketed by band. A chunk whose estimated Jaccard similarity to an earlier
+    kept chunk reaches the threshold is dropped, and its source is added to the
+    kept chunk's "source_filenames" metadata. The first occurrence always wins, so
+    the result is deterministic for a given chunk order.
+
+    Chunks are only merged if they contain the same figures, so boilerplate that
+    differs in a single amount or date (common across quarterly reports) is kept.
+    """
+    def __init__(self, threshold: float = 0.9, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = _choose_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        normalized = re.sub(r"\s+", " ", text.lower()).strip()
+        if len(normalized) <= self.shingle_size:
+            pieces = {normalized}
+        else:
+            pieces = {normalized[i:i + self.shingle_size] for i in range(len(normalized) - self.shingle_size + 1)}
+        return np.fromiter((zlib.crc32(piece.encode("utf-8")) for piece in pieces), dtype=np.uint64)
+
+    @staticmethod
+    def _figures(text: str) -> Tuple[str, ...]:
+        return tuple(re.findall(r"\d[\d,.]*", text))
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+        """
+        hashes = self._shingles(text)
+        # uint64 arithmetic wraps on overflow; that is fine for a hash permutation
+        with np.errstate(over="ignore"):
+            permuted = np.bitwise_and((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME, _MAX_HASH)
+        return permuted.min(axis=0)
+
+    def deduplicate(self, chunks: List[Document], source_key: str = "source_filename") -> List[Document]:
+        """
+        Drop near-duplicate chunks, recording every source on the chunk that is kept.
+
+        Args:
+            chunks: Document chunks in their original order
+            source_key: Metadata key naming the chunk's source file
+
+        Returns:
+            The kept chunks, in their original relative order
+        """
+        kept: List[Document] = []
+        sources: List[List[str]] = []
+        counts: List[int] = []
+        signatures: List[np.ndarray] = []
+        figures: List[Tuple[str, ...]] = []
+        exact: Dict[str, int] = {}
+        buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(self.bands)]
+
+        for chunk in chunks:
+            source = chunk.metadata.get(source_key, "unknown")
+            digest = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()
+
+            match = exact.get(digest)
+            if match is None:
+                signature = self.signature(chunk.page_content)
+                band_keys = [
+                    signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                    for band in range(self.bands)
+                ]
+                candidates = sorted({
+                    index for band, key in enumerate(band_keys) for index in buckets[band].get(key, ())
+                })
+                chunk_figures = self._figures(chunk.page_content)
+                for index in candidates:
+                    if figures[index] == chunk_figures and np.mean(signatures[index] == signature) >= self.threshold:
+                        match = index
+                        break
+
+            if match is None:
+                match = len(kept)
+                kept.append(chunk)
+                sources.append([source])
+                counts.append(1)
+                signatures.append(signature)
+                figures.append(chunk_figures)
+                exact[digest] = match
+                for band, key in enumerate(band_keys):
+                    buckets[band].setdefault(key, []).append(match)
+            else:
+                counts[match] += 1
+                if source not in sources[match]:
+                    sources[match].append(source)
+
+        for chunk, chunk_sources, count in zip(kept, sources, counts):
+            # Chroma metadata values must be scalars, so the source list is joined
+            chunk.metadata = {
+                **chunk.metadata,
+                "source_filenames": "; ".join(chunk_sources),
+                "duplicate_count": count,
+            }
+        return kept
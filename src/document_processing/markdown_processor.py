@@ -1,16 +1,119 @@
-from langchain_community.document_loaders import DirectoryLoader, TextLoader
+from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import MarkdownHeaderTextSplitter, RecursiveCharacterTextSplitter
+from langchain.schema.document import Document
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from pathlib import Path
 from tqdm import tqdm
 
+from src.document_processing.deduplication import MinHashDeduplicator
+from src.document_processing.token_chunker import TokenAwareMarkdownChunker
+from src.document_processing.metadata import add_structured_metadata, header_path, parent_section_id
+
+def _load_markdown_file(file_path):
+    """Load a single markdown file, detecting its encoding. Runs in worker processes."""
+    return TextLoader(file_path, autodetect_encoding=True).load()
+
+def _split_markdown_document(doc, split_headers, chunk_size, chunk_overlap, chunker="recursive", max_chunk_tokens=256):
+    """
+    Split one document by headers and then into sized chunks. Runs in worker processes.
+
+    Returns:
+        Tuple of (chunks, number of markdown sections)
+    """
+    if chunker == "token":
+        chunks, section_count = TokenAwareMarkdownChunker(
+            max_tokens=max_chunk_tokens, split_headers=split_headers
+        ).split_document(doc)
+        return add_structured_metadata(doc, chunks), section_count
+
+    markdown_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=split_headers,
+        strip_headers=False
+    )
+    chunk_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+
+    markdown_sections = markdown_splitter.split_text(doc.page_content)
+
+    for section in markdown_sections:
+        # Keep metadata from the original document and add section headers
+        section.metadata = {
+            **doc.metadata,
+            **section.metadata,
+            "source_filename": doc.metadata.get('source', 'unknown')
+        }
+
+    chunks = chunk_splitter.split_documents(markdown_sections)
+    return add_structured_metadata(doc, chunks), len(markdown_sections)
+
+def _split_parent_sections(doc, split_headers):
+    """
+    Split one document into the header sections its chunks point to via parent_id.
+
+    Returns:
+        One section document per distinct header path, with "parent_id", "source",
+        "header_path" and the "Level 1"-"Level 4" header metadata
+    """
+    markdown_splitter = MarkdownHeaderTextSplitter(
+        headers_to_split_on=split_headers,
+        strip_headers=False
+    )
+    source = doc.metadata.get('source', 'unknown')
+    texts = {}
+    levels = {}
+    for section in markdown_splitter.split_text(doc.page_content):
+        headers = header_path(section.metadata)
+        texts.setdefault(headers, []).append(section.page_content)
+        levels[headers] = section.metadata
+    return [
+        Document(
+            page_content="\n\n".join(parts),
+            metadata={
+                **levels[headers],
+                "parent_id": parent_section_id(source, headers), "source": source, "header_path": headers
+            }
+        )
+        for headers, parts in texts.items()
+    ]
+
+def _load_and_split_markdown_file(file_path, *split_args):
+    """Load and split one file, returning (document, chunks) pairs. Runs in worker processes."""
+    return [
+        (doc, _split_markdown_document(doc, *split_args)[0])
+        for doc in _load_markdown_file(file_path)
+    ]
+
 class MarkdownProcessor:
     """
     Class for loading and processing markdown files into chunks suitable for embedding.
+
+    With workers > 1, file loading and splitting run in a process pool. Results are
+    collected in input order, so chunk order is identical to the serial mode.
+
+    With deduplicate=True, extract_chunks() drops near-duplicate chunks (MinHash/LSH
+    at dedup_threshold estimated Jaccard similarity) and lists every source a kept
+    chunk appeared in under its "source_filenames" metadata.
+
+    chunker selects the splitting strategy: "recursive" (header splitter followed
+    by a 250-character splitter) or "token" (single-pass TokenAwareMarkdownChunker
+    bounded by max_chunk_tokens tiktoken tokens).
     """
-    def __init__(self, folder_path, file_pattern="**/*.md"):
+    def __init__(self, folder_path, file_pattern="**/*.md", workers=1, deduplicate=False, dedup_threshold=0.9,
+                 chunker="recursive", max_chunk_tokens=256):
         self.folder_path = folder_path
         self.file_pattern = file_pattern
+        self.workers = workers
+        self.deduplicate = deduplicate
+        self.dedup_threshold = dedup_threshold
         self.loaded_docs = []
         self.chunks = []
+        self.chunk_size = 250
+        self.chunk_overlap = 30
+        self.chunker = chunker
+        self.max_chunk_tokens = max_chunk_tokens
         self.split_headers = [
             ("#", "Level 1"),
             ("##", "Level 2"),
@@ -18,15 +121,92 @@ class MarkdownProcessor:
             ("####", "Level 4"),
         ]
 
+    def _split_args(self):
+        """Positional arguments passed to the module-level split functions."""
+        return (self.split_headers, self.chunk_size, self.chunk_overlap, self.chunker, self.max_chunk_tokens)
+
+    def _map_chunksize(self, item_count):
+        """Batch several items per worker task to amortize inter-process overhead."""
+        return max(1, item_count // (self.workers * 4))
+
+    def list_markdown_files(self):
+        """Return the matching markdown file paths in a deterministic order."""
+        return sorted(
+            str(path) for path in Path(self.folder_path).glob(self.file_pattern)
+            if path.is_file()
+        )
+
+    def _iter_in_pool(self, func, items, *args):
+        """
+        Yield func(item, *args) for each item in order, keeping at most
+        2 * workers tasks in flight so results never pile up in memory.
+        """
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            pending = deque()
+            for item in items:
+                pending.append(executor.submit(func, item, *args))
+                if len(pending) >= self.workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def iter_document_chunks(self):
+        """
+        Lazily load and split files one at a time.
+
+        Unlike load_markdown_files/extract_chunks, nothing is kept on the instance,
+        so memory use does not grow with the size of the corpus.
+
+        Yields:
+            Tuples of (document, chunks) in deterministic file order
+        """
+        file_paths = self.list_markdown_files()
+        split_args = self._split_args()
+        if self.workers > 1:
+            for pairs in self._iter_in_pool(_load_and_split_markdown_file, file_paths, *split_args):
+                yield from pairs
+        else:
+            for file_path in file_paths:
+                yield from _load_and_split_markdown_file(file_path, *split_args)
+
+    def parent_sections(self, documents):
+        """
+        Split documents into the full header sections their chunks belong to.
+
+        Args:
+            documents: Loaded source documents
+
+        Returns:
+            Section documents for SectionStore.replace_documents()
+        """
+        return [section for doc in documents for section in _split_parent_sections(doc, self.split_headers)]
+
+    def load_files(self, file_paths):
+        """
+        Load specific markdown files without scanning the folder.
+
+        Args:
+            file_paths: Paths of the files to load
+
+        Returns:
+            List of loaded documents
+        """
+        return [doc for file_path in file_paths for doc in _load_markdown_file(file_path)]
+
     def load_markdown_files(self):
         """Load markdown files from the specified directory."""
-        loader = DirectoryLoader(
-            path=self.folder_path,
-            glob=self.file_pattern,
-            loader_cls=TextLoader,
-            loader_kwargs={"autodetect_encoding": True}
-        )
-        self.loaded_docs = loader.load()
+        # Both modes load the same sorted file list, so documents and chunks come
+        # out in the same order whatever the worker count
+        file_paths = self.list_markdown_files()
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(
+                    _load_markdown_file, file_paths,
+                    chunksize=self._map_chunksize(len(file_paths))
+                )
+                self.loaded_docs = [doc for docs in results for doc in docs]
+        else:
+            self.loaded_docs = [doc for file_path in file_paths for doc in _load_markdown_file(file_path)]
         print(f"Documents loaded: {len(self.loaded_docs)}")
         return self.loaded_docs
 
@@ -34,33 +214,30 @@ class MarkdownProcessor:
         """
         Extract chunks from loaded markdown documents, preserving header hierarchy.
         """
-        markdown_splitter = MarkdownHeaderTextSplitter(
-            headers_to_split_on=self.split_headers, 
-            strip_headers=False
-        )
-        chunk_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=250, 
-            chunk_overlap=30
-        )
-
         total_chunks = 0
-        for doc in tqdm(self.loaded_docs, desc="Processing documents"):
-            markdown_sections = markdown_splitter.split_text(doc.page_content)
-
-            for section in markdown_sections:
-                # Keep metadata from the original document and add section headers
-                section.metadata = {
-                    **doc.metadata,
-                    **section.metadata,
-                    "source_filename": doc.metadata.get('source', 'unknown')
-                }
-
-            chunks = chunk_splitter.split_documents(markdown_sections)
-            self.chunks.extend(chunks)
-            print(f"Markdown sections for this doc: {len(markdown_sections)}")
-            print(f"Chunks for this doc: {len(chunks)}")
-            
-            total_chunks += len(chunks)
+        if self.workers > 1:
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                results = executor.map(
+                    _split_markdown_document,
+                    self.loaded_docs,
+                    *[[arg] * len(self.loaded_docs) for arg in self._split_args()],
+                    chunksize=self._map_chunksize(len(self.loaded_docs))
+                )
+                for chunks, _ in tqdm(results, total=len(self.loaded_docs), desc="Processing documents"):
+                    self.chunks.extend(chunks)
+                    total_chunks += len(chunks)
+        else:
+            for doc in tqdm(self.loaded_docs, desc="Processing documents"):
+                chunks, section_count = _split_markdown_document(doc, *self._split_args())
+                self.chunks.extend(chunks)
+                print(f"Markdown sections for this doc: {section_count}")
+                print(f"Chunks for this doc: {len(chunks)}")
+
+                total_chunks += len(chunks)
 
         print(f"Total chunks created: {total_chunks}")
-        return self.chunks 
\ No newline at end of file
+
+        if self.deduplicate:
+            self.chunks = MinHashDeduplicator(threshold=self.dedup_threshold).deduplicate(self.chunks)
+            print(f"Chunks after near-duplicate removal: {len(self.chunks)}")
+        return self.chunks
@@ -0,0 +1,102 @@
+from langchain.schema.document import Document
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import hashlib
+import re
+
+# Quarter names as they appear in report titles and file names
+QUARTER_NAMES = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+_YEAR_RE = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+_QUARTER_RE = re.compile(r"\b(first|second|third|fourth)[\s\-_]+quarter\b|\bq([1-4])\b", re.IGNORECASE)
+_TITLE_RE = re.compile(r"^#\s+(.+)$", re.MULTILINE)
+
+
+def header_path(metadata: Dict) -> str:
+    """
+    Build the "Level 1 > Level 2 > ..." header path of a chunk.
+
+    Args:
+        metadata: Chunk metadata produced by the markdown splitter
+
+    Returns:
+        Header path string, empty if the chunk has no headers
+    """
+    headers = [metadata[f"Level {level}"] for level in range(1, 5) if f"Level {level}" in metadata]
+    return " > ".join(headers)
+
+
+def parent_section_id(source: str, headers: str) -> str:
+    """
+    Return the ID of the header section a chunk belongs to.
+
+    Sections are identified by source and header path, so every chunker assigns
+    the same parent to chunks of one section and a repeated header path within a
+    file is treated as one section.
+
+    Args:
+        source: Source file of the chunk
+        headers: Header path as returned by header_path()
+
+    Returns:
+        Hex digest identifying the section
+    """
+    return hashlib.sha256(f"{source}\x1f{headers}".encode("utf-8")).hexdigest()[:32]
+
+
+def parse_period(text: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Find the first year and quarter mentioned in a title or file name.
+
+    Args:
+        text: Text such as "First Quarter 2023" or "report-q3-2024"
+
+    Returns:
+        Tuple of (year, quarter number 1-4), each None if not found
+    """
+    year = _YEAR_RE.search(text)
+    quarter = _QUARTER_RE.search(text)
+    quarter_number = None
+    if quarter:
+        quarter_number = QUARTER_NAMES[quarter.group(1).lower()] if quarter.group(1) else int(quarter.group(2))
+    return (int(year.group(1)) if year else None), quarter_number
+
+
+def document_period(doc: Document) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Determine the reporting period of a document from its file name, falling back
+    to its first level-1 title for whatever the file name does not contain.
+    """
+    year, quarter = parse_period(Path(doc.metadata.get("source", "")).stem)
+    if year is None or quarter is None:
+        title = _TITLE_RE.search(doc.page_content)
+        if title:
+            title_year, title_quarter = parse_period(title.group(1))
+            year = year if year is not None else title_year
+            quarter = quarter if quarter is not None else title_quarter
+    return year, quarter
+
+
+def add_structured_metadata(doc: Document, chunks: List[Document]) -> List[Document]:
+    """
+    Add filterable fields to the chunks of a document: "year" and "quarter" (ints,
+    only when found), "header_path" and "parent_id" (see parent_section_id).
+
+    Args:
+        doc: Source document the chunks were split from
+        chunks: Chunks of that document, updated in place
+
+    Returns:
+        The same chunks
+    """
+    year, quarter = document_period(doc)
+    for chunk in chunks:
+        if year is not None:
+            chunk.metadata["year"] = year
+        if quarter is not None:
+            chunk.metadata["quarter"] = quarter
+        chunk.metadata["header_path"] = header_path(chunk.metadata)
+        chunk.metadata["parent_id"] = parent_section_id(
+            chunk.metadata.get("source", "unknown"), chunk.metadata["header_path"]
+        )
+    return chunks
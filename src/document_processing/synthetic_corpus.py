@@ -0,0 +1,118 @@
+from typing import List
+import os
+import random
+
+QUARTERS = ["First", "Second", "Third", "Fourth"]
+
+SECTION_TITLES = [
+    "Financial Position Overview", "Asset Breakdown", "Liabilities and Deficiency",
+    "Results of Operations", "Interest Revenue and Expense", "Operating Expenses",
+    "Comprehensive Income", "Operational Highlights and Changes", "Risk Management",
+    "Capital Expenditures", "Bank Note Production", "Market Operations",
+]
+
+LINE_ITEMS = [
+    "Cash and Foreign Deposits", "Loans and Receivables", "Investments",
+    "Government of Canada Securities", "Securities Repo Operations", "Bank Notes in Circulation",
+    "Deposits", "Securities Sold Under Repurchase Agreements", "Deficiency", "Staff Costs",
+    "Technology and Telecommunications", "Interest Revenue", "Interest Expense",
+]
+
+WORDS = (
+    "the bank reported balance sheet normalization driven by maturity of investments "
+    "reflecting changes in market conditions policy rate adjustments higher volumes "
+    "lower average holdings compared to the same period previous year primarily due "
+    "operations decreased increased remained steady over the quarter resulting from"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    sentences, remaining = [], words
+    while remaining > 0:
+        length = min(remaining, rng.randint(8, 20))
+        sentences.append(_sentence(rng, length))
+        remaining -= length
+    return " ".join(sentences)
+
+
+def _bullets(rng: random.Random, count: int) -> str:
+    lines = []
+    for _ in range(count):
+        item = rng.choice(LINE_ITEMS)
+        change = rng.choice(["Increased", "Decreased"])
+        amount = f"{rng.randint(1, 320_000):,}"
+        percent = rng.randint(1, 60)
+        lines.append(f"- **{item}**: {change} by **{percent}%** to **${amount} million**.")
+    return "\n\n".join(lines)
+
+
+def _table(rng: random.Random) -> str:
+    rows = ["| Item | Current quarter | Previous quarter |", "| --- | ---: | ---: |"]
+    for item in rng.sample(LINE_ITEMS, 4):
+        rows.append(f"| {item} | ${rng.randint(1, 320_000):,} | ${rng.randint(1, 320_000):,} |")
+    return "\n".join(rows)
+
+
+def generate_document(index: int, header_depth: int = 3, sections_per_level: int = 2,
+                      section_words: int = 80, seed: int = 0) -> str:
+    """
+    Generate one synthetic quarterly report shaped like the files in markdown_files/.
+
+    Args:
+        index: Document number, used for the title and the random seed
+        header_depth: Deepest header level to emit (1-4)
+        sections_per_level: Sub-sections created under each header
+        section_words: Approximate number of words of prose per section
+        seed: Base random seed
+
+    Returns:
+        Markdown text of the document
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    year = 2000 + index // 4 % 30
+    quarter = QUARTERS[index % 4]
+    parts = [
+        f"# Bank of Canada Quarterly Financial Report – {quarter} Quarter {year} ({index})",
+        f"**For the period ended {rng.choice(['March 31', 'June 30', 'September 30', 'December 31'])}, {year}**",
+    ]
+
+    def add_sections(level: int) -> None:
+        for _ in range(sections_per_level):
+            parts.append(f"{'#' * level} {rng.choice(SECTION_TITLES)}")
+            parts.append(_paragraph(rng, section_words))
+            style = rng.random()
+            if style < 0.5:
+                parts.append(_bullets(rng, rng.randint(2, 5)))
+            elif style < 0.7:
+                parts.append(_table(rng))
+            if level < header_depth:
+                add_sections(level + 1)
+
+    if header_depth >= 2:
+        add_sections(2)
+    else:
+        parts.append(_paragraph(rng, section_words))
+    return "\n\n".join(parts) + "\n"
+
+
+def generate_corpus(output_dir: str, num_docs: int, header_depth: int = 3,
+                    sections_per_level: int = 2, section_words: int = 80, seed: int = 0) -> List[str]:
+    """
+    Write a synthetic markdown corpus to a directory.
+
+    Returns:
+        Paths of the generated files
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for index in range(num_docs):
+        path = os.path.join(output_dir, f"synthetic-report-{index:06d}.md")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(generate_document(index, header_depth, sections_per_level, section_words, seed))
+        paths.append(path)
+    return paths
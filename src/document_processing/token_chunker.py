@@ -0,0 +1,207 @@
+from langchain.schema.document import Document
+from typing import Dict, List, Optional, Tuple
+import re
+
+from src.utils.tokens import count_tokens
+
+# Hard input limit of the OpenAI embedding models, in tokens
+EMBEDDING_MODEL_MAX_TOKENS = 8191
+
+_HEADER_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM_RE = re.compile(r"^(\s*)([-*+]|\d+[.)])\s+")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+class TokenAwareMarkdownChunker:
+    """
+    Single-pass markdown chunker that measures chunk size in tiktoken tokens.
+
+    The text is walked line by line once. Header lines (Level 1-4) update the
+    header hierarchy and start a new section; everything else is grouped into
+    blocks (paragraphs, list items with their nested lines, tables and fenced code)
+    that are packed into chunks of at most max_tokens. Tables and list items are
+    never split; only a prose paragraph that alone exceeds the budget is broken at
+    sentence boundaries. The metadata matches what MarkdownHeaderTextSplitter
+    produces ("Level N" keys and "source_filename").
+    """
+    def __init__(self, max_tokens: int = 256, split_headers: Optional[List[Tuple[str, str]]] = None):
+        self.max_tokens = min(max_tokens, EMBEDDING_MODEL_MAX_TOKENS)
+        self.split_headers = split_headers or [
+            ("#", "Level 1"),
+            ("##", "Level 2"),
+            ("###", "Level 3"),
+            ("####", "Level 4"),
+        ]
+        self._level_names = {len(marker): name for marker, name in self.split_headers}
+
+    def _blocks(self, text: str):
+        """
+        Yield (kind, text, header_update) items in document order. header_update is
+        set for header lines and is a (level, title) tuple.
+        """
+        block: List[str] = []
+        kind = None
+        in_fence = False
+
+        def flush():
+            nonlocal block, kind
+            if block:
+                item = (kind, "\n".join(block).strip("\n"), None)
+                block, kind = [], None
+                return item
+            return None
+
+        for line in text.splitlines():
+            if in_fence:
+                block.append(line)
+                if _FENCE_RE.match(line):
+                    in_fence = False
+                    item = flush()
+                    if item:
+                        yield item
+                continue
+
+            if _FENCE_RE.match(line):
+                item = flush()
+                if item:
+                    yield item
+                kind, block, in_fence = "code", [line], True
+                continue
+
+            header = _HEADER_RE.match(line)
+            if header and len(header.group(1)) in self._level_names:
+                item = flush()
+                if item:
+                    yield item
+                yield ("header", line.strip(), (len(header.group(1)), header.group(2)))
+                continue
+
+            if not line.strip():
+                # Blank lines end paragraphs and tables, but indented continuations
+                # after a blank line still belong to the current list item
+                if kind in ("paragraph", "table"):
+                    item = flush()
+                    if item:
+                        yield item
+                elif kind == "list":
+                    block.append(line)
+                continue
+
+            list_item = _LIST_ITEM_RE.match(line)
+            is_table = line.lstrip().startswith("|")
+
+            if kind == "list" and line.startswith((" ", "\t")):
+                block.append(line)
+                continue
+            if is_table:
+                if kind != "table":
+                    item = flush()
+                    if item:
+                        yield item
+                    kind = "table"
+                block.append(line)
+                continue
+            if list_item and not list_item.group(1):
+                item = flush()
+                if item:
+                    yield item
+                kind, block = "list", [line]
+                continue
+            if kind == "list" and block and block[-1].strip():
+                # Lazy continuation line of a list item
+                block.append(line)
+                continue
+            if kind != "paragraph":
+                item = flush()
+                if item:
+                    yield item
+                kind = "paragraph"
+            block.append(line)
+
+        item = flush()
+        if item:
+            yield item
+
+    def _split_oversized(self, kind: str, text: str, tokens: int) -> List[Tuple[str, int]]:
+        """
+        Break a block that exceeds the budget. Tables, lists and code are only
+        split (by line) if they exceed the embedding model's hard limit.
+        """
+        if kind != "paragraph":
+            if tokens <= EMBEDDING_MODEL_MAX_TOKENS:
+                return [(text, tokens)]
+            pieces, limit = text.split("\n"), EMBEDDING_MODEL_MAX_TOKENS
+        else:
+            pieces, limit = _SENTENCE_RE.split(text), self.max_tokens
+
+        def bounded_pieces():
+            for piece in pieces:
+                piece_tokens = count_tokens(piece)
+                if piece_tokens <= limit:
+                    yield piece, piece_tokens
+                    continue
+                # A single sentence longer than the budget: fall back to words
+                words = piece.split(" ")
+                step = max(1, len(words) * limit // piece_tokens)
+                for start in range(0, len(words), step):
+                    part = " ".join(words[start:start + step])
+                    yield part, count_tokens(part)
+
+        # Word pieces go through the same accumulator, so the text keeps its order
+        parts, current, current_tokens = [], [], 0
+        for piece, piece_tokens in bounded_pieces():
+            if current and current_tokens + piece_tokens + 1 > limit:
+                parts.append((" ".join(current) if kind == "paragraph" else "\n".join(current), current_tokens))
+                current, current_tokens = [], 0
+            current.append(piece)
+            current_tokens += piece_tokens + (1 if len(current) > 1 else 0)
+        if current:
+            parts.append((" ".join(current) if kind == "paragraph" else "\n".join(current), current_tokens))
+        return parts
+
+    def split_document(self, doc: Document) -> Tuple[List[Document], int]:
+        """
+        Split one document into token-bounded chunks.
+
+        Args:
+            doc: Loaded markdown document
+
+        Returns:
+            Tuple of (chunks, number of header sections)
+        """
+        chunks: List[Document] = []
+        headers: Dict[int, str] = {}
+        section_count = 0
+        current: List[str] = []
+        current_tokens = 0
+        base_metadata = {**doc.metadata, "source_filename": doc.metadata.get("source", "unknown")}
+
+        def emit():
+            nonlocal current, current_tokens
+            if current:
+                metadata = dict(base_metadata)
+                for level, title in sorted(headers.items()):
+                    metadata[self._level_names[level]] = title
+                chunks.append(Document(page_content="\n\n".join(current), metadata=metadata))
+            current, current_tokens = [], 0
+
+        for kind, text, header_update in self._blocks(doc.page_content):
+            if kind == "header":
+                emit()
+                level, title = header_update
+                headers = {lvl: name for lvl, name in headers.items() if lvl < level}
+                headers[level] = title
+                section_count += 1
+
+            tokens = count_tokens(text)
+            parts = self._split_oversized(kind, text, tokens) if tokens > self.max_tokens else [(text, tokens)]
+            for part, part_tokens in parts:
+                # Blocks are joined with a blank line, which costs about one token
+                if current and current_tokens + part_tokens + 1 > self.max_tokens:
+                    emit()
+                current.append(part)
+                current_tokens += part_tokens + (1 if len(current) > 1 else 0)
+
+        emit()
+        return chunks, max(section_count, 1)
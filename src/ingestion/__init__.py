@@ -0,0 +1 @@
+# Ingestion pipeline package
\ No newline at end of file
@@ -0,0 +1,289 @@
+from langchain.schema.document import Document
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+import asyncio
+import logging
+import random
+import time
+
+from src.utils.tokens import count_tokens_batch
+from src.vector_store.embedding_cache import EmbeddingCache
+from src.vector_store.fake_embeddings import deterministic_vector
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingRateLimitError(Exception):
+    """
+    Raised by an embedding endpoint when the provider answers 429 Too Many Requests.
+    """
+    def __init__(self, message: str = "Rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class OpenAIEmbeddingEndpoint:
+    """
+    Async embedding endpoint backed by the OpenAI embeddings API.
+    """
+    def __init__(self, model: str = "text-embedding-ada-002", client=None):
+        from openai import AsyncOpenAI
+
+        self.model = model
+        self.client = client or AsyncOpenAI()
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        from openai import RateLimitError
+
+        try:
+            response = await self.client.embeddings.create(model=self.model, input=texts)
+        except RateLimitError as e:
+            retry_after = None
+            if e.response is not None and e.response.headers.get("retry-after"):
+                try:
+                    retry_after = float(e.response.headers["retry-after"])
+                except ValueError:
+                    pass
+            raise EmbeddingRateLimitError(str(e), retry_after=retry_after) from e
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+class FakeEmbeddingEndpoint:
+    """
+    Offline embedding endpoint for exercising the scheduler without network access.
+
+    It returns deterministic vectors after a simulated latency, records how many
+    requests were in flight at once, and can answer every Nth request with a
+    simulated 429 to exercise the retry path.
+    """
+    def __init__(self, size: int = 1536, latency: float = 0.05, rate_limit_every: int = 0,
+                 retry_after: Optional[float] = None, model: str = "fake-embedding"):
+        self.size = size
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.model = model
+        self.requests = 0
+        self.rate_limited = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        self.requests += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.rate_limit_every and self.requests % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                raise EmbeddingRateLimitError("Simulated 429", retry_after=self.retry_after)
+            return [deterministic_vector(text, self.size) for text in texts]
+        finally:
+            self.in_flight -= 1
+
+
+class AdaptiveRateLimiter:
+    """
+    Token-bucket limiter for requests per minute and tokens per minute.
+
+    Every 429 halves the effective rate and pauses all callers for the backoff
+    delay; each success restores a little of the rate, so throughput settles just
+    below what the provider actually allows.
+    """
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float,
+                 burst_seconds: float = 5.0, min_scale: float = 0.05):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.min_scale = min_scale
+        self.scale = 1.0
+        self._request_allowance = self._capacity(requests_per_minute)
+        self._token_allowance = self._capacity(tokens_per_minute)
+        self._last_refill = time.monotonic()
+        self._pause_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _capacity(self, per_minute: float) -> float:
+        return max(1.0, per_minute * self.scale / 60.0 * self.burst_seconds)
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self._request_allowance = min(
+            self._capacity(self.requests_per_minute),
+            self._request_allowance + elapsed * self.requests_per_minute * self.scale / 60.0
+        )
+        self._token_allowance = min(
+            self._capacity(self.tokens_per_minute),
+            self._token_allowance + elapsed * self.tokens_per_minute * self.scale / 60.0
+        )
+
+    async def acquire(self, tokens: int) -> None:
+        """
+        Wait until one request carrying the given number of tokens may be sent.
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._pause_until:
+                    await asyncio.sleep(self._pause_until - now)
+                    continue
+
+                self._refill()
+                # A batch larger than the bucket is let through once the bucket is full
+                needed_tokens = min(tokens, self._capacity(self.tokens_per_minute))
+                if self._request_allowance >= 1 and self._token_allowance >= needed_tokens:
+                    self._request_allowance -= 1
+                    self._token_allowance -= tokens
+                    return
+
+                request_rate = self.requests_per_minute * self.scale / 60.0
+                token_rate = self.tokens_per_minute * self.scale / 60.0
+                wait = max(
+                    (1 - self._request_allowance) / request_rate,
+                    (needed_tokens - self._token_allowance) / token_rate,
+                    0.01
+                )
+                await asyncio.sleep(wait)
+
+    def on_success(self) -> None:
+        self.scale = min(1.0, self.scale + 0.05)
+
+    def on_rate_limited(self, delay: float) -> None:
+        self.scale = max(self.min_scale, self.scale * 0.5)
+        self._pause_until = max(self._pause_until, time.monotonic() + delay)
+
+
+class EmbeddingScheduler:
+    """
+    Concurrent, rate-limit-aware embedding of document chunks.
+
+    Chunks are grouped into batches bounded by a token budget and a maximum
+    number of inputs, several batches are kept in flight with asyncio, and each
+    batch is handed to on_batch (typically a vector store upsert) as soon as its
+    embeddings arrive. Texts already present in the embedding cache are never sent.
+    """
+    def __init__(self, endpoint, max_batch_tokens: int = 8000, max_batch_size: int = 256,
+                 max_concurrency: int = 4, requests_per_minute: float = 3000,
+                 tokens_per_minute: float = 1_000_000, max_retries: int = 6,
+                 base_backoff: float = 1.0, cache: Optional[EmbeddingCache] = None):
+        self.endpoint = endpoint
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.cache = cache
+
+    def make_batches(self, token_counts: List[int]) -> List[List[int]]:
+        """
+        Group item indices into batches that respect the token and size budgets.
+
+        An item larger than the token budget gets a batch of its own.
+        """
+        batches, current, current_tokens = [], [], 0
+        for index, tokens in enumerate(token_counts):
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append(index)
+            current_tokens += tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    async def _embed_with_retry(self, limiter: AdaptiveRateLimiter, texts: List[str],
+                                tokens: int, stats: Dict[str, int]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            await limiter.acquire(tokens)
+            stats["requests"] += 1
+            try:
+                vectors = await self.endpoint.embed(texts)
+            except EmbeddingRateLimitError as e:
+                stats["rate_limited"] += 1
+                if attempt == self.max_retries:
+                    raise
+                delay = e.retry_after or min(60.0, self.base_backoff * 2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning(f"Embedding request rate limited, backing off {delay:.2f}s (attempt {attempt + 1})")
+                limiter.on_rate_limited(delay)
+                continue
+            limiter.on_success()
+            return vectors
+
+    async def run(self, documents: List[Document], ids: List[str],
+                  on_batch: Callable[[List[Document], List[List[float]], List[str]], None]) -> Dict[str, int]:
+        """
+        Embed documents and pass each finished batch to on_batch.
+
+        on_batch runs on a single background thread, so writes are serialized and
+        never block the event loop.
+
+        Args:
+            documents: Document chunks to embed
+            ids: Chunk IDs, one per document
+            on_batch: Callback receiving (documents, embeddings, ids) per batch
+
+        Returns:
+            Dictionary with batch, request, retry and token counters
+        """
+        stats = {"documents": len(documents), "cached": 0, "batches": 0, "requests": 0, "rate_limited": 0, "tokens": 0}
+        loop = asyncio.get_running_loop()
+        limiter = AdaptiveRateLimiter(self.requests_per_minute, self.tokens_per_minute)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        model = getattr(self.endpoint, "model", type(self.endpoint).__name__)
+        texts = [doc.page_content for doc in documents]
+
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding-writer") as writer:
+            pending_indices = list(range(len(documents)))
+            if self.cache is not None:
+                cached = await loop.run_in_executor(writer, self.cache.get_many, model, texts)
+                hit_indices = [i for i, vector in enumerate(cached) if vector is not None]
+                pending_indices = [i for i, vector in enumerate(cached) if vector is None]
+                stats["cached"] = len(hit_indices)
+                for start in range(0, len(hit_indices), self.max_batch_size):
+                    part = hit_indices[start:start + self.max_batch_size]
+                    await loop.run_in_executor(
+                        writer, on_batch,
+                        [documents[i] for i in part], [cached[i] for i in part], [ids[i] for i in part]
+                    )
+                del cached
+
+            token_counts = count_tokens_batch([texts[i] for i in pending_indices])
+            batches = [
+                ([pending_indices[j] for j in batch], sum(token_counts[j] for j in batch))
+                for batch in self.make_batches(token_counts)
+            ]
+
+            async def process(batch: List[int], tokens: int) -> None:
+                batch_texts = [texts[i] for i in batch]
+                async with semaphore:
+                    vectors = await self._embed_with_retry(limiter, batch_texts, tokens, stats)
+                if self.cache is not None:
+                    await loop.run_in_executor(writer, self.cache.put_many, model, batch_texts, vectors)
+                await loop.run_in_executor(
+                    writer, on_batch, [documents[i] for i in batch], vectors, [ids[i] for i in batch]
+                )
+                stats["batches"] += 1
+                stats["tokens"] += tokens
+
+            tasks = [asyncio.ensure_future(process(batch, tokens)) for batch, tokens in batches]
+            try:
+                await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+
+        logger.info(f"Embedding scheduler finished: {stats}")
+        return stats
+
+    def embed_and_store(self, documents: List[Document], ids: List[str],
+                        on_batch: Callable[[List[Document], List[List[float]], List[str]], None]) -> Dict[str, int]:
+        """
+        Synchronous entry point around run().
+        """
+        return asyncio.run(self.run(documents, ids, on_batch))
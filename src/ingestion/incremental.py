@@ -0,0 +1,247 @@
+from langchain.schema.document import Document
+from pathlib import Path
+from typing import Dict, List, Optional
+import logging
+import os
+import time
+
+from src.document_processing.markdown_processor import MarkdownProcessor
+from src.vector_store.store_builder import VectorStoreBuilder
+from src.vector_store.section_store import SectionStore
+from src.vector_store.generations import current_generation, resolve_storage_path
+from src.ingestion.manifest import IndexManifest, assign_chunk_ids, content_hash
+
+logger = logging.getLogger(__name__)
+
+class IncrementalIndexer:
+    """
+    Keeps a vector store in sync with a folder of markdown files.
+
+    Only files whose content hash changed are re-split, and within those files
+    only chunks with new IDs are embedded. Chunks of removed files are deleted.
+
+    Updates go to the live index generation. If a full rebuild publishes a new
+    generation, the next sync continues on that one.
+
+    Unlike a full build, these updates are not staged: they modify the live
+    generation in place, so a search running during a sync can see a file's new
+    chunks before its stale ones are deleted. Each file's update is small, and
+    the new chunks are written before the stale ones are removed.
+
+    Without processor_options, files are chunked with the options recorded in the
+    manifest; options that differ from them are rejected, so one index never mixes
+    chunking strategies.
+
+    The BM25 index is rebuilt over the whole store after changes, at most once
+    every lexical_refresh_seconds (0 = after every change). Until then hybrid
+    search finds new chunks through the vector ranking only and skips deleted ones.
+    """
+    def __init__(self, folder_path, storage_path='_vector_db', file_pattern="**/*.md",
+                 vector_store_builder: Optional[VectorStoreBuilder] = None, workers=1,
+                 processor_options: Optional[Dict] = None, lexical_refresh_seconds: float = 0):
+        self.folder_path = folder_path
+        self.file_pattern = file_pattern
+        self.workers = workers
+        self.processor_options = processor_options or {}
+        self.root_path = storage_path
+        self.vector_store_builder = vector_store_builder or VectorStoreBuilder(storage_path=storage_path)
+        self.storage_path = self.vector_store_builder.storage_path
+        self.manifest = IndexManifest(self.storage_path).load()
+        self.section_store = SectionStore(self.storage_path)
+        self.lexical_refresh_seconds = lexical_refresh_seconds
+        self._lexical_dirty = False
+        self._last_lexical_rebuild = float("-inf")
+
+    def _follow_current_generation(self) -> None:
+        """Reopen the store, manifest and section store if the live generation changed."""
+        if current_generation(self.root_path) is None:
+            return
+        index_path = resolve_storage_path(self.root_path)
+        if index_path == self.storage_path:
+            return
+        logger.info(f"Index generation changed, continuing in {index_path}")
+        self.vector_store_builder = self.vector_store_builder.for_storage_path(index_path)
+        self.storage_path = index_path
+        self.manifest = IndexManifest(index_path).load()
+        self.section_store = SectionStore(index_path)
+
+    def _new_processor(self) -> MarkdownProcessor:
+        options = self.processor_options or self.manifest.options.get("chunking") or {}
+        self.manifest.check_chunking(options)
+        return MarkdownProcessor(
+            folder_path=self.folder_path, file_pattern=self.file_pattern, workers=self.workers, **options
+        )
+
+    def _new_stats(self) -> Dict[str, int]:
+        return {
+            "unchanged_files": 0,
+            "changed_files": 0,
+            "removed_files": 0,
+            "added_chunks": 0,
+            "kept_chunks": 0,
+            "deleted_chunks": 0,
+        }
+
+    def _refresh_lexical_index(self, stats: Dict[str, int]) -> None:
+        """Mark the BM25 index stale if the run changed any chunks or it was never built."""
+        if stats["added_chunks"] or stats["deleted_chunks"] or not self.vector_store_builder.has_lexical_index():
+            self._lexical_dirty = True
+        self.refresh_lexical_index_if_due()
+
+    def refresh_lexical_index_if_due(self, force: bool = False) -> bool:
+        """
+        Rebuild the BM25 index if chunks changed since the last rebuild and
+        lexical_refresh_seconds have passed (or force is set).
+
+        Returns:
+            Whether the index was rebuilt
+        """
+        if not self._lexical_dirty:
+            return False
+        if not force and time.monotonic() - self._last_lexical_rebuild < self.lexical_refresh_seconds:
+            return False
+        self.vector_store_builder.rebuild_lexical_index()
+        self._lexical_dirty = False
+        self._last_lexical_rebuild = time.monotonic()
+        return True
+
+    def sync(self) -> Dict[str, int]:
+        """
+        Bring the vector store in line with the current contents of the folder.
+
+        Returns:
+            Dictionary of file and chunk counters for the run
+        """
+        self._follow_current_generation()
+        processor = self._new_processor()
+        documents = processor.load_markdown_files()
+
+        current_sources = {doc.metadata.get("source", "unknown") for doc in documents}
+        removed_sources = [source for source in self.manifest.sources(self.folder_path) if source not in current_sources]
+
+        stats = self.index_documents(documents, save=False)
+        removed_stats = self.remove_sources(removed_sources, save=False)
+        stats["removed_files"] = removed_stats["removed_files"]
+        stats["deleted_chunks"] += removed_stats["deleted_chunks"]
+
+        self.manifest.save()
+        self._refresh_lexical_index(stats)
+        logger.info(f"Incremental sync finished: {stats}")
+        return stats
+
+    def sync_files(self, file_paths: List[str]) -> Dict[str, int]:
+        """
+        Re-index only the given files: changed files are re-chunked and upserted,
+        files that no longer exist have their chunks deleted.
+
+        Args:
+            file_paths: Paths of files that may have changed
+
+        Returns:
+            Dictionary of file and chunk counters for the run
+        """
+        # Match the "folder/name.md" form produced by MarkdownProcessor
+        sources = sorted({str(Path(file_path)) for file_path in file_paths})
+        existing = [source for source in sources if os.path.isfile(source)]
+        removed = [source for source in sources if not os.path.exists(source)]
+
+        self._follow_current_generation()
+        documents = self._new_processor().load_files(existing)
+        stats = self.index_documents(documents, save=False)
+        removed_stats = self.remove_sources(removed, save=False)
+        stats["removed_files"] = removed_stats["removed_files"]
+        stats["deleted_chunks"] += removed_stats["deleted_chunks"]
+
+        self.manifest.save()
+        self._refresh_lexical_index(stats)
+        logger.info(f"Synced {len(sources)} changed file(s): {stats}")
+        return stats
+
+    def index_documents(self, documents: List[Document], save: bool = True) -> Dict[str, int]:
+        """
+        Index loaded documents, embedding only new or changed chunks.
+
+        Args:
+            documents: Loaded source documents
+            save: Whether to persist the manifest and rebuild the BM25 index afterwards
+
+        Returns:
+            Dictionary of file and chunk counters for the run
+        """
+        self.manifest.check_file_updates()
+        stats = self._new_stats()
+
+        changed_docs = []
+        for doc in documents:
+            source = doc.metadata.get("source", "unknown")
+            if self.manifest.file_hash(source) == content_hash(doc.page_content):
+                stats["unchanged_files"] += 1
+            else:
+                changed_docs.append(doc)
+        stats["changed_files"] = len(changed_docs)
+
+        if changed_docs:
+            processor = self._new_processor()
+            processor.loaded_docs = changed_docs
+            chunks = processor.extract_chunks()
+            ids = assign_chunk_ids(chunks)
+
+            old_ids_by_source = {
+                doc.metadata.get("source", "unknown"): set(self.manifest.chunk_ids(doc.metadata.get("source", "unknown")))
+                for doc in changed_docs
+            }
+            new_ids_by_source: Dict[str, set] = {}
+            new_chunks, new_ids, stale_ids = [], [], []
+            for chunk, id_ in zip(chunks, ids):
+                source = chunk.metadata.get("source", "unknown")
+                new_ids_by_source.setdefault(source, set()).add(id_)
+                if id_ not in old_ids_by_source.get(source, set()):
+                    new_chunks.append(chunk)
+                    new_ids.append(id_)
+
+            for source, old_ids in old_ids_by_source.items():
+                current_ids = new_ids_by_source.get(source, set())
+                stale_ids.extend(sorted(old_ids - current_ids))
+                stats["kept_chunks"] += len(old_ids & current_ids)
+
+            # Write new chunks before deleting stale ones so readers never see a gap
+            self.vector_store_builder.upsert(new_chunks, new_ids)
+            self.vector_store_builder.delete(stale_ids)
+            self.manifest.record_documents(changed_docs, chunks, ids)
+            self.section_store.replace_documents(processor.parent_sections(changed_docs), old_ids_by_source)
+
+            stats["added_chunks"] = len(new_chunks)
+            stats["deleted_chunks"] = len(stale_ids)
+
+        if save:
+            self.manifest.save()
+            self._refresh_lexical_index(stats)
+        return stats
+
+    def remove_sources(self, sources: List[str], save: bool = True) -> Dict[str, int]:
+        """
+        Delete every chunk that belongs to the given source files.
+
+        Args:
+            sources: Source identifiers to remove
+            save: Whether to persist the manifest and rebuild the BM25 index afterwards
+
+        Returns:
+            Dictionary of file and chunk counters for the run
+        """
+        self.manifest.check_file_updates()
+        stats = self._new_stats()
+        stale_ids = []
+        for source in sources:
+            if source in self.manifest.files:
+                stale_ids.extend(self.manifest.remove(source))
+                stats["removed_files"] += 1
+
+        self.vector_store_builder.delete(stale_ids)
+        self.section_store.remove_sources(sources)
+        stats["deleted_chunks"] = len(stale_ids)
+
+        if save:
+            self.manifest.save()
+            self._refresh_lexical_index(stats)
+        return stats
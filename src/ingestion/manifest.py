@@ -0,0 +1,236 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from langchain.schema.document import Document
+
+from src.document_processing.metadata import header_path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "ingest_manifest.json"
+# Version 2: chunks carry year, quarter and header_path metadata, so older
+# stores are re-indexed once on the next incremental run. Version 3: chunks carry
+# parent_id and their sections are kept in the section store
+MANIFEST_VERSION = 3
+
+
+def content_hash(text: str) -> str:
+    """
+    Return a stable SHA-256 hex digest for a piece of text.
+
+    Args:
+        text: Text to hash
+
+    Returns:
+        Hex digest of the UTF-8 encoded text
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(source: str, headers: str, text: str) -> str:
+    """
+    Derive a deterministic chunk ID from its source, header path and content.
+
+    Args:
+        source: Source file identifier
+        headers: Header path of the chunk
+        text: Chunk content
+
+    Returns:
+        Hex digest identifying the chunk
+    """
+    return content_hash("\x1f".join([source, headers, text]))
+
+
+def assign_chunk_ids(chunks: List[Document], source_key: str = "source") -> List[str]:
+    """
+    Compute deterministic IDs for a list of chunks.
+
+    Identical chunks within the same source get an occurrence suffix so that
+    every ID stays unique while remaining stable across runs.
+
+    Args:
+        chunks: Document chunks to identify
+        source_key: Metadata key holding the source identifier
+
+    Returns:
+        List of chunk IDs in the same order as the chunks
+    """
+    ids = []
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        base_id = chunk_id(
+            chunk.metadata.get(source_key, "unknown"),
+            header_path(chunk.metadata),
+            chunk.page_content
+        )
+        occurrence = seen.get(base_id, 0)
+        seen[base_id] = occurrence + 1
+        ids.append(base_id if occurrence == 0 else f"{base_id}-{occurrence}")
+    return ids
+
+
+def chunking_options(processor_options: Optional[Dict] = None) -> Dict:
+    """
+    Return the MarkdownProcessor options that decide how files are split into
+    chunks, in the form recorded in the manifest.
+
+    Args:
+        processor_options: "chunker" and "max_chunk_tokens" keyword arguments
+
+    Returns:
+        Dictionary with "chunker" and, for the token chunker, "max_chunk_tokens"
+    """
+    processor_options = processor_options or {}
+    chunker = processor_options.get("chunker", "recursive")
+    options = {"chunker": chunker}
+    if chunker == "token":
+        options["max_chunk_tokens"] = processor_options.get("max_chunk_tokens", 256)
+    return options
+
+
+class IndexManifest:
+    """
+    Per-file and per-chunk content-hash manifest stored alongside the vector store.
+
+    The manifest records, for every ingested source file, the hash of its content
+    and the IDs of the chunks that were written for it. Incremental ingestion uses
+    it to skip unchanged files and to find the chunks to delete when a file changes
+    or disappears.
+
+    options records how the index was built ("deduplicate", and "chunking" from
+    chunking_options()), so later updates can tell whether they are compatible
+    with it.
+    """
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+        self.path = os.path.join(storage_path, MANIFEST_FILENAME)
+        self.files: Dict[str, Dict] = {}
+        self.options: Dict = {}
+
+    def load(self) -> "IndexManifest":
+        """
+        Load the manifest from disk, starting empty if it does not exist.
+        """
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") != MANIFEST_VERSION:
+                logger.warning(f"Ignoring manifest with unsupported version at {self.path}")
+                self.files = {}
+            else:
+                self.files = data.get("files", {})
+                self.options = data.get("options", {})
+        return self
+
+    def save(self) -> None:
+        """
+        Atomically write the manifest to disk.
+        """
+        os.makedirs(self.storage_path, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "files": self.files, "options": self.options}, f)
+        os.replace(tmp_path, self.path)
+
+    def file_hash(self, source: str) -> Optional[str]:
+        """
+        Return the recorded content hash of a source file, if any.
+        """
+        entry = self.files.get(source)
+        return entry["hash"] if entry else None
+
+    def chunk_ids(self, source: str) -> List[str]:
+        """
+        Return the chunk IDs recorded for a source file.
+        """
+        entry = self.files.get(source)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def record(self, source: str, file_hash: str, chunk_ids: Iterable[str]) -> None:
+        """
+        Record the content hash and chunk IDs of a source file.
+        """
+        self.files[source] = {"hash": file_hash, "chunk_ids": list(chunk_ids)}
+
+    def record_documents(self, documents: List[Document], chunks: List[Document], ids: List[str]) -> None:
+        """
+        Record source documents together with the chunks written for them.
+
+        Args:
+            documents: Loaded source documents
+            chunks: Chunks extracted from those documents
+            ids: Chunk IDs, one per chunk
+        """
+        ids_by_source: Dict[str, List[str]] = {}
+        for chunk, chunk_id_ in zip(chunks, ids):
+            ids_by_source.setdefault(chunk.metadata.get("source", "unknown"), []).append(chunk_id_)
+        for doc in documents:
+            source = doc.metadata.get("source", "unknown")
+            self.record(source, content_hash(doc.page_content), ids_by_source.get(source, []))
+
+    def check_file_updates(self) -> None:
+        """
+        Raise ValueError if chunks of this index cannot be updated file by file.
+
+        A deduplicated index stores a chunk shared by several files once, under its
+        first source, so replacing or removing that file would delete a chunk the
+        other files still contain, and re-indexed files would bring duplicates back.
+        """
+        if self.options.get("deduplicate"):
+            raise ValueError(
+                f"Index at {self.storage_path} was built with --dedup and can only be updated by a full "
+                f"rebuild (process_markdown.py --dedup)"
+            )
+
+    def check_chunking(self, processor_options: Optional[Dict] = None) -> Dict:
+        """
+        Make sure updates split files the same way as the rest of the index.
+
+        The chunking options are recorded the first time they are checked, e.g.
+        for an index built before they were tracked.
+
+        Args:
+            processor_options: Options the update would use
+
+        Returns:
+            The index's chunking options
+
+        Raises:
+            ValueError: If the index was chunked with different options
+        """
+        requested = chunking_options(processor_options)
+        recorded = self.options.setdefault("chunking", requested)
+        if recorded != requested:
+            raise ValueError(
+                f"Index at {self.storage_path} was chunked with {recorded}, not {requested}; "
+                f"use the same chunker options or rebuild the index"
+            )
+        return recorded
+
+    def remove(self, source: str) -> List[str]:
+        """
+        Forget a source file and return the chunk IDs that belonged to it.
+        """
+        entry = self.files.pop(source, None)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def sources(self, folder_path: Optional[str] = None) -> List[str]:
+        """
+        Return the source files tracked by the manifest.
+
+        Args:
+            folder_path: If given, only return sources located inside this folder,
+                so syncing one folder never touches documents ingested from elsewhere
+        """
+        if folder_path is None:
+            return list(self.files.keys())
+        folder_parts = Path(folder_path).parts
+        return [
+            source for source in self.files
+            if Path(source).parts[:len(folder_parts)] == folder_parts
+        ]
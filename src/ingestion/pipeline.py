@@ -0,0 +1,216 @@
+from langchain.schema.document import Document
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import logging
+import queue
+import threading
+
+from src.document_processing.markdown_processor import MarkdownProcessor
+from src.vector_store.store_builder import VectorStoreBuilder
+from src.vector_store.section_store import SectionStore
+from src.ingestion.manifest import IndexManifest, assign_chunk_ids, content_hash
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's output on its queue
+_END = object()
+
+
+@dataclass
+class IngestionBatch:
+    """
+    A bounded group of chunks travelling through the pipeline.
+
+    completed_files lists the files whose last chunk is in this batch or an
+    earlier one, with their parent sections; they are checkpointed in the manifest
+    and section store once the batch is stored.
+    """
+    chunks: List[Document] = field(default_factory=list)
+    ids: List[str] = field(default_factory=list)
+    embeddings: Optional[List[List[float]]] = None
+    completed_files: List[Tuple[str, str, List[str], List[str], List[Document]]] = field(default_factory=list)
+
+
+class _StageFailed(Exception):
+    """Raised inside a stage when a downstream stage has stopped the pipeline."""
+
+
+class StreamingIngestionPipeline:
+    """
+    Generator-based load -> split -> embed -> upsert pipeline with bounded memory.
+
+    Each stage runs in its own thread and hands batches to the next through a
+    bounded queue, so a slow stage (usually embedding) applies backpressure to the
+    stages before it instead of letting chunks pile up. After every stored batch the
+    manifest is checkpointed, so an interrupted run resumes where it stopped and
+    only embeds chunks that are not already in the store.
+
+    Like IncrementalIndexer, the pipeline writes into the live index generation in
+    place. Use a full build (process_markdown.py without --streaming) to stage a
+    complete index and publish it atomically.
+    """
+    def __init__(self, processor: MarkdownProcessor, vector_store_builder: VectorStoreBuilder,
+                 batch_size: int = 256, max_pending_batches: int = 2):
+        self.processor = processor
+        self.vector_store_builder = vector_store_builder
+        self.batch_size = batch_size
+        self.max_pending_batches = max_pending_batches
+        self.manifest = IndexManifest(vector_store_builder.storage_path).load()
+        self.section_store = SectionStore(vector_store_builder.storage_path)
+        self._stop = threading.Event()
+
+    def _put(self, out_queue: queue.Queue, item) -> None:
+        """Put with backpressure, giving up if another stage has failed."""
+        while True:
+            if self._stop.is_set():
+                raise _StageFailed()
+            try:
+                out_queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, in_queue: queue.Queue):
+        """Get the next item, giving up if another stage has failed."""
+        while True:
+            if self._stop.is_set():
+                raise _StageFailed()
+            try:
+                return in_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+    def _run_stage(self, target, errors: List[BaseException], *args) -> threading.Thread:
+        def runner():
+            try:
+                target(*args)
+            except _StageFailed:
+                pass
+            except BaseException as e:
+                errors.append(e)
+                self._stop.set()
+
+        thread = threading.Thread(target=runner, name=target.__name__, daemon=True)
+        thread.start()
+        return thread
+
+    def _produce_batches(self, out_queue: queue.Queue, seen_sources: set, stats: Dict[str, int]) -> None:
+        """Load and split stage: stream files into fixed-size batches of new chunks."""
+        batch = IngestionBatch()
+        for doc, chunks in self.processor.iter_document_chunks():
+            source = doc.metadata.get("source", "unknown")
+            seen_sources.add(source)
+            file_hash = content_hash(doc.page_content)
+            if self.manifest.file_hash(source) == file_hash:
+                stats["unchanged_files"] += 1
+                continue
+
+            stats["changed_files"] += 1
+            ids = assign_chunk_ids(chunks)
+            old_ids = set(self.manifest.chunk_ids(source))
+            for chunk, id_ in zip(chunks, ids):
+                if id_ in old_ids:
+                    stats["kept_chunks"] += 1
+                    continue
+                batch.chunks.append(chunk)
+                batch.ids.append(id_)
+                if len(batch.chunks) >= self.batch_size:
+                    self._put(out_queue, batch)
+                    batch = IngestionBatch()
+
+            stale_ids = sorted(old_ids - set(ids))
+            sections = self.processor.parent_sections([doc])
+            batch.completed_files.append((source, file_hash, ids, stale_ids, sections))
+
+        if batch.chunks or batch.completed_files:
+            self._put(out_queue, batch)
+        self._put(out_queue, _END)
+
+    def _embed_batches(self, in_queue: queue.Queue, out_queue: queue.Queue) -> None:
+        """Embedding stage: compute vectors for each batch."""
+        embedder = self.vector_store_builder.embedder
+        while True:
+            batch = self._get(in_queue)
+            if batch is _END:
+                break
+            if batch.chunks:
+                batch.embeddings = embedder.embed_documents([chunk.page_content for chunk in batch.chunks])
+            self._put(out_queue, batch)
+        self._put(out_queue, _END)
+
+    def _write_batches(self, in_queue: queue.Queue, stats: Dict[str, int]) -> None:
+        """Upsert stage: store each batch and checkpoint the files it completes."""
+        while True:
+            batch = self._get(in_queue)
+            if batch is _END:
+                break
+            self.vector_store_builder.upsert_embeddings(batch.chunks, batch.embeddings, batch.ids)
+            stats["added_chunks"] += len(batch.chunks)
+
+            for source, file_hash, ids, stale_ids, sections in batch.completed_files:
+                self.vector_store_builder.delete(stale_ids)
+                self.section_store.replace_documents(sections, [source])
+                self.manifest.record(source, file_hash, ids)
+                stats["deleted_chunks"] += len(stale_ids)
+            self.manifest.save()
+            logger.info(f"Stored batch of {len(batch.chunks)} chunks ({stats['added_chunks']} so far)")
+
+    def run(self) -> Dict[str, int]:
+        """
+        Run the pipeline over the processor's folder.
+
+        Returns:
+            Dictionary of file and chunk counters for the run
+        """
+        stats = {
+            "unchanged_files": 0,
+            "changed_files": 0,
+            "removed_files": 0,
+            "added_chunks": 0,
+            "kept_chunks": 0,
+            "deleted_chunks": 0,
+        }
+        self.manifest.check_file_updates()
+        self.manifest.check_chunking({
+            "chunker": self.processor.chunker, "max_chunk_tokens": self.processor.max_chunk_tokens
+        })
+        seen_sources: set = set()
+        errors: List[BaseException] = []
+        self._stop.clear()
+
+        split_queue: queue.Queue = queue.Queue(maxsize=self.max_pending_batches)
+        embed_queue: queue.Queue = queue.Queue(maxsize=self.max_pending_batches)
+        threads = [
+            self._run_stage(self._produce_batches, errors, split_queue, seen_sources, stats),
+            self._run_stage(self._embed_batches, errors, split_queue, embed_queue),
+        ]
+        try:
+            self._write_batches(embed_queue, stats)
+        except _StageFailed:
+            pass
+        except BaseException:
+            self._stop.set()
+            raise
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        removed_sources = [
+            source for source in self.manifest.sources(self.processor.folder_path)
+            if source not in seen_sources
+        ]
+        for source in removed_sources:
+            stale_ids = self.manifest.remove(source)
+            self.vector_store_builder.delete(stale_ids)
+            stats["deleted_chunks"] += len(stale_ids)
+        self.section_store.remove_sources(removed_sources)
+        stats["removed_files"] = len(removed_sources)
+        self.manifest.save()
+        if stats["added_chunks"] or stats["deleted_chunks"] or not self.vector_store_builder.has_lexical_index():
+            self.vector_store_builder.rebuild_lexical_index()
+
+        logger.info(f"Streaming ingestion finished: {stats}")
+        return stats
@@ -0,0 +1,128 @@
+from watchdog.events import FileSystemEvent, FileSystemEventHandler
+from watchdog.observers import Observer
+from typing import Dict
+import fnmatch
+import logging
+import os
+import threading
+import time
+
+from src.ingestion.incremental import IncrementalIndexer
+
+logger = logging.getLogger(__name__)
+
+
+class _DebouncedChangeHandler(FileSystemEventHandler):
+    """
+    Collects changed markdown paths and remembers when each was last touched.
+    """
+    def __init__(self, patterns):
+        super().__init__()
+        self.patterns = patterns
+        self.pending: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def _matches(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def on_any_event(self, event: FileSystemEvent) -> None:
+        if event.is_directory or event.event_type in ("opened", "closed_no_write"):
+            return
+        paths = [event.src_path, getattr(event, "dest_path", "")]
+        now = time.monotonic()
+        with self.lock:
+            for path in paths:
+                if path and self._matches(path):
+                    self.pending[os.fsdecode(path)] = now
+
+
+class MarkdownWatcher:
+    """
+    Watches the corpus folder and incrementally re-indexes changed markdown files.
+
+    Filesystem events are debounced: a file is only processed once no event for it
+    has arrived for debounce_seconds, so editors that save in several steps, or a
+    bulk copy, trigger one re-index instead of many. Only the affected files are
+    re-chunked and upserted; the rest of the index is left alone, so the chat UIs
+    can keep serving from the same store.
+    """
+    def __init__(self, indexer: IncrementalIndexer, debounce_seconds: float = 2.0,
+                 patterns=("*.md",), initial_sync: bool = True):
+        self.indexer = indexer
+        self.debounce_seconds = debounce_seconds
+        self.initial_sync = initial_sync
+        self._handler = _DebouncedChangeHandler(patterns)
+        self._observer = Observer()
+        self._stop = threading.Event()
+        self._worker = None
+
+    def _take_settled_paths(self):
+        cutoff = time.monotonic() - self.debounce_seconds
+        with self._handler.lock:
+            settled = [path for path, touched in self._handler.pending.items() if touched <= cutoff]
+            for path in settled:
+                del self._handler.pending[path]
+        return settled
+
+    def _process_loop(self) -> None:
+        while not self._stop.wait(min(0.5, self.debounce_seconds)):
+            settled = self._take_settled_paths()
+            if not settled:
+                try:
+                    # Coalesces the BM25 rebuilds of a burst of edits into one
+                    self.indexer.refresh_lexical_index_if_due()
+                except Exception as e:
+                    logger.error(f"Error rebuilding the BM25 index: {str(e)}")
+                continue
+            try:
+                stats = self.indexer.sync_files(settled)
+                logger.info(
+                    f"Re-indexed {len(settled)} file(s): {stats['added_chunks']} chunks embedded, "
+                    f"{stats['deleted_chunks']} deleted"
+                )
+            except Exception as e:
+                logger.error(f"Error re-indexing {settled}: {str(e)}")
+                # Retry on the next pass instead of dropping the change
+                with self._handler.lock:
+                    for path in settled:
+                        self._handler.pending.setdefault(path, time.monotonic())
+
+    def start(self) -> None:
+        """
+        Catch up with changes made while not running, then start watching.
+        """
+        # Fail at startup rather than on every change if the index cannot be updated
+        self.indexer.manifest.check_file_updates()
+        if self.initial_sync:
+            logger.info(f"Running initial sync of {self.indexer.folder_path}...")
+            self.indexer.sync()
+        self._observer.schedule(self._handler, self.indexer.folder_path, recursive=True)
+        self._observer.start()
+        self._worker = threading.Thread(target=self._process_loop, name="markdown-watcher", daemon=True)
+        self._worker.start()
+        logger.info(f"Watching {self.indexer.folder_path} for markdown changes")
+
+    def stop(self) -> None:
+        """
+        Stop watching and wait for the re-index thread to finish.
+        """
+        self._stop.set()
+        self._observer.stop()
+        self._observer.join()
+        if self._worker:
+            self._worker.join()
+        self.indexer.refresh_lexical_index_if_due(force=True)
+
+    def run_forever(self) -> None:
+        """
+        Start watching and block until interrupted.
+        """
+        self.start()
+        try:
+            while not self._stop.is_set():
+                time.sleep(1)
+        except KeyboardInterrupt:
+            logger.info("Stopping watcher...")
+        finally:
+            self.stop()
@@ -0,0 +1,156 @@
+from langchain.schema.document import Document
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+import threading
+
+from src.document_processing.metadata import header_path
+from src.utils.tokens import count_tokens, truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+# Shortest shared text treated as splitter overlap between two chunks
+MIN_OVERLAP_CHARS = 12
+
+# Running totals over all formatted search results in this process
+_totals = {"calls": 0, "tokens": 0, "verbose_tokens": 0, "tokens_saved": 0}
+_totals_lock = threading.Lock()
+
+
+def _source(doc: Document) -> str:
+    # Deduplicated chunks list every source they appeared in
+    return doc.metadata.get('source_filenames') or doc.metadata.get('source_filename', 'Unknown source')
+
+
+def _overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is also a prefix of right."""
+    for size in range(min(len(left), len(right)), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_texts(texts: Sequence[str]) -> List[str]:
+    """
+    Merge chunks of one section: drop chunks contained in another and join chunks
+    whose end overlaps the start of another, as the splitter's chunk_overlap produces.
+
+    Args:
+        texts: Chunk texts in retrieval order
+
+    Returns:
+        The merged, non-overlapping pieces, in the order their first chunk was retrieved
+    """
+    pieces: List[str] = []
+    for text in (text.strip() for text in texts):
+        if not text or any(text in piece for piece in pieces):
+            continue
+        pieces = [piece for piece in pieces if piece not in text]
+        pieces.append(text)
+
+    merged = True
+    while merged and len(pieces) > 1:
+        merged = False
+        best = (0, None, None)
+        for i, left in enumerate(pieces):
+            for j, right in enumerate(pieces):
+                if i != j:
+                    size = _overlap(left, right)
+                    if size > best[0]:
+                        best = (size, i, j)
+        size, i, j = best
+        if size:
+            combined = pieces[i] + pieces[j][size:]
+            keep = min(i, j)
+            pieces = [piece for index, piece in enumerate(pieces) if index not in (i, j)]
+            pieces.insert(keep, combined)
+            merged = True
+    return pieces
+
+
+def _verbose_tokens(docs: Sequence[Document]) -> int:
+    """Token count of the uncompacted one-block-per-hit output."""
+    blocks = [
+        f"Document {i}:\nSource: {_source(doc)}\nContext: {header_path(doc.metadata)}\nContent: {doc.page_content.strip()}\n\n"
+        for i, doc in enumerate(docs, 1)
+    ]
+    return count_tokens("".join(blocks))
+
+
+def format_context(docs: Sequence[Document], max_tokens: int = 0,
+                   matched_queries: Optional[Sequence[Sequence[int]]] = None) -> Tuple[str, Dict[str, int]]:
+    """
+    Render search hits as compact context for the agent.
+
+    Hits are grouped by source and header path in rank order, overlapping and
+    duplicated chunk text within a group is merged, and groups are emitted until
+    the token budget is spent (the last one is truncated to fit).
+
+    Args:
+        docs: Retrieved chunks, best first
+        max_tokens: tiktoken budget for the rendered context (0 = unlimited)
+        matched_queries: Optional per-hit query numbers, listed for each group
+
+    Returns:
+        Tuple of (rendered text, stats with hits, groups, tokens, verbose_tokens
+        and tokens_saved)
+    """
+    groups: Dict[Tuple[str, str], Dict] = {}
+    for index, doc in enumerate(docs):
+        key = (_source(doc), header_path(doc.metadata))
+        group = groups.setdefault(key, {"texts": [], "queries": set()})
+        group["texts"].append(doc.page_content)
+        if matched_queries is not None:
+            group["queries"].update(matched_queries[index])
+
+    blocks: List[str] = []
+    used = 0
+    for number, ((source, headers), group) in enumerate(groups.items(), 1):
+        pieces = merge_texts(group["texts"])
+        merged_note = f" ({len(group['texts'])} chunks merged)" if len(group["texts"]) > 1 else ""
+        header = f"Document {number}{merged_note}:\n"
+        if group["queries"]:
+            header += f"Matched queries: {', '.join(str(query) for query in sorted(group['queries']))}\n"
+        header += f"Source: {source}\nContext: {headers}\nContent: "
+        content = "\n...\n".join(pieces)
+        block = f"{header}{content}\n\n"
+
+        if max_tokens:
+            remaining = max_tokens - used
+            block_tokens = count_tokens(block)
+            if block_tokens > remaining:
+                content_budget = remaining - count_tokens(header) - 2
+                if content_budget < 20:
+                    break
+                block = f"{header}{truncate_to_tokens(content, content_budget)} [truncated]\n\n"
+                blocks.append(block)
+                used += count_tokens(block)
+                break
+            used += block_tokens
+        blocks.append(block)
+
+    text = "".join(blocks)
+    tokens = count_tokens(text)
+    verbose_tokens = _verbose_tokens(docs)
+    stats = {
+        "hits": len(docs),
+        "groups": len(groups),
+        "groups_shown": len(blocks),
+        "tokens": tokens,
+        "verbose_tokens": verbose_tokens,
+        "tokens_saved": max(0, verbose_tokens - tokens),
+    }
+    with _totals_lock:
+        _totals["calls"] += 1
+        for key in ("tokens", "verbose_tokens", "tokens_saved"):
+            _totals[key] += stats[key]
+    logger.info(
+        f"Search context: {stats['hits']} hits in {stats['groups']} sections, "
+        f"{tokens} tokens ({stats['tokens_saved']} saved)"
+    )
+    return text, stats
+
+
+def get_context_savings() -> Dict[str, int]:
+    """Return the running totals of tokens emitted and saved by format_context."""
+    with _totals_lock:
+        return dict(_totals)
@@ -0,0 +1,103 @@
+from typing import Dict, Iterable, List, Optional, Set
+import re
+
+from src.document_processing.metadata import QUARTER_NAMES
+
+_YEAR_RANGE_RE = re.compile(r"(?<!\d)((?:19|20)\d{2})\s*(?:-|–|to|through|until)\s*((?:19|20)\d{2})(?!\d)", re.IGNORECASE)
+_YEAR_RE = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+_QUARTER_WORDS = "first|second|third|fourth"
+_QUARTER_LIST_RE = re.compile(
+    rf"\b(?:{_QUARTER_WORDS})(?:\s*(?:,|and|or|&)\s*(?:{_QUARTER_WORDS}))*\s+quarters?\b", re.IGNORECASE
+)
+_QUARTER_SHORT_RE = re.compile(r"\bq([1-4])\b", re.IGNORECASE)
+
+
+def _combine(operator: str, clauses: List[Dict]) -> Optional[Dict]:
+    """Join where clauses; Chroma requires at least two operands for $and / $or."""
+    if not clauses:
+        return None
+    if len(clauses) == 1:
+        return clauses[0]
+    return {operator: clauses}
+
+
+def _values_filter(key: str, values: List[int]) -> Dict:
+    return {key: values[0]} if len(values) == 1 else {key: {"$in": values}}
+
+
+def parse_years(query: str) -> Dict:
+    """
+    Return a where clause for the years mentioned in a query, {} if none.
+    A range such as "2022-2024" becomes an inclusive $gte/$lte filter.
+    """
+    year_range = _YEAR_RANGE_RE.search(query)
+    if year_range:
+        start, end = sorted(int(year) for year in year_range.groups())
+        return {"$and": [{"year": {"$gte": start}}, {"year": {"$lte": end}}]}
+    years = sorted({int(year) for year in _YEAR_RE.findall(query)})
+    return _values_filter("year", years) if years else {}
+
+
+def parse_quarters(query: str) -> Dict:
+    """
+    Return a where clause for the quarters mentioned in a query ("Q2", "third
+    quarter", "first and second quarters"), {} if none.
+    """
+    quarters: Set[int] = {int(number) for number in _QUARTER_SHORT_RE.findall(query)}
+    for match in _QUARTER_LIST_RE.finditer(query):
+        quarters.update(QUARTER_NAMES[word.lower()] for word in re.findall(_QUARTER_WORDS, match.group(0), re.IGNORECASE))
+    return _values_filter("quarter", sorted(quarters)) if quarters else {}
+
+
+def parse_sections(query: str, section_titles: Iterable[str]) -> Dict:
+    """
+    Return a where clause restricting results to the known header titles that the
+    query names verbatim (case-insensitive), {} if none. Longer titles win when
+    one title contains another.
+    """
+    lowered = query.lower()
+    matched: List[str] = []
+    for title in sorted(section_titles, key=len, reverse=True):
+        if title and title.lower() in lowered and not any(title.lower() in other.lower() for other in matched):
+            matched.append(title)
+    # A chunk carries the titles of all its ancestor headers, so matching any
+    # level also keeps the sub-sections of the named section
+    clauses = [{f"Level {level}": title} for title in matched for level in range(1, 5)]
+    return _combine("$or", clauses) or {}
+
+
+def parse_query_filters(query: str, section_titles: Optional[Iterable[str]] = None) -> Optional[Dict]:
+    """
+    Turn the period and section constraints found in a query into a Chroma where filter.
+
+    Args:
+        query: The search query
+        section_titles: Header titles present in the store; sections are only
+            filtered on when this is given
+
+    Returns:
+        Where filter, or None if the query has no detectable constraints
+    """
+    clauses = [parse_years(query), parse_quarters(query)]
+    if section_titles:
+        clauses.append(parse_sections(query, section_titles))
+    return _combine("$and", [clause for clause in clauses if clause])
+
+
+def collect_section_titles(collection, batch_size: int = 5000) -> Set[str]:
+    """
+    Read every distinct Level 1-4 header title stored in a Chroma collection.
+    """
+    titles: Set[str] = set()
+    offset = 0
+    while True:
+        page = collection.get(limit=batch_size, offset=offset, include=["metadatas"])
+        if not page["ids"]:
+            break
+        for metadata in page["metadatas"]:
+            for level in range(1, 5):
+                title = (metadata or {}).get(f"Level {level}")
+                if title:
+                    titles.add(title)
+        offset += len(page["ids"])
+    return titles
@@ -1,32 +1,62 @@
 from crewai.tools import BaseTool
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
-from pydantic import Field
-import time
-
-# Simple cache implementation
-class SimpleCache:
-    def __init__(self, ttl=300):
-        self.cache = {}
-        self.ttl = ttl
-    
-    def get(self, key):
-        if key in self.cache:
-            timestamp, value = self.cache[key]
-            if time.time() - timestamp < self.ttl:
-                return value
-        return None
-    
-    def set(self, key, value):
-        self.cache[key] = (time.time(), value)
+from langchain.schema.document import Document
+from pydantic import Field, PrivateAttr
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import asyncio
+import functools
+import json
+import os
+
+from src.vector_store.store_builder import batch_similarity_search, get_collection
+from src.vector_store.registry import (
+    get_shared_embedder, get_shared_section_store, get_shared_store, lease_shared_store
+)
+from src.vector_store.bm25_index import (
+    fuse_with_lexical, get_bm25_index, hybrid_search, index_version, reciprocal_rank_fusion
+)
+from src.vector_store.section_store import SectionStore, expand_to_sections
+from src.vector_store.query_embeddings import (
+    aembed_queries_cached, aembed_query_cached, embed_queries_cached, embed_query_cached
+)
+from src.tools.query_filters import collect_section_titles, parse_query_filters
+from src.tools.context_formatter import format_context
+from src.utils.semantic_cache import SemanticQueryCache
+from src.utils.lru_cache import LRUTTLCache
+
+# Global cache instance, shared by every tool instance and worker thread
+_search_cache = LRUTTLCache(
+    maxsize=int(os.getenv("SEARCH_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("SEARCH_CACHE_TTL", "300"))
+)
 
-    def clear(self):
-        """Clear all cached entries."""
-        self.cache = {}
+# Results of earlier queries with nearly the same embedding, shared by all tool instances
+_semantic_cache = SemanticQueryCache(
+    max_entries=int(os.getenv("SEMANTIC_CACHE_SIZE", "256")),
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+)
 
-# Global cache instance
-_search_cache = SimpleCache(ttl=300)
+# Bounded pool for the blocking Chroma and BM25 work of async searches
+_search_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SEARCH_EXECUTOR_WORKERS", "4")),
+    thread_name_prefix="vector-search"
+)
+
+async def _run_in_search_executor(func, *args):
+    """Run a blocking search call on the search pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_search_executor, functools.partial(func, *args))
+
+def get_search_cache_stats():
+    """Return hit/miss, eviction and size counters of the search result cache."""
+    return _search_cache.stats()
+
+def get_semantic_cache_stats():
+    """Return hit/miss statistics of the semantic query cache."""
+    return _semantic_cache.stats()
 
 class VectorStoreSearchTool(BaseTool):
     name: str = "Vector Store Search"
@@ -34,68 +64,284 @@ class VectorStoreSearchTool(BaseTool):
     storage_path: str = Field(default="_vector_db")
     embedder: Any = Field(default_factory=OpenAIEmbeddings)
     vector_store: Any = Field(default_factory=Chroma)
+    # "hybrid" fuses BM25 and vector rankings, "vector" uses similarity search only
+    search_mode: str = Field(default="hybrid")
+    # "chunk" returns the matched chunks, "section" the full header sections they
+    # belong to, deduplicated (small-to-big retrieval)
+    result_granularity: str = Field(default="chunk")
+    # tiktoken budget of the formatted results (0 = unlimited)
+    max_context_tokens: int = Field(default=1500)
+    # (collection size, header titles) used to recognise section names in queries
+    # of indexes that have no section store
+    _section_titles: Any = PrivateAttr(default=None)
+    _section_store: Any = PrivateAttr(default=None)
+    # Directory of the index generation vector_store was opened from
+    _index_path: Any = PrivateAttr(default=None)
 
-    def __init__(self, storage_path: str = "_vector_db"):
+    def __init__(self, storage_path: str = "_vector_db", search_mode: Optional[str] = None,
+                 result_granularity: Optional[str] = None):
         # First, call the parent initializer with all provided keyword arguments.
         super().__init__()
         # Now, set or override additional attributes.
-        self.embedder = OpenAIEmbeddings()
+        # Long-lived clients shared with every other search in this process
+        self.embedder = get_shared_embedder()
         self.storage_path = storage_path
-        self.vector_store = Chroma(
-            persist_directory=self.storage_path,
-            embedding_function=self.embedder
-        )
+        self.search_mode = search_mode or os.getenv("SEARCH_MODE", "hybrid")
+        self.result_granularity = result_granularity or os.getenv("SEARCH_RESULT_GRANULARITY", "chunk")
+        self.max_context_tokens = int(os.getenv("SEARCH_CONTEXT_TOKENS", "1500"))
+        # Chroma or the NumPy exact-search backend, as selected by VECTOR_STORE_BACKEND
+        store = get_shared_store(self.storage_path)
+        self.vector_store = store.vector_store
+        self._index_path = store.storage_path
 
 
+    @contextmanager
+    def _store_lease(self):
+        """
+        Hold the live store for one search: the live index generation if a rebuild
+        has published a new one since the last search, or a reopened store after
+        another process wrote to it. The store is not closed before the search ends.
+
+        Yields:
+            Tuple of (vector store, directory of its index generation)
+        """
+        with lease_shared_store(self.storage_path) as store:
+            if store.vector_store is not self.vector_store:
+                self.vector_store = store.vector_store
+                if store.storage_path != self._index_path:
+                    self._index_path = store.storage_path
+                    self._section_store = None
+                    self._section_titles = None
+            # Used instead of the attributes, which a concurrent search may switch
+            yield store.vector_store, store.storage_path
+
+    def _get_section_store(self, index_path: Optional[str] = None) -> SectionStore:
+        if index_path and index_path != self._index_path:
+            return get_shared_section_store(index_path)
+        if self._section_store is None:
+            self._section_store = get_shared_section_store(self._index_path)
+        return self._section_store
+
+    def _known_section_titles(self, vector_store, index_path: str):
+        """Header titles in the store, maintained by the section store as files are indexed."""
+        section_store = self._get_section_store(index_path)
+        titles = section_store.titles()
+        if titles or section_store.count():
+            return titles
+        # Indexes built before sections were recorded: scan the chunk metadata,
+        # again only when the collection size changes
+        collection = get_collection(vector_store)
+        count = collection.count()
+        if self._section_titles is None or self._section_titles[0] != count:
+            self._section_titles = (count, collect_section_titles(collection))
+        return self._section_titles[1]
+
+    def _search(self, vector_store, index_path: str, query: str, embedding, k: int, where=None):
+        if self.search_mode == "hybrid":
+            # Exact figures and terms are often missed by dense retrieval alone
+            return hybrid_search(
+                vector_store, get_bm25_index(index_path), query, k=k, where=where, embedding=embedding
+            )
+        return vector_store.similarity_search_by_vector(embedding, k=k, filter=where)
+
     def _search_vector_store(self, query: str, k: int = 4):
-        # Check cache first
-        cache_key = f"{query}:{k}"
-        cached_result = _search_cache.get(cache_key)
-        if cached_result:
-            return cached_result           
-       
-        results = self.vector_store.similarity_search(query, k=k)
-        
-        # Save to cache
-        _search_cache.set(cache_key, results)
+        with self._store_lease() as (vector_store, index_path):
+            # Re-indexing changes the version, so neither cache serves stale results
+            version = index_version(index_path)
+
+            # Check cache first; concurrent identical searches run only once
+            cache_key = (index_path, version, self.search_mode, query, k)
+            return _search_cache.get_or_compute(
+                cache_key, lambda: self._search_uncached(vector_store, index_path, query, k, version)
+            )
+
+    def _search_uncached(self, vector_store, index_path: str, query: str, k: int, version: str):
+        # Period and section constraints in the query narrow the candidate set;
+        # if nothing matches them, search the whole collection instead
+        where = parse_query_filters(query, self._known_section_titles(vector_store, index_path))
+
+        # Differently worded queries with the same meaning and constraints share results
+        embedding = embed_query_cached(self.embedder, query)
+        scope = (index_path, version, self.search_mode, k, json.dumps(where, sort_keys=True))
+        results = _semantic_cache.get(embedding, scope)
+        if results is None:
+            results = self._search(vector_store, index_path, query, embedding, k, where) if where else []
+            if not results:
+                results = self._search(vector_store, index_path, query, embedding, k)
+            _semantic_cache.put(embedding, results, scope)
         return results
 
+    def _expand_results(self, results: List[Document]) -> Tuple[List[Document], List[List[int]]]:
+        """
+        Apply the result granularity to ranked chunks.
+
+        Returns:
+            Tuple of (documents to show, for each document the indices of the
+            chunks in results it covers)
+        """
+        if self.result_granularity != "section":
+            return list(results), [[index] for index in range(len(results))]
+        # Small chunks match precisely; their enclosing sections carry the context
+        return expand_to_sections(results, self._get_section_store())
+
+    def _format_results(self, results) -> str:
+        if not results:
+            return "No relevant information found in the knowledge base."
+
+        docs, _ = self._expand_results(results)
+        context, stats = format_context(docs, max_tokens=self.max_context_tokens)
+        if self.result_granularity == "section":
+            return f"Found {len(results)} relevant chunk(s) in {stats['groups']} full section(s):\n\n{context}"
+        return f"Found {len(results)} relevant chunk(s) in {stats['groups']} section(s):\n\n{context}"
+
     def _run(self, query: str) -> str:
-        k = 5
         """Execute the tool's search functionality."""
+        k = 5
         try:
-            results = self._search_vector_store(query, k)
-            if not results:
+            return self._format_results(self._search_vector_store(query, k))
+        except Exception as e:
+            return f"Error searching the knowledge base: {str(e)}"
+
+    async def _arun(self, query: str) -> str:
+        """
+        Async version of the tool's search functionality.
+
+        The query is embedded with the async OpenAI client and the Chroma/BM25
+        lookups run on a bounded thread pool, so concurrent agents in one event
+        loop overlap their searches. Cancelling the call raises CancelledError
+        in the caller right away; a lookup that has not started yet is dropped.
+        """
+        k = 5
+        try:
+            # Warms the query-vector cache, so the lookup below does not embed again
+            await aembed_query_cached(self.embedder, query)
+            results = await _run_in_search_executor(self._search_vector_store, query, k)
+            return self._format_results(results)
+        except Exception as e:
+            return f"Error searching the knowledge base: {str(e)}"
+
+class MultiQueryVectorStoreSearchTool(VectorStoreSearchTool):
+    """
+    Searches the knowledge base for several queries in one tool call.
+
+    All queries missing from the caches are embedded in a single batched request,
+    and queries sharing the same period/section filter are looked up in a single
+    Chroma query. The per-query results are merged with reciprocal rank fusion,
+    duplicates are removed and each document lists the queries that found it.
+    """
+    name: str = "Multi-Query Vector Store Search"
+    description: str = (
+        "Search the knowledge base for several related queries at once. "
+        "Pass a list of short queries, e.g. different wordings or sub-questions."
+    )
+
+    def _search_many(self, queries: List[str], k: int) -> List[List[Document]]:
+        """Return the top-k chunks for every query, using the shared caches."""
+        with self._store_lease() as (vector_store, index_path):
+            return self._search_many_in(vector_store, index_path, queries, k)
+
+    def _search_many_in(self, vector_store, index_path: str, queries: List[str], k: int) -> List[List[Document]]:
+        version = index_version(index_path)
+        keys = [(index_path, version, self.search_mode, query, k) for query in queries]
+        results: List[Optional[List[Document]]] = [_search_cache.get(key) for key in keys]
+        pending = [i for i, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        section_titles = self._known_section_titles(vector_store, index_path)
+        wheres = {i: parse_query_filters(queries[i], section_titles) for i in pending}
+        embeddings = dict(zip(pending, embed_queries_cached(self.embedder, [queries[i] for i in pending])))
+        scopes = {
+            i: (index_path, version, self.search_mode, k, json.dumps(wheres[i], sort_keys=True))
+            for i in pending
+        }
+        for i in pending:
+            results[i] = _semantic_cache.get(embeddings[i], scopes[i])
+        to_search = [i for i in pending if results[i] is None]
+
+        lexical_index = get_bm25_index(index_path) if self.search_mode == "hybrid" else None
+        fetch_k = max(4 * k, 20) if lexical_index is not None and len(lexical_index) else k
+
+        def search_group(indexes: List[int], where):
+            vector_results = batch_similarity_search(vector_store, [embeddings[i] for i in indexes], fetch_k, where)
+            for i, vector_docs in zip(indexes, vector_results):
+                if fetch_k > k:
+                    results[i] = fuse_with_lexical(vector_store, lexical_index, queries[i], vector_docs, k, fetch_k, where)
+                else:
+                    results[i] = vector_docs[:k]
+
+        # One Chroma query per distinct filter; queries whose filter matched
+        # nothing are searched again without it, also as one batch
+        groups: Dict[str, List[int]] = {}
+        for i in to_search:
+            groups.setdefault(json.dumps(wheres[i], sort_keys=True), []).append(i)
+        for indexes in groups.values():
+            search_group(indexes, wheres[indexes[0]])
+        unfiltered_retry = [i for i in to_search if not results[i] and wheres[i]]
+        if unfiltered_retry:
+            search_group(unfiltered_retry, None)
+
+        for i in to_search:
+            _semantic_cache.put(embeddings[i], results[i], scopes[i])
+        for i in pending:
+            _search_cache.set(keys[i], results[i])
+        return results
+
+    def _run(self, queries: Union[List[str], str]) -> str:
+        """Execute several searches and return one merged, deduplicated result set."""
+        k = 5
+        try:
+            if isinstance(queries, str):
+                # Agents sometimes pass a single string; accept one query per line
+                queries = queries.splitlines()
+            queries = list(dict.fromkeys(query.strip() for query in queries if query and query.strip()))
+            if not queries:
+                return "No queries were given."
+
+            per_query = self._search_many(queries, k)
+            docs_by_id = {}
+            matched_by = {}
+            rankings = []
+            for number, docs in enumerate(per_query, 1):
+                ranking = []
+                for doc in docs:
+                    # Chunks without an ID are keyed by content so they still deduplicate
+                    key = doc.id or doc.page_content
+                    docs_by_id.setdefault(key, doc)
+                    matched_by.setdefault(key, []).append(number)
+                    ranking.append(key)
+                rankings.append(ranking)
+            merged = [key for key, _ in reciprocal_rank_fusion(rankings)]
+            if not merged:
                 return "No relevant information found in the knowledge base."
-            
-            output = f"Found {len(results)} relevant document(s):\n\n"
-            for i, doc in enumerate(results, 1):
-                metadata = doc.metadata
-                source = metadata.get('source_filename', 'Unknown source')
-                headers = ""
-                
-                for level in range(1, 5):
-                    level_key = f"Level {level}"
-                    if level_key in metadata:
-                        headers += f"{metadata[level_key]} > "
-                
-                if headers:
-                    headers = headers.rstrip(" > ")
-                
-                content = doc.page_content.strip()
-                output += f"Document {i}:\n"
-                output += f"Source: {source}\n"
-                output += f"Context: {headers}\n"
-                output += f"Content: {content}\n\n"
-                
+
+            output = f"Found {len(merged)} unique relevant chunk(s) for {len(queries)} queries:\n"
+            for number, (query, docs) in enumerate(zip(queries, per_query), 1):
+                output += f"Query {number}: {query} ({len(docs)} result(s))\n"
+            docs, covered = self._expand_results([docs_by_id[key] for key in merged])
+            context, _ = format_context(
+                docs, max_tokens=self.max_context_tokens,
+                matched_queries=[
+                    sorted({number for index in indices for number in matched_by[merged[index]]})
+                    for indices in covered
+                ]
+            )
+            output += f"\n{context}"
             return output
         except Exception as e:
             return f"Error searching the knowledge base: {str(e)}"
 
-    async def _arun(self, query: str, k: Optional[int] = 4) -> str:
+    async def _arun(self, queries: Union[List[str], str]) -> str:
         """Async version of the tool's search functionality."""
-        # For now, just call the synchronous version
-        return self._run(query, k=k)
+        if isinstance(queries, str):
+            queries = queries.splitlines()
+        texts = [query.strip() for query in queries if query and query.strip()]
+        if texts:
+            try:
+                await aembed_queries_cached(self.embedder, texts)
+            except Exception as e:
+                return f"Error searching the knowledge base: {str(e)}"
+        return await _run_in_search_executor(self._run, queries)
 
 class AskForClarificationsTool(BaseTool):
     """
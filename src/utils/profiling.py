@@ -0,0 +1,75 @@
+from typing import Dict, Optional
+import os
+import sys
+import threading
+import time
+
+
+def current_rss_bytes() -> Optional[int]:
+    """
+    Return the resident set size of this process in bytes, if it can be measured.
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is the lifetime peak, in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return None
+
+
+class StageProfiler:
+    """
+    Context manager measuring wall-clock time and peak RSS of a block of code.
+
+    A background thread samples RSS while the block runs, so the peak reflects
+    this stage rather than the lifetime maximum of the process.
+    """
+    def __init__(self, name: str, interval: float = 0.01):
+        self.name = name
+        self.interval = interval
+        self.seconds = 0.0
+        self.start_rss: Optional[int] = None
+        self.peak_rss: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            rss = current_rss_bytes()
+            if rss is not None:
+                self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def __enter__(self) -> "StageProfiler":
+        self.start_rss = current_rss_bytes()
+        self.peak_rss = self.start_rss
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss_bytes()
+        if rss is not None:
+            self.peak_rss = max(self.peak_rss or 0, rss)
+
+    def as_dict(self) -> Dict:
+        mb = lambda value: round(value / (1024 * 1024), 2) if value is not None else None
+        return {
+            "seconds": round(self.seconds, 4),
+            "start_rss_mb": mb(self.start_rss),
+            "peak_rss_mb": mb(self.peak_rss),
+        }
@@ -0,0 +1,137 @@
+from collections import deque
+from typing import Any, Dict, Hashable, List, Optional, Sequence
+import threading
+
+import numpy as np
+
+
+class SemanticQueryCache:
+    """
+    Cache of search results keyed by query meaning rather than query text.
+
+    Query embeddings are kept L2-normalised in one preallocated NumPy matrix, so a
+    lookup is a single matrix-vector product. A cached entry is returned when its
+    cosine similarity to the new query is at least threshold and it was stored
+    under the same scope (e.g. store, k and metadata filters), so "liabilities 2023"
+    can reuse "2023 liabilities and deficiency" but never a 2024 result. When full,
+    the least recently used entry is replaced.
+    """
+    def __init__(self, max_entries: int = 256, threshold: float = 0.95, similarity_window: int = 1000):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors: Optional[np.ndarray] = None
+        self._scopes: List[Optional[Hashable]] = [None] * max_entries
+        self._values: List[Any] = [None] * max_entries
+        self._last_used = np.zeros(max_entries, dtype=np.int64)
+        self._size = 0
+        self._clock = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Best similarity seen by recent lookups, for tuning the threshold
+        self._hit_similarities: deque = deque(maxlen=similarity_window)
+        self._miss_similarities: deque = deque(maxlen=similarity_window)
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def _best_match(self, vector: np.ndarray, scope: Hashable):
+        """Return (slot, similarity) of the closest entry in scope, or (None, None)."""
+        if not self._size or self._vectors is None or self._vectors.shape[1] != len(vector):
+            return None, None
+        in_scope = np.fromiter((s == scope for s in self._scopes[:self._size]), dtype=bool, count=self._size)
+        if not in_scope.any():
+            return None, None
+        similarities = self._vectors[:self._size] @ vector
+        similarities[~in_scope] = -np.inf
+        slot = int(np.argmax(similarities))
+        return slot, float(similarities[slot])
+
+    def get(self, vector: Sequence[float], scope: Hashable = None) -> Optional[Any]:
+        """
+        Return the cached value of the most similar earlier query, if similar enough.
+
+        Args:
+            vector: Embedding of the query
+            scope: Only entries stored with an equal scope are considered
+
+        Returns:
+            Cached value, or None on a miss
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            slot, similarity = self._best_match(query, scope)
+            if slot is not None and similarity >= self.threshold:
+                self.hits += 1
+                self._hit_similarities.append(similarity)
+                self._clock += 1
+                self._last_used[slot] = self._clock
+                return self._values[slot]
+            self.misses += 1
+            if similarity is not None:
+                self._miss_similarities.append(similarity)
+            return None
+
+    def put(self, vector: Sequence[float], value: Any, scope: Hashable = None) -> None:
+        """
+        Store a value under a query embedding, evicting the least recently used
+        entry if the cache is full.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(query):
+                # First use, or the embedding model changed: start over
+                self._vectors = np.zeros((self.max_entries, len(query)), dtype=np.float32)
+                self._size = 0
+
+            slot, similarity = self._best_match(query, scope)
+            if slot is None or similarity < 0.9999:
+                if self._size < self.max_entries:
+                    slot = self._size
+                    self._size += 1
+                else:
+                    slot = int(np.argmin(self._last_used))
+                    self.evictions += 1
+            self._vectors[slot] = query
+            self._scopes[slot] = scope
+            self._values[slot] = value
+            self._clock += 1
+            self._last_used[slot] = self._clock
+
+    def clear(self) -> None:
+        """Remove every entry; statistics are kept."""
+        with self._lock:
+            self._size = 0
+            self._scopes = [None] * self.max_entries
+            self._values = [None] * self.max_entries
+            self._last_used[:] = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and the distribution of best similarities seen on
+        hits and misses. Misses with a best similarity just under the threshold
+        suggest it can be lowered; hits barely above it suggest raising it.
+        """
+        def percentiles(values):
+            if not values:
+                return None
+            p10, p50, p90 = np.percentile(np.fromiter(values, dtype=np.float32), [10, 50, 90])
+            return {"p10": round(float(p10), 4), "p50": round(float(p50), 4), "p90": round(float(p90), 4)}
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": self._size,
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hit_similarity": percentiles(self._hit_similarities),
+                "miss_similarity": percentiles(self._miss_similarities),
+            }
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import List
+import logging
+
+import tiktoken
+
+logger = logging.getLogger(__name__)
+
+# Encoding used by the OpenAI embedding and chat models
+DEFAULT_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = DEFAULT_ENCODING):
+    """
+    Return a cached tiktoken encoding, or None if it cannot be loaded
+    (tiktoken downloads encodings on first use, which fails offline).
+    """
+    try:
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        logger.warning(f"Could not load tiktoken encoding {name}, approximating token counts: {str(e)}")
+        return None
+
+
+def count_tokens(text: str, encoding_name: str = DEFAULT_ENCODING) -> int:
+    """
+    Count the tokens in a piece of text.
+
+    Args:
+        text: Text to measure
+        encoding_name: tiktoken encoding name
+
+    Returns:
+        Number of tokens (approximately 4 characters per token if tiktoken is unavailable)
+    """
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return max(1, len(text) // 4) if text else 0
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_tokens_batch(texts: List[str], encoding_name: str = DEFAULT_ENCODING) -> List[int]:
+    """
+    Count the tokens in several texts at once.
+    """
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return [count_tokens(text, encoding_name) for text in texts]
+    return [len(tokens) for tokens in encoding.encode_batch(texts, disallowed_special=())]
+
+
+def truncate_to_tokens(text: str, max_tokens: int, encoding_name: str = DEFAULT_ENCODING) -> str:
+    """
+    Cut text down to at most max_tokens tokens.
+
+    Args:
+        text: Text to shorten
+        max_tokens: Token budget
+        encoding_name: tiktoken encoding name
+
+    Returns:
+        The text itself if it fits, otherwise its longest prefix within the budget
+    """
+    if max_tokens <= 0:
+        return ""
+    encoding = get_encoding(encoding_name)
+    if encoding is None:
+        return text[:max_tokens * 4]
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
@@ -0,0 +1,303 @@
+from langchain.schema.document import Document
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import math
+import os
+import re
+import tempfile
+import threading
+
+import numpy as np
+
+from src.vector_store.generations import index_write_version
+
+BM25_INDEX_FILENAME = "bm25_index.npz"
+
+# Rank constant of reciprocal rank fusion; 60 is the value from the original paper
+RRF_K = 60
+
+# Words, and figures such as "31,346" or "2.5" kept as a single token
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.,][0-9]+)*")
+
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase lexical terms. Thousands separators are removed so
+    "$31,346 million" and "31346" produce the same figure term.
+    """
+    return [
+        token.replace(",", "")
+        for token in _TOKEN_RE.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+
+
+class BM25Index:
+    """
+    Compact BM25 inverted index over the chunks of a vector store.
+
+    Postings are stored CSR-style: a sorted term array, an offsets array into it and
+    flat arrays of document numbers and term frequencies. The index is saved as a
+    single .npz file next to the Chroma store and loaded without pickling.
+    """
+    def __init__(self, ids: np.ndarray, doc_lengths: np.ndarray, terms: np.ndarray,
+                 offsets: np.ndarray, postings: np.ndarray, frequencies: np.ndarray,
+                 k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.doc_lengths = doc_lengths
+        self.terms = terms
+        self.offsets = offsets
+        self.postings = postings
+        self.frequencies = frequencies
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[str, str]]) -> "BM25Index":
+        """
+        Build an index from (chunk ID, text) pairs.
+
+        Args:
+            items: Iterable of (id, text) pairs
+
+        Returns:
+            The built index
+        """
+        ids: List[str] = []
+        doc_lengths: List[int] = []
+        term_postings: Dict[str, List[Tuple[int, int]]] = {}
+        for doc_number, (id_, text) in enumerate(items):
+            tokens = tokenize(text)
+            ids.append(id_)
+            doc_lengths.append(len(tokens))
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for term, count in counts.items():
+                term_postings.setdefault(term, []).append((doc_number, count))
+
+        terms = sorted(term_postings)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, frequencies = [], []
+        for i, term in enumerate(terms):
+            entries = term_postings[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            postings.extend(doc for doc, _ in entries)
+            frequencies.extend(count for _, count in entries)
+
+        return cls(
+            ids=np.array(ids, dtype=str),
+            doc_lengths=np.array(doc_lengths, dtype=np.int32),
+            terms=np.array(terms, dtype=str),
+            offsets=offsets,
+            postings=np.array(postings, dtype=np.int32),
+            frequencies=np.array(frequencies, dtype=np.int32),
+        )
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[str, float]]:
+        """
+        Score every chunk containing a query term and return the best ones.
+
+        Args:
+            query: The search query
+            k: Number of results to return
+
+        Returns:
+            List of (chunk ID, BM25 score) pairs, best first
+        """
+        if not len(self.ids) or not len(self.terms):
+            return []
+
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        length_norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / max(self.avg_length, 1e-9))
+        for term in set(tokenize(query)):
+            position = int(np.searchsorted(self.terms, term))
+            if position >= len(self.terms) or self.terms[position] != term:
+                continue
+            start, end = self.offsets[position], self.offsets[position + 1]
+            docs = self.postings[start:end]
+            tf = self.frequencies[start:end]
+            df = end - start
+            idf = math.log(1 + (len(self.ids) - df + 0.5) / (df + 0.5))
+            # Each document appears once per term, so plain fancy-index addition is safe
+            scores[docs] += idf * tf * (self.k1 + 1) / (tf + length_norm[docs])
+
+        matched = np.flatnonzero(scores)
+        if not len(matched):
+            return []
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return [(str(self.ids[i]), float(scores[i])) for i in matched]
+
+    def save(self, storage_path: str) -> str:
+        """
+        Atomically write the index into a storage directory.
+
+        Returns:
+            Path of the written file
+        """
+        os.makedirs(storage_path, exist_ok=True)
+        path = os.path.join(storage_path, BM25_INDEX_FILENAME)
+        fd, tmp_path = tempfile.mkstemp(dir=storage_path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez_compressed(
+                    f, ids=self.ids, doc_lengths=self.doc_lengths, terms=self.terms,
+                    offsets=self.offsets, postings=self.postings, frequencies=self.frequencies
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    @classmethod
+    def load(cls, storage_path: str) -> Optional["BM25Index"]:
+        """
+        Load the index saved in a storage directory, or None if there is none.
+        """
+        path = os.path.join(storage_path, BM25_INDEX_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with np.load(path, allow_pickle=False) as data:
+            return cls(**{name: data[name] for name in data.files})
+
+
+def index_version(storage_path: str) -> str:
+    """
+    Return a value that changes whenever the store is re-indexed or written in
+    place (the BM25 index modification time and the write version), for
+    invalidating caches.
+    """
+    try:
+        mtime = os.path.getmtime(os.path.join(storage_path, BM25_INDEX_FILENAME))
+    except OSError:
+        mtime = 0.0
+    return f"{mtime}:{index_write_version(storage_path)}"
+
+
+_loaded_indexes: Dict[str, Tuple[float, Optional[BM25Index]]] = {}
+_loaded_lock = threading.Lock()
+
+
+def get_bm25_index(storage_path: str) -> Optional[BM25Index]:
+    """
+    Return the process-wide index for a storage directory, reloading it when the
+    file on disk has been rebuilt since it was last read.
+    """
+    path = os.path.join(storage_path, BM25_INDEX_FILENAME)
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    key = os.path.abspath(storage_path)
+    with _loaded_lock:
+        cached = _loaded_indexes.get(key)
+        if cached is None or cached[0] != mtime:
+            cached = (mtime, BM25Index.load(storage_path))
+            _loaded_indexes[key] = cached
+        return cached[1]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuse several ranked ID lists: each ID scores the sum of 1 / (k + rank).
+
+    Returns:
+        List of (id, fused score) pairs, best first
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, id_ in enumerate(ranking, 1):
+            scores[id_] = scores.get(id_, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def hybrid_search(vector_store, lexical_index: Optional[BM25Index], query: str, k: int = 4,
+                  fetch_k: Optional[int] = None, where: Optional[Dict] = None,
+                  embedding: Optional[List[float]] = None) -> List[Document]:
+    """
+    Run vector and BM25 retrieval and fuse the two rankings with reciprocal rank fusion.
+
+    Falls back to plain similarity search when no lexical index is available.
+
+    Args:
+        vector_store: Chroma vector store
+        lexical_index: BM25 index over the same chunks, or None
+        query: The search query
+        k: Number of results to return
+        fetch_k: Candidates taken from each retriever (default max(4 * k, 20))
+        where: Optional Chroma metadata filter applied to both retrievers
+        embedding: Optional precomputed query embedding, so the query is not embedded again
+
+    Returns:
+        List of document chunks
+    """
+    def vector_search(count: int) -> List[Document]:
+        if embedding is not None:
+            return vector_store.similarity_search_by_vector(embedding, k=count, filter=where)
+        return vector_store.similarity_search(query, k=count, filter=where)
+
+    if lexical_index is None or not len(lexical_index):
+        return vector_search(k)
+
+    fetch_k = fetch_k or max(4 * k, 20)
+    return fuse_with_lexical(vector_store, lexical_index, query, vector_search(fetch_k), k, fetch_k, where)
+
+
+def fuse_with_lexical(vector_store, lexical_index: BM25Index, query: str, vector_docs: List[Document],
+                      k: int, fetch_k: int, where: Optional[Dict] = None) -> List[Document]:
+    """
+    Fuse already retrieved vector candidates with BM25 hits for the same query.
+
+    Args:
+        vector_store: Chroma vector store, used to fetch lexical-only hits
+        lexical_index: BM25 index over the same chunks
+        query: The search query
+        vector_docs: Vector search results, best first
+        k: Number of results to return
+        fetch_k: Candidates taken from the lexical index
+        where: Optional Chroma metadata filter the lexical hits must also match
+
+    Returns:
+        List of document chunks
+    """
+    lexical_hits = lexical_index.search(query, k=fetch_k * 4 if where else fetch_k)
+
+    docs_by_id = {doc.id: doc for doc in vector_docs if doc.id}
+    if where and lexical_hits:
+        # The lexical index has no metadata: keep only hits the store says match the filter
+        page = vector_store.get(ids=[id_ for id_, _ in lexical_hits], where=where)
+        allowed = set(page["ids"])
+        for id_, text, metadata in zip(page["ids"], page["documents"], page["metadatas"]):
+            docs_by_id.setdefault(id_, Document(page_content=text, metadata=metadata or {}, id=id_))
+        lexical_hits = [hit for hit in lexical_hits if hit[0] in allowed][:fetch_k]
+
+    fused = [id_ for id_, _ in reciprocal_rank_fusion([
+        [doc.id for doc in vector_docs if doc.id],
+        [id_ for id_, _ in lexical_hits],
+    ])]
+
+    # Lexical-only hits are fetched from the store; IDs deleted since the lexical
+    # index was built are skipped and the next candidates take their place
+    results: List[Document] = []
+    position = 0
+    while len(results) < k and position < len(fused):
+        window = fused[position:position + k - len(results)]
+        position += len(window)
+        missing = [id_ for id_ in window if id_ not in docs_by_id]
+        if missing:
+            for doc in vector_store.get_by_ids(missing):
+                docs_by_id[doc.id] = doc
+        results.extend(docs_by_id[id_] for id_ in window if id_ in docs_by_id)
+    return results
@@ -0,0 +1,306 @@
+from langchain_core.embeddings import Embeddings
+from typing import Dict, List, Optional
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Default location and size of the on-disk cache
+EMBEDDING_CACHE_DIR = "_embedding_cache"
+EMBEDDING_CACHE_MAX_MB = 512
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalize text for cache keying: Unicode NFC and collapsed whitespace.
+    """
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by (model, normalized text hash).
+
+    Vectors are stored as raw float32 rows in one file per model, and a SQLite
+    index maps each key to its row and last access time. When the cache grows
+    past max_bytes, the least recently used rows are freed and reused by later
+    inserts, so the vector file never grows beyond the configured size.
+
+    Several processes can share one cache directory. Rows are allocated, written
+    and read inside SQLite write transactions (BEGIN IMMEDIATE), so a row is never
+    handed out twice or reused while another process is reading it. Evicted rows
+    are freed in one transaction and only overwritten in a later one, so a rolled
+    back insert can never leave an entry pointing at another text's vector.
+    """
+    def __init__(self, cache_dir: str = EMBEDDING_CACHE_DIR, max_bytes: int = EMBEDDING_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS models (model TEXT PRIMARY KEY, dim INTEGER, next_row INTEGER);
+            CREATE TABLE IF NOT EXISTS entries (
+                model TEXT, key TEXT, row INTEGER, last_used REAL, PRIMARY KEY (model, key)
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_used ON entries (model, last_used);
+            CREATE TABLE IF NOT EXISTS free_rows (model TEXT, row INTEGER, PRIMARY KEY (model, row));
+            """
+        )
+
+    @staticmethod
+    def _key(text: str) -> str:
+        return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+    def _vector_path(self, model: str) -> str:
+        safe_model = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        return os.path.join(self.cache_dir, f"{safe_model}.f32")
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model name
+            texts: Texts to look up
+
+        Returns:
+            List with the cached vector for each text, or None on a miss
+        """
+        if not texts:
+            return []
+        keys = [self._key(text) for text in texts]
+        vectors = {}
+        with self._lock:
+            # Holding the write lock until the rows are read keeps other processes
+            # from evicting and overwriting them in between
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                model_row = self._conn.execute("SELECT dim FROM models WHERE model = ?", (model,)).fetchone()
+                rows = {}
+                if model_row is not None:
+                    unique_keys = list(set(keys))
+                    for start in range(0, len(unique_keys), 500):
+                        part = unique_keys[start:start + 500]
+                        placeholders = ",".join("?" * len(part))
+                        rows.update(self._conn.execute(
+                            f"SELECT key, row FROM entries WHERE model = ? AND key IN ({placeholders})",
+                            [model, *part]
+                        ).fetchall())
+
+                if rows:
+                    row_bytes = model_row[0] * 4
+                    with open(self._vector_path(model), "rb") as f:
+                        for key, row in sorted(rows.items(), key=lambda item: item[1]):
+                            f.seek(row * row_bytes)
+                            vectors[key] = np.frombuffer(f.read(row_bytes), dtype=np.float32)
+
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE entries SET last_used = ? WHERE model = ? AND key = ?",
+                        [(now, model, key) for key in rows]
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        return [vectors[key].tolist() if key in vectors else None for key in keys]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]) -> None:
+        """
+        Store embeddings, evicting least recently used entries beyond max_bytes.
+
+        Args:
+            model: Embedding model name
+            texts: Texts that were embedded
+            vectors: Embedding for each text
+        """
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        dim = array.shape[1]
+        max_rows = max(1, self.max_bytes // (dim * 4))
+        vectors_by_key = {}
+        for key, vector in zip((self._key(text) for text in texts), array):
+            vectors_by_key.setdefault(key, vector)
+
+        with self._lock:
+            # Evicted rows are only reused after the eviction has committed: writes
+            # to the vector file cannot be rolled back, so a row must never be
+            # overwritten while a rollback could still point an entry back at it
+            self._transaction(lambda: self._free_rows_for(model, dim, vectors_by_key, max_rows))
+            self._transaction(lambda: self._write_rows(model, dim, vectors_by_key, max_rows))
+
+    def _transaction(self, work) -> None:
+        """Run work inside BEGIN IMMEDIATE ... COMMIT. Caller holds the lock."""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            work()
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def _model_next_row(self, model: str, dim: int) -> int:
+        """Return the model's next unallocated row, registering the model if needed."""
+        model_row = self._conn.execute("SELECT dim, next_row FROM models WHERE model = ?", (model,)).fetchone()
+        if model_row is None:
+            self._conn.execute("INSERT INTO models VALUES (?, ?, 0)", (model, dim))
+            return 0
+        if model_row[0] != dim:
+            raise ValueError(f"Cached dimension {model_row[0]} for {model} does not match {dim}")
+        return model_row[1]
+
+    def _missing_keys(self, model: str, keys) -> List[str]:
+        return [
+            key for key in keys
+            if not self._conn.execute("SELECT 1 FROM entries WHERE model = ? AND key = ?", (model, key)).fetchone()
+        ]
+
+    def _free_rows_for(self, model: str, dim: int, vectors_by_key: Dict, max_rows: int) -> None:
+        """Evict least recently used entries until the new entries fit."""
+        next_row = self._model_next_row(model, dim)
+        wanted = min(len(self._missing_keys(model, vectors_by_key)), max_rows)
+        free = self._conn.execute("SELECT COUNT(*) FROM free_rows WHERE model = ?", (model,)).fetchone()[0]
+        overflow = wanted - free - max(0, max_rows - next_row)
+        if overflow > 0:
+            evicted = self._conn.execute(
+                "SELECT key, row FROM entries WHERE model = ? ORDER BY last_used LIMIT ?", (model, overflow)
+            ).fetchall()
+            self._conn.executemany(
+                "DELETE FROM entries WHERE model = ? AND key = ?", [(model, key) for key, _ in evicted]
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO free_rows VALUES (?, ?)", [(model, row) for _, row in evicted]
+            )
+
+    def _write_rows(self, model: str, dim: int, vectors_by_key: Dict, max_rows: int) -> None:
+        """
+        Write new entries into rows that are free as of the last commit, or append
+        them. Entries that do not fit (another process took the freed rows first)
+        are left uncached.
+        """
+        next_row = self._model_next_row(model, dim)
+        pending = self._missing_keys(model, vectors_by_key)
+        free_rows = [row for (row,) in self._conn.execute(
+            "SELECT row FROM free_rows WHERE model = ? ORDER BY row LIMIT ?", (model, len(pending))
+        ).fetchall()]
+        appended = min(len(pending) - len(free_rows), max(0, max_rows - next_row))
+        rows = free_rows + list(range(next_row, next_row + appended))
+        if not rows:
+            return
+        self._conn.executemany(
+            "DELETE FROM free_rows WHERE model = ? AND row = ?", [(model, row) for row in free_rows]
+        )
+
+        now = time.time()
+        path = self._vector_path(model)
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            for key, row in zip(pending, rows):
+                f.seek(row * dim * 4)
+                f.write(vectors_by_key[key].tobytes())
+            # The rows must be on disk before the entries pointing at them commit
+            f.flush()
+            os.fsync(f.fileno())
+        self._conn.executemany(
+            "INSERT INTO entries VALUES (?, ?, ?, ?)", [(model, key, row, now) for key, row in zip(pending, rows)]
+        )
+        self._conn.execute("UPDATE models SET next_row = ? WHERE model = ?", (next_row + appended, model))
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper that serves repeated texts from an EmbeddingCache.
+
+    Both the document path (ingestion) and the query path (search) go through
+    the cache; only texts that miss are sent to the wrapped embedder. The async
+    methods run cache reads and writes in a worker thread so the SQLite lock and
+    file I/O never block the event loop.
+    """
+    def __init__(self, embedder: Embeddings, cache: EmbeddingCache, model: Optional[str] = None):
+        self.embedder = embedder
+        self.cache = cache
+        self.model = model or getattr(embedder, "model", None) or type(embedder).__name__
+
+    def _lookup(self, texts: List[str]):
+        """Return cached vectors and the distinct texts that still need embedding."""
+        vectors = self.cache.get_many(self.model, texts)
+        missing_texts = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        return vectors, missing_texts
+
+    def _fill(self, texts: List[str], vectors: List, missing_texts: List[str], computed: List[List[float]]):
+        """Store freshly computed vectors and fill the gaps in the lookup result."""
+        self.cache.put_many(self.model, missing_texts, computed)
+        computed_by_text = dict(zip(missing_texts, computed))
+        return [vector if vector is not None else computed_by_text[text] for text, vector in zip(texts, vectors)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing_texts = self._lookup(texts)
+        if not missing_texts:
+            return vectors
+        return self._fill(texts, vectors, missing_texts, self.embedder.embed_documents(missing_texts))
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many(self.model, [text])[0]
+        if vector is None:
+            vector = self.embedder.embed_query(text)
+            self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors, missing_texts = await asyncio.to_thread(self._lookup, texts)
+        if not missing_texts:
+            return vectors
+        computed = await self.embedder.aembed_documents(missing_texts)
+        return await asyncio.to_thread(self._fill, texts, vectors, missing_texts, computed)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = (await asyncio.to_thread(self.cache.get_many, self.model, [text]))[0]
+        if vector is None:
+            vector = await self.embedder.aembed_query(text)
+            await asyncio.to_thread(self.cache.put_many, self.model, [text], [vector])
+        return vector
+
+
+_shared_caches = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(cache_dir: str) -> EmbeddingCache:
+    """
+    Return the process-wide EmbeddingCache for a directory.
+    """
+    with _shared_caches_lock:
+        if cache_dir not in _shared_caches:
+            max_mb = int(os.getenv("EMBEDDING_CACHE_MAX_MB", EMBEDDING_CACHE_MAX_MB))
+            _shared_caches[cache_dir] = EmbeddingCache(cache_dir, max_bytes=max_mb * 1024 * 1024)
+        return _shared_caches[cache_dir]
+
+
+def with_embedding_cache(embedder: Embeddings) -> Embeddings:
+    """
+    Wrap an embedder with the on-disk cache configured by EMBEDDING_CACHE_DIR.
+
+    Setting EMBEDDING_CACHE_DIR to an empty string disables caching.
+    """
+    cache_dir = os.getenv("EMBEDDING_CACHE_DIR", EMBEDDING_CACHE_DIR)
+    if not cache_dir:
+        return embedder
+    return CachedEmbeddings(embedder, get_embedding_cache(cache_dir))
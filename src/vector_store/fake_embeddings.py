@@ -0,0 +1,33 @@
+from langchain_core.embeddings import Embeddings
+from typing import List
+import hashlib
+
+import numpy as np
+
+
+def deterministic_vector(text: str, size: int) -> List[float]:
+    """
+    Return a unit-length pseudo-random vector derived from the text's hash.
+
+    The same text always maps to the same vector, which makes it usable as an
+    offline stand-in for a real embedding model in tests and benchmarks.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vector = np.random.default_rng(seed).standard_normal(size).astype(np.float32)
+    vector /= np.linalg.norm(vector)
+    return vector.tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Deterministic, network-free embeddings with the same interface as OpenAIEmbeddings.
+    """
+    def __init__(self, size: int = 1536, model: str = "fake-embedding"):
+        self.size = size
+        self.model = model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [deterministic_vector(text, self.size) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return deterministic_vector(text, self.size)
@@ -0,0 +1,172 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+import logging
+import os
+import shutil
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Under the store root: the pointer file naming the live generation, and the
+# directory holding one complete index per generation
+CURRENT_POINTER_FILENAME = "CURRENT"
+GENERATIONS_DIRNAME = "generations"
+# Written into a generation when a newer one replaces it
+RETIRED_MARKER_FILENAME = "RETIRED"
+
+# Seconds a retired generation is kept for readers still using it
+GENERATION_GRACE_SECONDS = 300
+
+# Rewritten after every in-place write to an index directory, so readers in
+# other processes can tell that their clients are out of date
+WRITE_VERSION_FILENAME = "WRITE_VERSION"
+
+
+def current_generation(root: str) -> Optional[str]:
+    """
+    Return the name of the live generation, or None if the store at root does
+    not use generations (an index written directly into root).
+    """
+    try:
+        with open(os.path.join(root, CURRENT_POINTER_FILENAME), "r", encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name or None
+
+
+def resolve_storage_path(root: str) -> str:
+    """
+    Return the directory holding the live index of a store.
+
+    Args:
+        root: Store root, e.g. "_vector_db"
+
+    Returns:
+        The live generation's directory, or root itself for a store without generations
+    """
+    name = current_generation(root)
+    return os.path.join(root, GENERATIONS_DIRNAME, name) if name else root
+
+
+def index_write_version(index_path: str) -> str:
+    """
+    Return the token of the last in-place write to an index directory, "" if it
+    has never been written in place.
+    """
+    try:
+        with open(os.path.join(index_path, WRITE_VERSION_FILENAME), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        return ""
+
+
+def mark_index_written(index_path: str) -> str:
+    """
+    Record that an index directory was changed in place.
+
+    Returns:
+        The new write version token
+    """
+    token = uuid.uuid4().hex
+    tmp_path = os.path.join(index_path, f"{WRITE_VERSION_FILENAME}.{token}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(token)
+    os.replace(tmp_path, os.path.join(index_path, WRITE_VERSION_FILENAME))
+    return token
+
+
+def list_generations(root: str) -> List[str]:
+    """Return the generation names under root, oldest first."""
+    try:
+        return sorted(
+            entry.name for entry in os.scandir(os.path.join(root, GENERATIONS_DIRNAME)) if entry.is_dir()
+        )
+    except FileNotFoundError:
+        return []
+
+
+def new_generation(root: str) -> str:
+    """
+    Create an empty directory for a new generation. Readers do not see it until
+    publish_generation() is called.
+
+    Returns:
+        Path of the new generation directory
+    """
+    name = f"gen-{datetime.now(timezone.utc):%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}"
+    path = os.path.join(root, GENERATIONS_DIRNAME, name)
+    os.makedirs(path)
+    return path
+
+
+def publish_generation(root: str, generation_path: str) -> None:
+    """
+    Make a fully written generation live by atomically replacing the pointer.
+
+    Readers that resolve the store after this call open the new generation; the
+    previous one is marked retired and removed later by collect_generations().
+
+    Args:
+        root: Store root
+        generation_path: Directory returned by new_generation()
+    """
+    name = os.path.basename(os.path.normpath(generation_path))
+    previous = current_generation(root)
+
+    tmp_path = os.path.join(root, f"{CURRENT_POINTER_FILENAME}.{uuid.uuid4().hex}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_POINTER_FILENAME))
+
+    if previous and previous != name:
+        retired_path = os.path.join(root, GENERATIONS_DIRNAME, previous)
+        if os.path.isdir(retired_path):
+            with open(os.path.join(retired_path, RETIRED_MARKER_FILENAME), "w", encoding="utf-8") as f:
+                f.write(str(time.time()))
+    logger.info(f"Published index generation {name} in {root}")
+
+
+def discard_generation(generation_path: str) -> None:
+    """Delete a generation that was never published, e.g. after a failed build."""
+    shutil.rmtree(generation_path, ignore_errors=True)
+
+
+def collect_generations(root: str, grace_seconds: Optional[float] = None, keep: int = 1) -> List[str]:
+    """
+    Delete retired generations that no reader should still be using.
+
+    The live generation, generations still being built and the keep most recently
+    retired ones are never deleted; others are deleted once they have been retired
+    for grace_seconds.
+
+    Args:
+        root: Store root
+        grace_seconds: Minimum time since retirement (defaults to the
+            INDEX_GENERATION_GRACE_SECONDS environment variable or 300)
+        keep: Number of retired generations to keep regardless of age
+
+    Returns:
+        Names of the deleted generations
+    """
+    if grace_seconds is None:
+        grace_seconds = float(os.getenv("INDEX_GENERATION_GRACE_SECONDS", GENERATION_GRACE_SECONDS))
+    current = current_generation(root)
+    retired = []
+    for name in list_generations(root):
+        marker = os.path.join(root, GENERATIONS_DIRNAME, name, RETIRED_MARKER_FILENAME)
+        if name != current and os.path.exists(marker):
+            retired.append((os.path.getmtime(marker), name))
+
+    deleted = []
+    now = time.time()
+    for retired_at, name in sorted(retired, reverse=True)[keep:]:
+        if now - retired_at >= grace_seconds:
+            shutil.rmtree(os.path.join(root, GENERATIONS_DIRNAME, name), ignore_errors=True)
+            deleted.append(name)
+    if deleted:
+        logger.info(f"Removed {len(deleted)} retired index generation(s) from {root}")
+    return deleted
@@ -0,0 +1,729 @@
+from langchain.schema.document import Document
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+
+from src.vector_store.quantization import PQ_CENTROIDS, PQ_TRAIN_SAMPLE_ROWS, pq_encode, pq_lookup_table, pq_scores, train_pq_codebook
+
+logger = logging.getLogger(__name__)
+
+NUMPY_INDEX_FILENAME = "numpy_index.sqlite"
+
+# Rebuild the vector file once this fraction of its rows belongs to deleted chunks
+COMPACT_DELETED_RATIO = 0.25
+
+# How the vectors scanned by search are stored: "float32" scans the full vectors,
+# "float16" and "pq" (product quantization) scan a compressed copy and re-rank a
+# shortlist on the full vectors
+VECTOR_ENCODINGS = ("float32", "float16", "pq")
+
+# Shortlist re-ranked exactly per requested result when scanning compressed vectors
+RERANK_FACTOR = 10
+
+# Rows needed before a product-quantization codebook is trained; until then
+# search scans the full vectors
+PQ_TRAIN_MIN_ROWS = 4 * PQ_CENTROIDS
+
+# Retrain the codebook once the index holds this many times the chunks it was trained on
+PQ_RETRAIN_GROWTH = 2
+
+# Rows converted from float16 at a time while scanning
+SCAN_BLOCK_ROWS = 65536
+
+_COMPARISONS = {
+    "$eq": lambda value, target: value == target,
+    "$ne": lambda value, target: value != target,
+    "$gt": lambda value, target: value is not None and value > target,
+    "$gte": lambda value, target: value is not None and value >= target,
+    "$lt": lambda value, target: value is not None and value < target,
+    "$lte": lambda value, target: value is not None and value <= target,
+    "$in": lambda value, target: value in target,
+    "$nin": lambda value, target: value not in target,
+}
+
+
+def matches_where(metadata: Dict, where: Optional[Dict]) -> bool:
+    """
+    Evaluate a Chroma-style where filter ($and, $or and the comparison
+    operators) against one metadata dictionary.
+    """
+    if not where:
+        return True
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            value = metadata.get(key)
+            if not all(_COMPARISONS[op](value, target) for op, target in condition.items()):
+                return False
+        elif metadata.get(key) != condition:
+            return False
+    return True
+
+
+class _Snapshot:
+    """Read-only view of the index at one generation."""
+    def __init__(self, generation: int, matrix: Optional[np.ndarray], row_ids: List[Optional[str]],
+                 row_metadatas: List[Optional[Dict]], codes: Optional[np.ndarray] = None,
+                 codebook: Optional[np.ndarray] = None):
+        self.generation = generation
+        self.matrix = matrix
+        # Compressed copy of matrix scanned by search (float16 rows or PQ codes)
+        self.codes = codes
+        self.codebook = codebook
+        self.row_ids = row_ids
+        self.row_metadatas = row_metadatas
+        self.valid = np.array([id_ is not None for id_ in row_ids], dtype=bool)
+        self.filter_masks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+
+class NumpyVectorStore:
+    """
+    Exact-search vector store backed by a memory-mapped float32 matrix.
+
+    Normalised vectors are stored as raw rows in a file that readers open with
+    np.memmap, so several processes share one copy through the OS page cache. A
+    SQLite index (WAL mode) maps chunk IDs to rows and holds texts and metadata.
+    Search is a matrix-vector product followed by argpartition, which gives
+    perfect recall and predictable latency for up to a few hundred thousand chunks.
+
+    Readers reopen the matrix lazily whenever the index generation changes.
+    Writes never change a row a reader may map: new and replaced chunks get
+    fresh rows at the end of the file, and the rows they replace are skipped like
+    deleted ones until dead rows make up COMPACT_DELETED_RATIO of the file, at
+    which point live rows are copied to a new file and the old one is removed.
+    Reads go through a separate SQLite connection per thread, so they only see
+    committed writes, even those of a writer thread in the same process.
+
+    encoding selects what search scans (see VECTOR_ENCODINGS). With "float16"
+    (2x smaller) or "pq" (one byte per sub-vector, 64x smaller for 1536
+    dimensions), only the compressed file needs to stay in memory: candidates
+    are scored on it, and the best rerank_factor * k are re-scored exactly
+    against the full vectors, of which only those rows are read. The encoding
+    is fixed when the first vectors are written.
+
+    The method names follow the Chroma vector store and collection APIs used in
+    this package, so the same code paths work with either backend.
+    """
+    def __init__(self, persist_directory: str, embedding_function=None, encoding: Optional[str] = None,
+                 rerank_factor: Optional[int] = None):
+        self.persist_directory = persist_directory
+        self.embedding_function = embedding_function
+        self.rerank_factor = rerank_factor or int(os.getenv("VECTOR_RERANK_FACTOR", RERANK_FACTOR))
+        os.makedirs(persist_directory, exist_ok=True)
+        self._lock = threading.Lock()
+        # Held while a codebook is trained, which happens outside self._lock
+        self._train_lock = threading.Lock()
+        self._snapshot: Optional[_Snapshot] = None
+        self._readers = threading.local()
+        self._reader_conns: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        # Used by writers (and snapshot loading) under self._lock
+        self._conn = self._connect()
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, row INTEGER, document TEXT, metadata TEXT);
+            CREATE INDEX IF NOT EXISTS chunks_row ON chunks (row);
+            """
+        )
+        explicit = encoding or os.getenv("VECTOR_ENCODING")
+        requested = explicit or "float32"
+        if requested not in VECTOR_ENCODINGS:
+            raise ValueError(f"Unknown vector encoding '{requested}', expected one of {VECTOR_ENCODINGS}")
+        meta = self._meta()
+        # Indexes written before encodings existed hold float32 vectors only
+        self.encoding = meta.get("encoding", "float32" if int(meta.get("next_row", 0)) else requested)
+        if explicit and self.encoding != requested:
+            logger.warning(
+                f"Index in {persist_directory} uses {self.encoding} vectors, not {requested}; "
+                f"rebuild it to change the encoding"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(
+            os.path.join(self.persist_directory, NUMPY_INDEX_FILENAME),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+
+    def _reader(self) -> sqlite3.Connection:
+        """Return this thread's read connection."""
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            conn = self._readers.conn = self._connect()
+            with self._readers_lock:
+                self._reader_conns.append(conn)
+        return conn
+
+    def close(self) -> None:
+        """Close the SQLite connections and unmap the vectors. The store cannot be used afterwards."""
+        with self._lock, self._readers_lock:
+            for conn in self._reader_conns:
+                conn.close()
+            self._reader_conns = []
+            self._conn.close()
+            self._snapshot = None
+
+    def _meta(self) -> Dict[str, str]:
+        return dict(self._conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def _set_meta(self, **values) -> None:
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [(key, str(value)) for key, value in values.items()]
+        )
+
+    def _remove_replaced_files(self, names: Sequence[str] = ()) -> None:
+        """
+        Delete data files replaced by compaction or quantizer training.
+
+        Windows refuses to delete a file that is still memory-mapped, e.g. by a
+        reader holding an older snapshot. Such files are kept in the
+        "replaced_files" meta entry and retried after later writes.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                pending = json.loads(self._meta().get("replaced_files", "[]")) + list(names)
+                remaining = []
+                for name in dict.fromkeys(pending):
+                    try:
+                        os.remove(os.path.join(self.persist_directory, name))
+                    except FileNotFoundError:
+                        pass
+                    except OSError:
+                        remaining.append(name)
+                self._set_meta(replaced_files=json.dumps(remaining))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _vector_path(self, meta: Dict[str, str]) -> str:
+        return os.path.join(self.persist_directory, meta.get("vector_file", "numpy_vectors.0.f32"))
+
+    def _code_path(self, meta: Dict[str, str]) -> Optional[str]:
+        if "code_file" in meta:
+            return os.path.join(self.persist_directory, meta["code_file"])
+        if self.encoding == "float16":
+            return os.path.join(self.persist_directory, "numpy_codes.0.f16")
+        return None
+
+    @staticmethod
+    def _write_rows(path: str, rows: Sequence[int], data: np.ndarray) -> None:
+        """Write data[i] at row rows[i] of a raw row file, creating it if needed."""
+        row_bytes = data.shape[1] * data.itemsize
+        with open(path, "r+b" if os.path.exists(path) else "w+b") as f:
+            for row, values in sorted(zip(rows, data), key=lambda item: item[0]):
+                f.seek(row * row_bytes)
+                f.write(values.tobytes())
+
+    # Reading
+
+    def _current_snapshot(self) -> _Snapshot:
+        """Return the cached snapshot, reloading it if a writer changed the index."""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+            generation = int(row[0]) if row else 0
+            if self._snapshot is not None and self._snapshot.generation == generation:
+                return self._snapshot
+
+            self._conn.execute("BEGIN")
+            try:
+                meta = self._meta()
+                records = self._conn.execute("SELECT row, id, metadata FROM chunks").fetchall()
+            finally:
+                self._conn.execute("COMMIT")
+            generation = int(meta.get("generation", 0))
+            num_rows = int(meta.get("next_row", 0))
+            row_ids: List[Optional[str]] = [None] * num_rows
+            row_metadatas: List[Optional[Dict]] = [None] * num_rows
+            for row, id_, metadata in records:
+                row_ids[row] = id_
+                row_metadatas[row] = json.loads(metadata) if metadata else {}
+
+            matrix = codes = codebook = None
+            if num_rows:
+                dim = int(meta["dim"])
+                matrix = np.memmap(self._vector_path(meta), dtype=np.float32, mode="r", shape=(num_rows, dim))
+                if "code_file" in meta:
+                    code_path = os.path.join(self.persist_directory, meta["code_file"])
+                    if "codebook_file" in meta:
+                        codebook = np.load(os.path.join(self.persist_directory, meta["codebook_file"]))
+                        codes = np.memmap(code_path, dtype=np.uint8, mode="r", shape=(num_rows, codebook.shape[0]))
+                    else:
+                        codes = np.memmap(code_path, dtype=np.float16, mode="r", shape=(num_rows, dim))
+            self._snapshot = _Snapshot(generation, matrix, row_ids, row_metadatas, codes, codebook)
+            return self._snapshot
+
+    def _filter_mask(self, snapshot: _Snapshot, where: Optional[Dict]) -> np.ndarray:
+        if not where:
+            return snapshot.valid
+        key = json.dumps(where, sort_keys=True)
+        mask = snapshot.filter_masks.get(key)
+        if mask is None:
+            mask = np.fromiter(
+                (metadata is not None and matches_where(metadata, where) for metadata in snapshot.row_metadatas),
+                dtype=bool, count=len(snapshot.row_metadatas)
+            )
+            snapshot.filter_masks[key] = mask
+            # A handful of recent filters is enough for repeated agent queries
+            while len(snapshot.filter_masks) > 32:
+                snapshot.filter_masks.popitem(last=False)
+        else:
+            snapshot.filter_masks.move_to_end(key)
+        return mask
+
+    def count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Return the size of the full vectors and of the copy search scans, which is
+        what has to stay resident for fast queries.
+
+        Only vector data is counted. The IDs and metadata dictionaries that every
+        snapshot keeps in memory are excluded; they are the same for all encodings
+        and often larger than compressed vectors, so compression_ratio describes
+        the vectors alone, not the process's total memory.
+        """
+        snapshot = self._current_snapshot()
+        rows = 0 if snapshot.matrix is None else snapshot.matrix.shape[0]
+        full_bytes = 0 if snapshot.matrix is None else snapshot.matrix.nbytes
+        scanned = snapshot.codes if snapshot.codes is not None else snapshot.matrix
+        scanned_bytes = 0 if scanned is None else scanned.nbytes
+        if snapshot.codebook is not None:
+            scanned_bytes += snapshot.codebook.nbytes
+        return {
+            "encoding": self.encoding,
+            "rows": rows,
+            "full_bytes": full_bytes,
+            "scanned_bytes": scanned_bytes,
+            "compression_ratio": round(full_bytes / scanned_bytes, 2) if scanned_bytes else None,
+        }
+
+    def _approximate_scores(self, snapshot: _Snapshot, queries: np.ndarray) -> np.ndarray:
+        """Inner products of every row's compressed vector with each query, shape (rows, queries)."""
+        codes = snapshot.codes
+        if snapshot.codebook is None:
+            # NumPy has no fast float16 matrix product, so convert block by block
+            scores = np.empty((len(codes), len(queries)), dtype=np.float32)
+            for start in range(0, len(codes), SCAN_BLOCK_ROWS):
+                block = np.asarray(codes[start:start + SCAN_BLOCK_ROWS], dtype=np.float32)
+                scores[start:start + len(block)] = block @ queries.T
+            return scores
+        centroids = snapshot.codebook.shape[1]
+        return np.stack(
+            [pq_scores(codes, pq_lookup_table(query, snapshot.codebook), centroids) for query in queries], axis=1
+        )
+
+    def _documents_for_ids(self, ids: Sequence[str]) -> Dict[str, Document]:
+        docs = {}
+        conn = self._reader()
+        for start in range(0, len(ids), 500):
+            part = list(ids[start:start + 500])
+            placeholders = ",".join("?" * len(part))
+            for id_, text, metadata in conn.execute(
+                f"SELECT id, document, metadata FROM chunks WHERE id IN ({placeholders})", part
+            ).fetchall():
+                docs[id_] = Document(page_content=text, metadata=json.loads(metadata) if metadata else {}, id=id_)
+        return docs
+
+    def search_rows(self, embeddings: Sequence[Sequence[float]], k: int = 4,
+                    where: Optional[Dict] = None) -> List[List[tuple]]:
+        """
+        Top-k cosine search for a batch of query embeddings: exact over all rows,
+        or over a shortlist chosen on the compressed vectors.
+
+        Args:
+            embeddings: Query embeddings
+            k: Number of results per query
+            where: Optional Chroma-style metadata filter
+
+        Returns:
+            For each query, a list of (chunk ID, cosine similarity) pairs, best first
+        """
+        snapshot = self._current_snapshot()
+        if snapshot.matrix is None or not len(embeddings):
+            return [[] for _ in embeddings]
+
+        queries = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms == 0, 1, norms)
+
+        mask = self._filter_mask(snapshot, where)
+        candidates = int(mask.sum())
+        top = min(k, candidates)
+        if snapshot.codes is not None:
+            return self._search_compressed(snapshot, queries, mask, top, candidates)
+
+        scores = snapshot.matrix @ queries.T
+        scores[~mask] = -np.inf
+
+        results = []
+        for column in range(queries.shape[0]):
+            column_scores = scores[:, column]
+            if not top:
+                results.append([])
+                continue
+            best = np.argpartition(-column_scores, top - 1)[:top]
+            best = best[np.argsort(-column_scores[best], kind="stable")]
+            results.append([(snapshot.row_ids[row], float(column_scores[row])) for row in best])
+        return results
+
+    def _search_compressed(self, snapshot: _Snapshot, queries: np.ndarray, mask: np.ndarray,
+                           top: int, candidates: int) -> List[List[tuple]]:
+        """Shortlist on the compressed vectors, then re-rank on the full ones."""
+        if not top:
+            return [[] for _ in queries]
+        approximate = self._approximate_scores(snapshot, queries)
+        approximate[~mask] = -np.inf
+        shortlist_size = min(candidates, top * self.rerank_factor)
+
+        results = []
+        for column, query in enumerate(queries):
+            column_scores = approximate[:, column]
+            # Sorted rows read the full-vector file sequentially
+            shortlist = np.sort(np.argpartition(-column_scores, shortlist_size - 1)[:shortlist_size])
+            exact = np.asarray(snapshot.matrix[shortlist]) @ query
+            best = np.argsort(-exact, kind="stable")[:top]
+            results.append([(snapshot.row_ids[shortlist[i]], float(exact[i])) for i in best])
+        return results
+
+    def similarity_search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int = 4,
+                                     filter: Optional[Dict] = None) -> List[List[Document]]:
+        """
+        Batched search: one list of document chunks per query embedding.
+        """
+        hits = self.search_rows(embeddings, k=k, where=filter)
+        docs = self._documents_for_ids(list({id_ for query_hits in hits for id_, _ in query_hits}))
+        return [[docs[id_] for id_, _ in query_hits if id_ in docs] for query_hits in hits]
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4,
+                                    filter: Optional[Dict] = None) -> List[Document]:
+        return self.similarity_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k=k, filter=filter)
+
+    def get(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Chroma-compatible get: chunks by ID and/or metadata filter, in row order.
+
+        Returns:
+            Dictionary with "ids", "documents", "metadatas" and, if requested, "embeddings"
+        """
+        include = include if include is not None else ["metadatas", "documents"]
+        query = "SELECT id, row, document, metadata FROM chunks"
+        params: List[Any] = []
+        if ids is not None:
+            ids = list(ids)
+            if not ids:
+                return {"ids": [], "documents": [], "metadatas": [], "embeddings": None}
+            query += f" WHERE id IN ({','.join('?' * len(ids))})"
+            params.extend(ids)
+        query += " ORDER BY row"
+        if not where and limit is not None:
+            query += " LIMIT ? OFFSET ?"
+            params.extend([limit, offset or 0])
+
+        conn = self._reader()
+        while True:
+            # Row numbers are only valid in the generation they were read in
+            conn.execute("BEGIN")
+            try:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+                generation = int(row[0]) if row else 0
+                raw_records = conn.execute(query, params).fetchall()
+            finally:
+                conn.execute("COMMIT")
+            snapshot = self._current_snapshot() if "embeddings" in include and raw_records else None
+            if snapshot is None or snapshot.generation == generation:
+                break
+
+        records = [
+            (id_, row, text, json.loads(metadata) if metadata else {})
+            for id_, row, text, metadata in raw_records
+        ]
+        if where:
+            records = [record for record in records if matches_where(record[3], where)]
+            if limit is not None:
+                records = records[offset or 0:(offset or 0) + limit]
+
+        embeddings = None
+        if snapshot is not None and records:
+            embeddings = [snapshot.matrix[row].tolist() for _, row, _, _ in records]
+        return {
+            "ids": [record[0] for record in records],
+            "documents": [record[2] for record in records] if "documents" in include else None,
+            "metadatas": [record[3] for record in records] if "metadatas" in include else None,
+            "embeddings": embeddings,
+        }
+
+    def get_by_ids(self, ids: Sequence[str]) -> List[Document]:
+        return list(self._documents_for_ids(list(ids)).values())
+
+    # Writing
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]) -> None:
+        """
+        Add or replace chunks with precomputed embeddings.
+        """
+        if not ids:
+            return
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                meta = self._meta()
+                dim = int(meta.get("dim", vectors.shape[1]))
+                if vectors.shape[1] != dim:
+                    raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {dim}")
+                next_row = int(meta.get("next_row", 0))
+
+                # Replaced chunks get fresh rows too: readers may still map the old
+                # ones, and a rollback cannot undo writes to the file
+                rows = []
+                assigned: Dict[str, int] = {}
+                for id_ in ids:
+                    if id_ not in assigned:
+                        assigned[id_] = next_row
+                        next_row += 1
+                    rows.append(assigned[id_])
+
+                path = self._vector_path(meta)
+                self._write_rows(path, rows, vectors)
+                code_values = {}
+                code_path = self._code_path(meta)
+                if code_path is not None:
+                    if "codebook_file" in meta:
+                        codebook = np.load(os.path.join(self.persist_directory, meta["codebook_file"]))
+                        self._write_rows(code_path, rows, pq_encode(vectors, codebook))
+                    else:
+                        self._write_rows(code_path, rows, vectors.astype(np.float16))
+                    code_values["code_file"] = os.path.basename(code_path)
+
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO chunks (id, row, document, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (id_, row, text, json.dumps(metadata or {}))
+                        for id_, row, text, metadata in zip(ids, rows, documents, metadatas)
+                    ]
+                )
+                self._set_meta(
+                    dim=dim, next_row=next_row, generation=int(meta.get("generation", 0)) + 1,
+                    vector_file=os.path.basename(path), encoding=self.encoding, **code_values
+                )
+                live_rows = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if (next_row - live_rows) / next_row >= COMPACT_DELETED_RATIO:
+            self.compact()
+        if self._needs_training(meta, live_rows):
+            self.train_quantizer()
+        elif meta.get("replaced_files", "[]") != "[]":
+            self._remove_replaced_files()
+
+    def _needs_training(self, meta: Dict[str, str], live_rows: int) -> bool:
+        """Whether a "pq" index should (re)train its codebook after a write."""
+        if self.encoding != "pq" or self._train_lock.locked():
+            return False
+        if "codebook_file" not in meta:
+            return live_rows >= PQ_TRAIN_MIN_ROWS
+        trained_rows = max(int(meta.get("trained_rows", 0)), PQ_TRAIN_MIN_ROWS)
+        return live_rows >= PQ_RETRAIN_GROWTH * trained_rows
+
+    @staticmethod
+    def _encode_rows(vector_path: str, code_path: str, codebook: np.ndarray, dim: int, start: int, stop: int) -> None:
+        """Write the PQ codes of rows start..stop-1 of a vector file into a code file."""
+        if stop <= start:
+            return
+        matrix = np.memmap(vector_path, dtype=np.float32, mode="r", shape=(stop, dim))
+        with open(code_path, "r+b" if start else "wb") as f:
+            f.seek(start * codebook.shape[0])
+            for block in range(start, stop, SCAN_BLOCK_ROWS):
+                f.write(pq_encode(matrix[block:min(block + SCAN_BLOCK_ROWS, stop)], codebook).tobytes())
+
+    def train_quantizer(self) -> None:
+        """
+        Train the product-quantization codebook on the stored vectors and encode
+        every row with it. Runs automatically once a "pq" index reaches
+        PQ_TRAIN_MIN_ROWS chunks, and again whenever it has grown by
+        PQ_RETRAIN_GROWTH since the last training.
+
+        Training and encoding run without the store lock, so searches and writes
+        continue meanwhile; rows written in the meantime are encoded before the
+        new codebook replaces the old one.
+        """
+        with self._train_lock:
+            with self._lock:
+                self._conn.execute("BEGIN")
+                try:
+                    meta = self._meta()
+                    live_rows = [row for (row,) in self._conn.execute("SELECT row FROM chunks ORDER BY row").fetchall()]
+                finally:
+                    self._conn.execute("COMMIT")
+            num_rows = int(meta.get("next_row", 0))
+            if not live_rows:
+                return
+            dim = int(meta["dim"])
+            vector_path = self._vector_path(meta)
+            # Read only the sampled rows from the memmap, never every live vector
+            sample = np.asarray(live_rows)
+            if len(sample) > PQ_TRAIN_SAMPLE_ROWS:
+                sample = np.sort(np.random.default_rng(0).choice(sample, PQ_TRAIN_SAMPLE_ROWS, replace=False))
+            matrix = np.memmap(vector_path, dtype=np.float32, mode="r", shape=(num_rows, dim))
+            codebook = train_pq_codebook(matrix[sample])
+            del matrix
+
+            token = uuid.uuid4().hex[:8]
+            codebook_file = f"numpy_pq_codebook.{token}.npy"
+            code_file = f"numpy_codes.{token}.pq"
+            code_path = os.path.join(self.persist_directory, code_file)
+            try:
+                np.save(os.path.join(self.persist_directory, codebook_file), codebook)
+                encoded = 0
+                while True:
+                    self._encode_rows(vector_path, code_path, codebook, dim, encoded, num_rows)
+                    encoded = num_rows
+                    with self._lock:
+                        self._conn.execute("BEGIN IMMEDIATE")
+                        try:
+                            meta = self._meta()
+                            num_rows = int(meta["next_row"])
+                            swapped = self._vector_path(meta) == vector_path
+                            if swapped:
+                                # Rows written while encoding; usually few
+                                self._encode_rows(vector_path, code_path, codebook, dim, encoded, num_rows)
+                                old_files = [meta[key] for key in ("code_file", "codebook_file") if key in meta]
+                                trained_rows = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+                                self._set_meta(
+                                    generation=int(meta.get("generation", 0)) + 1, code_file=code_file,
+                                    codebook_file=codebook_file, trained_rows=trained_rows
+                                )
+                            self._conn.execute("COMMIT")
+                        except BaseException:
+                            self._conn.execute("ROLLBACK")
+                            raise
+                        if swapped:
+                            self._snapshot = None
+                            break
+                    # Compaction renumbered the rows: encode the new vector file from the start
+                    vector_path = self._vector_path(meta)
+                    encoded = 0
+            except BaseException:
+                for name in (codebook_file, code_file):
+                    try:
+                        os.remove(os.path.join(self.persist_directory, name))
+                    except OSError:
+                        pass
+                raise
+        self._remove_replaced_files(old_files)
+        logger.info(
+            f"Trained {codebook.shape[0]}x{codebook.shape[1]} PQ codebook on {len(sample)} of {len(live_rows)} rows "
+            f"in {self.persist_directory}"
+        )
+
+    def add_documents(self, documents: List[Document], ids: List[str]) -> List[str]:
+        """
+        Embed and add or replace document chunks.
+        """
+        embeddings = self.embedding_function.embed_documents([doc.page_content for doc in documents])
+        self.upsert(ids, embeddings, [doc.metadata for doc in documents], [doc.page_content for doc in documents])
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete chunks by ID, compacting the vector file when enough rows are dead.
+        """
+        if not ids:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for start in range(0, len(ids), 500):
+                    part = ids[start:start + 500]
+                    self._conn.execute(f"DELETE FROM chunks WHERE id IN ({','.join('?' * len(part))})", part)
+                meta = self._meta()
+                self._set_meta(generation=int(meta.get("generation", 0)) + 1)
+                num_rows = int(meta.get("next_row", 0))
+                live_rows = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+        if num_rows and (num_rows - live_rows) / num_rows >= COMPACT_DELETED_RATIO:
+            self.compact()
+
+    def compact(self) -> None:
+        """
+        Copy live rows into a new vector file and drop the old one. Readers holding
+        the old file keep a valid mapping until they notice the new generation.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                meta = self._meta()
+                if "dim" not in meta:
+                    self._conn.execute("COMMIT")
+                    return
+                dim = int(meta["dim"])
+                generation = int(meta.get("generation", 0)) + 1
+                old_path = self._vector_path(meta)
+                new_file = f"numpy_vectors.{generation}.f32"
+                records = self._conn.execute("SELECT id, row FROM chunks ORDER BY row").fetchall()
+
+                # The full vectors and their compressed copy keep the same row order
+                copies = [(old_path, os.path.join(self.persist_directory, new_file), dim * 4)]
+                new_values = {"vector_file": new_file}
+                old_code_path = self._code_path(meta) if "code_file" in meta else None
+                if old_code_path is not None:
+                    extension = meta["code_file"].rsplit(".", 1)[-1]
+                    new_values["code_file"] = f"numpy_codes.{generation}.{extension}"
+                    code_row_bytes = (
+                        np.load(os.path.join(self.persist_directory, meta["codebook_file"])).shape[0]
+                        if "codebook_file" in meta else dim * 2
+                    )
+                    copies.append((
+                        old_code_path, os.path.join(self.persist_directory, new_values["code_file"]), code_row_bytes
+                    ))
+                for source_path, target_path, row_bytes in copies:
+                    with open(source_path, "rb") as source, open(target_path, "wb") as target:
+                        for _, row in records:
+                            source.seek(row * row_bytes)
+                            target.write(source.read(row_bytes))
+
+                self._conn.executemany(
+                    "UPDATE chunks SET row = ? WHERE id = ?",
+                    [(new_row, id_) for new_row, (id_, _) in enumerate(records)]
+                )
+                self._set_meta(next_row=len(records), generation=generation, **new_values)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._snapshot = None
+        self._remove_replaced_files([os.path.basename(source_path) for source_path, _, _ in copies])
+        logger.info(f"Compacted vector file in {self.persist_directory} to {len(records)} rows")
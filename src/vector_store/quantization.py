@@ -0,0 +1,126 @@
+from typing import Optional
+
+import numpy as np
+
+# Centroids per sub-vector, so each code is one byte
+PQ_CENTROIDS = 256
+# Lloyd iterations and maximum rows used when training a codebook
+PQ_TRAIN_ITERATIONS = 15
+PQ_TRAIN_SAMPLE_ROWS = 16384
+# Rows encoded or scored at a time, bounding temporary memory
+PQ_BLOCK_ROWS = 16384
+
+
+def default_pq_subvectors(dim: int) -> int:
+    """
+    Return the number of sub-vectors for a dimension: the largest divisor of dim
+    that is at most dim / 16, e.g. 96 one-byte codes for a 1536-dimensional
+    embedding (64x smaller than float32).
+    """
+    for subvectors in range(max(1, dim // 16), 0, -1):
+        if dim % subvectors == 0:
+            return subvectors
+    return 1
+
+
+def _nearest_centroids(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Index of the closest centroid for each row (squared L2)."""
+    distances = (centroids ** 2).sum(axis=1) - 2 * vectors @ centroids.T
+    return distances.argmin(axis=1)
+
+
+def _kmeans(vectors: np.ndarray, clusters: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Lloyd's k-means; empty clusters keep their previous centroid."""
+    centroids = vectors[rng.choice(len(vectors), clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest_centroids(vectors, centroids)
+        counts = np.bincount(assignment, minlength=clusters)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, vectors)
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+    return centroids
+
+
+def train_pq_codebook(vectors: np.ndarray, subvectors: Optional[int] = None,
+                      iterations: int = PQ_TRAIN_ITERATIONS, seed: int = 0) -> np.ndarray:
+    """
+    Train a product-quantization codebook.
+
+    Each vector is cut into subvectors equal slices and every slice is replaced
+    by the nearest of PQ_CENTROIDS centroids learned by k-means on that slice.
+
+    Args:
+        vectors: Training vectors, shape (rows, dim); at most PQ_TRAIN_SAMPLE_ROWS are used
+        subvectors: Number of slices, must divide dim (defaults to default_pq_subvectors)
+        iterations: k-means iterations per slice
+        seed: Random seed for sampling and initialisation
+
+    Returns:
+        Codebook of shape (subvectors, centroids, dim / subvectors)
+    """
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    rows, dim = vectors.shape
+    subvectors = subvectors or default_pq_subvectors(dim)
+    if dim % subvectors:
+        raise ValueError(f"{subvectors} sub-vectors do not divide dimension {dim}")
+    if rows > PQ_TRAIN_SAMPLE_ROWS:
+        vectors = vectors[np.sort(rng.choice(rows, PQ_TRAIN_SAMPLE_ROWS, replace=False))]
+    clusters = min(PQ_CENTROIDS, len(vectors))
+    slices = vectors.reshape(len(vectors), subvectors, dim // subvectors)
+    return np.stack([
+        _kmeans(np.ascontiguousarray(slices[:, index]), clusters, iterations, rng)
+        for index in range(subvectors)
+    ])
+
+
+def pq_encode(vectors: np.ndarray, codebook: np.ndarray) -> np.ndarray:
+    """
+    Encode vectors with a codebook from train_pq_codebook.
+
+    Returns:
+        uint8 codes of shape (rows, subvectors)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    subvectors, _, width = codebook.shape
+    codes = np.empty((len(vectors), subvectors), dtype=np.uint8)
+    for start in range(0, len(vectors), PQ_BLOCK_ROWS):
+        block = vectors[start:start + PQ_BLOCK_ROWS].reshape(-1, subvectors, width)
+        for index in range(subvectors):
+            codes[start:start + len(block), index] = _nearest_centroids(block[:, index], codebook[index])
+    return codes
+
+
+def pq_lookup_table(query: np.ndarray, codebook: np.ndarray) -> np.ndarray:
+    """
+    Inner products between each query slice and every centroid of that slice,
+    flattened so pq_scores can gather them with one indexing operation.
+
+    Returns:
+        Array of shape (subvectors * centroids,)
+    """
+    subvectors, _, width = codebook.shape
+    slices = np.asarray(query, dtype=np.float32).reshape(subvectors, 1, width)
+    return (codebook * slices).sum(axis=2).ravel()
+
+
+def pq_scores(codes: np.ndarray, table: np.ndarray, centroids: int) -> np.ndarray:
+    """
+    Approximate inner products of a query with encoded vectors (asymmetric
+    distance computation: the query stays uncompressed).
+
+    Args:
+        codes: uint8 codes, shape (rows, subvectors)
+        table: Output of pq_lookup_table for the query
+        centroids: Centroids per sub-vector in the codebook
+
+    Returns:
+        float32 scores, shape (rows,)
+    """
+    offsets = np.arange(codes.shape[1], dtype=np.intp) * centroids
+    scores = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), PQ_BLOCK_ROWS):
+        block = codes[start:start + PQ_BLOCK_ROWS]
+        scores[start:start + len(block)] = table[block.astype(np.intp) + offsets].sum(axis=1)
+    return scores
@@ -0,0 +1,131 @@
+from typing import Any, Dict, Hashable, List, Tuple
+import asyncio
+import os
+
+from src.utils.lru_cache import LRUTTLCache
+from src.vector_store.embedding_cache import normalize_text
+
+# Query vectors never go stale for a given model, so entries only leave by LRU
+_query_vectors = LRUTTLCache(
+    maxsize=int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "4096")),
+    ttl=float("inf")
+)
+
+# Embedding requests in progress per event loop, so concurrent coroutines asking
+# for the same query await one request
+_async_flights: Dict[Tuple[int, Hashable], asyncio.Task] = {}
+
+
+def embedder_model(embedder) -> str:
+    """
+    Return the name identifying an embedder's vector space.
+    """
+    return getattr(embedder, "model", None) or type(embedder).__name__
+
+
+def embed_query_cached(embedder, query: str) -> List[float]:
+    """
+    Embed a search query through the process-wide in-memory query-vector cache.
+
+    The cache is keyed by model and normalised query text only, so the same query
+    issued with a different k, search mode or from a different caller (search tool,
+    process_crew) reuses one embedding. Concurrent misses on one query share a single
+    embedding request.
+
+    Args:
+        embedder: LangChain embeddings object
+        query: The search query
+
+    Returns:
+        Query embedding
+    """
+    key = (embedder_model(embedder), normalize_text(query))
+    return _query_vectors.get_or_compute(key, lambda: embedder.embed_query(query))
+
+
+async def aembed_query_cached(embedder, query: str) -> List[float]:
+    """
+    Async version of embed_query_cached using the embedder's async client.
+
+    Cancelling the caller does not cancel a request other coroutines are waiting
+    on; its result is still cached when it completes.
+
+    Args:
+        embedder: LangChain embeddings object
+        query: The search query
+
+    Returns:
+        Query embedding
+    """
+    key = (embedder_model(embedder), normalize_text(query))
+    vector = _query_vectors.get(key)
+    if vector is not None:
+        return vector
+
+    loop = asyncio.get_running_loop()
+    flight_key = (id(loop), key)
+    task = _async_flights.get(flight_key)
+    if task is None:
+        task = loop.create_task(embedder.aembed_query(query))
+        _async_flights[flight_key] = task
+
+        def finish(done: asyncio.Task) -> None:
+            _async_flights.pop(flight_key, None)
+            if not done.cancelled() and done.exception() is None:
+                _query_vectors.set(key, done.result())
+
+        task.add_done_callback(finish)
+    return await asyncio.shield(task)
+
+
+def embed_queries_cached(embedder, queries: List[str]) -> List[List[float]]:
+    """
+    Embed several search queries, sending every query missing from the
+    query-vector cache in one batched embedding request.
+
+    Args:
+        embedder: LangChain embeddings object
+        queries: The search queries
+
+    Returns:
+        One embedding per query, in order
+    """
+    model = embedder_model(embedder)
+    keys = [(model, normalize_text(query)) for query in queries]
+    vectors = [_query_vectors.get(key) for key in keys]
+    missing: Dict = {}
+    for key, query, vector in zip(keys, queries, vectors):
+        if vector is None:
+            missing.setdefault(key, query)
+    if missing:
+        # OpenAI returns the same vector for a text from either endpoint
+        computed = dict(zip(missing, embedder.embed_documents(list(missing.values()))))
+        for key, vector in computed.items():
+            _query_vectors.set(key, vector)
+        vectors = [vector if vector is not None else computed[key] for key, vector in zip(keys, vectors)]
+    return vectors
+
+
+async def aembed_queries_cached(embedder, queries: List[str]) -> List[List[float]]:
+    """
+    Async version of embed_queries_cached: one batched request through the
+    embedder's async client for every query missing from the cache.
+    """
+    model = embedder_model(embedder)
+    keys = [(model, normalize_text(query)) for query in queries]
+    vectors = [_query_vectors.get(key) for key in keys]
+    missing: Dict = {}
+    for key, query, vector in zip(keys, queries, vectors):
+        if vector is None:
+            missing.setdefault(key, query)
+    if missing:
+        computed = dict(zip(missing, await embedder.aembed_documents(list(missing.values()))))
+        for key, vector in computed.items():
+            _query_vectors.set(key, vector)
+        vectors = [vector if vector is not None else computed[key] for key, vector in zip(keys, vectors)]
+    return vectors
+
+
+def get_query_embedding_cache_stats() -> Dict[str, Any]:
+    """Return hit/miss, eviction and size counters of the query-vector cache."""
+    return _query_vectors.stats()
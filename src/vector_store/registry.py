@@ -0,0 +1,205 @@
+from langchain_core.embeddings import Embeddings
+from langchain_openai import OpenAIEmbeddings
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import threading
+
+import httpx
+import openai
+
+from src.vector_store.embedding_cache import with_embedding_cache
+from src.vector_store.store_builder import VectorStoreBuilder
+from src.vector_store.generations import index_write_version, resolve_storage_path
+from src.vector_store.section_store import SectionStore
+
+logger = logging.getLogger(__name__)
+
+# Keep-alive connection pool of the shared embedding client
+EMBEDDING_HTTP_MAX_CONNECTIONS = 20
+EMBEDDING_HTTP_KEEPALIVE_CONNECTIONS = 10
+
+_embedders: Dict[str, Embeddings] = {}
+_stores: Dict[Tuple[str, str], VectorStoreBuilder] = {}
+_section_stores: Dict[str, SectionStore] = {}
+# Searches running on each shared store, and replaced stores waiting for theirs to finish
+_leases: Dict[VectorStoreBuilder, int] = {}
+_retired: List[VectorStoreBuilder] = []
+_registry_lock = threading.Lock()
+
+
+def get_shared_embedder(model: Optional[str] = None) -> Embeddings:
+    """
+    Return the process-wide embedder for a model, creating it on first use.
+
+    The embedder wraps one OpenAI client whose HTTP connection pool is kept
+    alive between calls and is safe to use from several threads, so searches
+    skip connection setup and TLS handshakes after the first request.
+
+    Args:
+        model: OpenAI embedding model (defaults to the OpenAIEmbeddings default)
+
+    Returns:
+        Embedder wrapped with the on-disk embedding cache
+    """
+    key = model or ""
+    with _registry_lock:
+        embedder = _embedders.get(key)
+        if embedder is None:
+            max_connections = int(os.getenv("EMBEDDING_HTTP_MAX_CONNECTIONS", EMBEDDING_HTTP_MAX_CONNECTIONS))
+            http_client = openai.DefaultHttpxClient(limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=min(max_connections, EMBEDDING_HTTP_KEEPALIVE_CONNECTIONS)
+            ))
+            options = {"model": model} if model else {}
+            embedder = with_embedding_cache(OpenAIEmbeddings(http_client=http_client, **options))
+            _embedders[key] = embedder
+        return embedder
+
+
+def get_shared_store(storage_path: str = "_vector_db", backend: Optional[str] = None) -> VectorStoreBuilder:
+    """
+    Return the process-wide, already loaded store handle for a storage path.
+
+    The persistent store is opened once and reused by every caller in the
+    process instead of being reopened from disk on each search. Chroma clients
+    and NumpyVectorStore are safe to query from several threads. When a rebuild
+    publishes a new index generation, the next call opens it. A Chroma store is
+    also reopened after another process (the watcher, an upload) has written to
+    it, because its HNSW index does not pick up those writes.
+
+    The replaced handle is closed as soon as no lease_shared_store() holds it,
+    so searches must use a lease rather than keep the returned store.
+
+    Args:
+        storage_path: Root directory of the vector store
+        backend: "chroma" or "numpy" (defaults to VECTOR_STORE_BACKEND)
+
+    Returns:
+        VectorStoreBuilder with its vector store loaded, using the shared embedder
+    """
+    backend = backend or os.getenv("VECTOR_STORE_BACKEND", "chroma")
+    key = (os.path.abspath(storage_path), backend)
+    index_path = resolve_storage_path(storage_path)
+    with _registry_lock:
+        store = _stores.get(key)
+    if store is not None and _is_current(store, index_path):
+        return store
+
+    embedder = get_shared_embedder()
+    idle = []
+    with _registry_lock:
+        # Another thread may have opened it while the lock was released
+        store = _stores.get(key)
+        if store is None or not _is_current(store, index_path):
+            if store is not None:
+                idle = _retire(store, index_path)
+            store = VectorStoreBuilder(storage_path=index_path, embedder=embedder, backend=backend)
+            store.load()
+            _stores[key] = store
+            logger.info(f"Opened shared {backend} vector store at {index_path}")
+    _close(idle)
+    return store
+
+
+@contextmanager
+def lease_shared_store(storage_path: str = "_vector_db", backend: Optional[str] = None) -> Iterator[VectorStoreBuilder]:
+    """
+    Hold the shared store of a storage path for the duration of a search.
+
+    A store replaced by a newer generation or a reopen stays open until its last
+    lease ends, and is closed then.
+
+    Args:
+        storage_path: Root directory of the vector store
+        backend: "chroma" or "numpy" (defaults to VECTOR_STORE_BACKEND)
+
+    Yields:
+        The live VectorStoreBuilder, as returned by get_shared_store()
+    """
+    while True:
+        store = get_shared_store(storage_path, backend)
+        with _registry_lock:
+            # Unless it was replaced (and possibly closed) in the meantime
+            if store not in _retired and store in _stores.values():
+                _leases[store] = _leases.get(store, 0) + 1
+                break
+    try:
+        yield store
+    finally:
+        idle = []
+        with _registry_lock:
+            _leases[store] -= 1
+            if not _leases[store]:
+                del _leases[store]
+                if store in _retired:
+                    _retired.remove(store)
+                    idle = [store]
+        _close(idle)
+
+
+def get_shared_section_store(index_path: str) -> SectionStore:
+    """
+    Return the process-wide SectionStore of an index generation directory
+    (the storage_path of a shared store).
+    """
+    key = os.path.abspath(index_path)
+    with _registry_lock:
+        section_store = _section_stores.get(key)
+        if section_store is None:
+            section_store = _section_stores[key] = SectionStore(index_path)
+        return section_store
+
+
+def _retire(store: VectorStoreBuilder, live_path: Optional[str] = None) -> List[VectorStoreBuilder]:
+    """
+    Take a replaced store out of use; called with _registry_lock held. The
+    section store of its generation is dropped unless live_path is the same.
+
+    Returns:
+        The store if no lease holds it, to be closed after releasing the lock
+    """
+    # Stores opened from now on load the index from disk
+    store.detach()
+    in_use = {os.path.abspath(other.storage_path) for other in _stores.values() if other is not store}
+    if live_path:
+        in_use.add(os.path.abspath(live_path))
+    path = os.path.abspath(store.storage_path)
+    if path not in in_use:
+        _section_stores.pop(path, None)
+    if _leases.get(store):
+        _retired.append(store)
+        return []
+    return [store]
+
+
+def _close(stores: List[VectorStoreBuilder]) -> None:
+    for store in stores:
+        try:
+            store.close()
+            logger.info(f"Closed replaced {store.backend} vector store at {store.storage_path}")
+        except Exception as e:
+            logger.warning(f"Error closing vector store at {store.storage_path}: {e}")
+
+
+def _is_current(store: VectorStoreBuilder, index_path: str) -> bool:
+    """Whether a shared store still shows the live generation with every write to it."""
+    if store.storage_path != index_path:
+        return False
+    # NumpyVectorStore notices new writes itself
+    return store.backend != "chroma" or store.write_version == index_write_version(index_path)
+
+
+def release_shared_store(storage_path: str, backend: Optional[str] = None) -> None:
+    """
+    Drop the shared handle for a storage path, e.g. after the store was deleted
+    or rebuilt in place. The next get_shared_store() call reopens it.
+    """
+    backend = backend or os.getenv("VECTOR_STORE_BACKEND", "chroma")
+    idle = []
+    with _registry_lock:
+        store = _stores.pop((os.path.abspath(storage_path), backend), None)
+        if store is not None:
+            idle = _retire(store)
+    _close(idle)
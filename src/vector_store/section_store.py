@@ -0,0 +1,217 @@
+from langchain.schema.document import Document
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import os
+import sqlite3
+import threading
+import zlib
+
+SECTION_STORE_FILENAME = "sections.sqlite"
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_BATCH_SIZE = 500
+
+# Bumped (PRAGMA user_version) when stored data needs migrating
+_SCHEMA_VERSION = 1
+
+
+def _section_titles(section: Document) -> Set[str]:
+    """Header titles of a section, from its Level metadata or else its header path."""
+    titles = {section.metadata.get(f"Level {level}") for level in range(1, 5)} - {None, ""}
+    if not titles and section.metadata.get("header_path"):
+        titles = set(section.metadata["header_path"].split(" > "))
+    return titles
+
+
+class SectionStore:
+    """
+    Compact store of the full header sections that chunks were split from.
+
+    Each section is stored once under its parent_id (see parent_section_id) with
+    zlib-compressed text, next to the vector store in storage_path. Search can then
+    match on small chunks and return the enclosing sections ("small-to-big").
+    Sections are replaced per source file, so re-indexing a file never leaves
+    sections of its old version behind. The header titles of the stored sections
+    are kept in their own table in the same transactions, so search can recognise
+    section names in queries without scanning the vector store.
+    """
+    def __init__(self, storage_path: str):
+        self.storage_path = storage_path
+        os.makedirs(storage_path, exist_ok=True)
+        self._lock = threading.Lock()
+        # (SQLite data_version, titles) of the last titles() read
+        self._titles = None
+        self._conn = sqlite3.connect(
+            os.path.join(storage_path, SECTION_STORE_FILENAME),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self._conn.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS sections (id TEXT PRIMARY KEY, source TEXT, header_path TEXT, text BLOB);
+            CREATE INDEX IF NOT EXISTS sections_source ON sections (source);
+            CREATE TABLE IF NOT EXISTS section_titles (source TEXT, title TEXT, PRIMARY KEY (source, title));
+            CREATE INDEX IF NOT EXISTS section_titles_title ON section_titles (title);
+            """
+        )
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """Fill in the titles of sections stored before titles were tracked."""
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= _SCHEMA_VERSION:
+            return
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < _SCHEMA_VERSION:
+                rows = set()
+                for source, headers in self._conn.execute("SELECT source, header_path FROM sections"):
+                    rows.update((source, title) for title in (headers or "").split(" > ") if title)
+                self._conn.executemany("INSERT OR IGNORE INTO section_titles (source, title) VALUES (?, ?)", rows)
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sections").fetchone()[0]
+
+    def replace_documents(self, sections: Sequence[Document], sources: Optional[Iterable[str]] = None) -> None:
+        """
+        Store sections, first removing every stored section of their sources.
+
+        Args:
+            sections: Section documents with "parent_id", "source" and "header_path"
+                metadata, as produced by MarkdownProcessor.parent_sections()
+            sources: Source files being replaced, including any that no longer
+                have sections (defaults to the sources of the sections)
+        """
+        sources = sorted(set(sources or ()) | {section.metadata.get("source", "unknown") for section in sections})
+        rows = [
+            (
+                section.metadata["parent_id"],
+                section.metadata.get("source", "unknown"),
+                section.metadata.get("header_path", ""),
+                zlib.compress(section.page_content.encode("utf-8"))
+            )
+            for section in sections
+        ]
+        titles = {
+            (section.metadata.get("source", "unknown"), title)
+            for section in sections for title in _section_titles(section)
+        }
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_sources(sources)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO sections (id, source, header_path, text) VALUES (?, ?, ?, ?)", rows
+                )
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO section_titles (source, title) VALUES (?, ?)", titles
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def remove_sources(self, sources: Iterable[str]) -> None:
+        """
+        Delete every section of the given source files.
+        """
+        sources = list(sources)
+        if not sources:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete_sources(sources)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _delete_sources(self, sources: List[str]) -> None:
+        """Caller holds the lock inside a transaction."""
+        for start in range(0, len(sources), _QUERY_BATCH_SIZE):
+            part = sources[start:start + _QUERY_BATCH_SIZE]
+            self._conn.execute(f"DELETE FROM sections WHERE source IN ({','.join('?' * len(part))})", part)
+            self._conn.execute(f"DELETE FROM section_titles WHERE source IN ({','.join('?' * len(part))})", part)
+
+    def titles(self) -> Set[str]:
+        """
+        Return the distinct header titles of the stored sections.
+
+        The set is cached and only re-read after this or another process has
+        changed the store.
+        """
+        with self._lock:
+            # data_version only tracks other connections, so count our own commits too
+            version = (self._conn.execute("PRAGMA data_version").fetchone()[0], self._conn.total_changes)
+            if self._titles is None or self._titles[0] != version:
+                self._titles = (
+                    version, {title for (title,) in self._conn.execute("SELECT DISTINCT title FROM section_titles")}
+                )
+            return self._titles[1]
+
+    def get_texts(self, ids: Sequence[str]) -> Dict[str, str]:
+        """
+        Look up section texts.
+
+        Args:
+            ids: parent_id values of the wanted sections
+
+        Returns:
+            Mapping of ID to section text for the IDs that are stored
+        """
+        ids = list(dict.fromkeys(ids))
+        texts: Dict[str, str] = {}
+        with self._lock:
+            for start in range(0, len(ids), _QUERY_BATCH_SIZE):
+                part = ids[start:start + _QUERY_BATCH_SIZE]
+                for id_, text in self._conn.execute(
+                    f"SELECT id, text FROM sections WHERE id IN ({','.join('?' * len(part))})", part
+                ).fetchall():
+                    texts[id_] = zlib.decompress(text).decode("utf-8")
+        return texts
+
+
+def expand_to_sections(docs: Sequence[Document],
+                       section_store: SectionStore) -> Tuple[List[Document], List[List[int]]]:
+    """
+    Replace retrieved chunks with their deduplicated parent sections.
+
+    Each section appears once, at the rank of its best chunk, and keeps that
+    chunk's metadata. Chunks whose section is not in the store (e.g. indexed
+    before sections were recorded) are returned unchanged.
+
+    Args:
+        docs: Retrieved chunks, best first
+        section_store: Store holding the parent sections
+
+    Returns:
+        Tuple of (documents in rank order, for each document the indices of the
+        chunks in docs it covers)
+    """
+    groups: Dict[str, List[int]] = {}
+    for index, doc in enumerate(docs):
+        groups.setdefault(doc.metadata.get("parent_id") or f"chunk:{index}", []).append(index)
+    texts = section_store.get_texts([key for key in groups if not key.startswith("chunk:")])
+
+    results: List[Document] = []
+    covered: List[List[int]] = []
+    for key, indices in groups.items():
+        text = texts.get(key)
+        if text is None:
+            for index in indices:
+                results.append(docs[index])
+                covered.append([index])
+        else:
+            results.append(Document(
+                page_content=text,
+                metadata={**docs[indices[0]].metadata, "matched_chunks": len(indices)}
+            ))
+            covered.append(indices)
+    return results, covered
@@ -0,0 +1,353 @@
+from langchain.schema.document import Document
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import hashlib
+import heapq
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+
+from src.vector_store.numpy_store import NumpyVectorStore
+
+logger = logging.getLogger(__name__)
+
+
+class _CappedResultsFilter(logging.Filter):
+    """Drop Chroma's warning that k exceeds a shard's size, which is routine for small shards."""
+    def filter(self, record: logging.LogRecord) -> bool:
+        return not record.getMessage().startswith("Number of requested results")
+
+
+for _name in ("chromadb.segment.impl.vector.local_persistent_hnsw", "chromadb.segment.impl.vector.local_hnsw"):
+    logging.getLogger(_name).addFilter(_CappedResultsFilter())
+
+# Written into an index directory whose chunks live in shards under SHARDS_DIRNAME
+SHARD_CONFIG_FILENAME = "shards.json"
+SHARDS_DIRNAME = "shards"
+
+# How chunks are assigned to shards: all chunks of a source file always share a
+# shard, so re-indexing a file only writes to that shard
+SHARD_STRATEGIES = ("source", "period", "hash")
+DEFAULT_SHARD_COUNT = 8
+
+# Chunks written to one shard per call (Chroma rejects oversized upserts)
+SHARD_WRITE_BATCH_SIZE = 1000
+
+# Every search queries every shard, and each Chroma shard keeps its own client
+# and files open, so the "source" strategy only suits a modest number of files
+MANY_SHARDS_WARNING = 64
+
+# Shards are searched and written concurrently on this pool
+_shard_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("SHARD_WORKERS", str(os.cpu_count() or 4))),
+    thread_name_prefix="vector-shard"
+)
+
+
+def shard_for(metadata: Dict, strategy: str, num_shards: int = DEFAULT_SHARD_COUNT) -> str:
+    """
+    Return the name of the shard a chunk belongs to.
+
+    Args:
+        metadata: Chunk metadata ("source", and "year" for the period strategy)
+        strategy: "source" (one shard per file), "period" (one shard per year)
+            or "hash" (num_shards shards, files spread by a hash of their path).
+            "source" creates as many shards as files, each searched on every
+            query; use "hash" beyond a few dozen files.
+        num_shards: Number of shards of the hash strategy
+
+    Returns:
+        Shard name, usable as a directory name
+    """
+    source = str(metadata.get("source", "unknown"))
+    if strategy == "hash":
+        return f"hash-{zlib.crc32(source.encode('utf-8')) % num_shards:03d}"
+    if strategy == "period":
+        year = metadata.get("year")
+        return f"year-{year}" if year else "undated"
+    if strategy == "source":
+        stem = re.sub(r"[^A-Za-z0-9_-]+", "-", os.path.splitext(os.path.basename(source))[0]).strip("-")[:40]
+        return f"{stem or 'source'}-{hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]}"
+    raise ValueError(f"Unknown shard strategy '{strategy}', expected one of {SHARD_STRATEGIES}")
+
+
+def read_shard_config(storage_path: str) -> Optional[Dict]:
+    """Return the shard settings of an index, or None if it is not sharded."""
+    try:
+        with open(os.path.join(storage_path, SHARD_CONFIG_FILENAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_shard_config(storage_path: str, strategy: str, num_shards: Optional[int] = None) -> Dict:
+    """
+    Mark an index directory as sharded. Done once, before any chunk is written.
+
+    Returns:
+        The written settings
+    """
+    if strategy not in SHARD_STRATEGIES:
+        raise ValueError(f"Unknown shard strategy '{strategy}', expected one of {SHARD_STRATEGIES}")
+    config = {"strategy": strategy, "num_shards": int(num_shards or DEFAULT_SHARD_COUNT)}
+    os.makedirs(storage_path, exist_ok=True)
+    with open(os.path.join(storage_path, SHARD_CONFIG_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    return config
+
+
+def _collection(store):
+    return getattr(store, "_collection", store)
+
+
+def _scored_search(store, embeddings: Sequence[Sequence[float]], k: int,
+                   where: Optional[Dict]) -> List[List[Tuple[float, Document]]]:
+    """
+    Top-k search of one shard with distances that are comparable across shards
+    of the same backend (lower is better).
+    """
+    if isinstance(store, NumpyVectorStore):
+        ranked = store.search_rows(embeddings, k=k, where=where)
+        docs = store._documents_for_ids([id_ for results in ranked for id_, _ in results])
+        return [[(-score, docs[id_]) for id_, score in results if id_ in docs] for results in ranked]
+
+    # Chroma lowers n_results to the size of a smaller shard itself
+    response = store._collection.query(
+        query_embeddings=[list(embedding) for embedding in embeddings], n_results=k, where=where,
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [
+            (distance, Document(page_content=text, metadata=metadata or {}, id=id_))
+            for id_, text, metadata, distance in zip(ids, texts, metadatas, distances)
+        ]
+        for ids, texts, metadatas, distances in zip(
+            response["ids"], response["documents"], response["metadatas"], response["distances"]
+        )
+    ]
+
+
+def _concat_pages(pages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Join Chroma-style get() results; a field missing from every page stays None."""
+    merged: Dict[str, Any] = {"ids": []}
+    for key in ("documents", "metadatas", "embeddings"):
+        values = [page.get(key) for page in pages]
+        merged[key] = None if all(value is None for value in values) else []
+    for page in pages:
+        merged["ids"].extend(page["ids"])
+        for key in ("documents", "metadatas", "embeddings"):
+            if merged[key] is not None and page.get(key) is not None:
+                merged[key].extend(list(page[key]))
+    return merged
+
+
+class ShardedVectorStore:
+    """
+    Vector store split into independent shards, one Chroma or NumPy index per
+    shard under storage_path/shards/<name>.
+
+    Chunks are routed to shards by shard_for(). Writes to different shards run
+    in parallel, so a build uses several cores and embedding requests, and
+    re-indexing files only touches their shards. Searches fan out to every shard
+    concurrently and merge the per-shard top-k by distance. The class implements
+    the same calls as NumpyVectorStore, so it is used wherever a loaded store is.
+    """
+    def __init__(self, storage_path: str, config: Dict, open_shard: Callable[[str], Any], embedding_function=None):
+        """
+        Args:
+            storage_path: Index directory holding SHARD_CONFIG_FILENAME
+            config: Settings from read_shard_config()
+            open_shard: Opens (creating if needed) the store in a shard directory
+            embedding_function: Embedder used by similarity_search()
+        """
+        self.storage_path = storage_path
+        self.embedding_function = embedding_function
+        self.strategy = config["strategy"]
+        self.num_shards = int(config.get("num_shards", DEFAULT_SHARD_COUNT))
+        self._open_shard = open_shard
+        self._shards: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._warned_shard_count = False
+
+    def _shard_dir(self) -> str:
+        return os.path.join(self.storage_path, SHARDS_DIRNAME)
+
+    def _shard(self, name: str):
+        with self._lock:
+            store = self._shards.get(name)
+            if store is None:
+                store = self._open_shard(os.path.join(self._shard_dir(), name))
+                self._shards[name] = store
+            return store
+
+    def shard_names(self) -> List[str]:
+        """Names of the shards on disk, including ones written by other processes."""
+        try:
+            return sorted(entry.name for entry in os.scandir(self._shard_dir()) if entry.is_dir())
+        except FileNotFoundError:
+            return []
+
+    def close(self) -> None:
+        """Close the NumPy shards opened so far (Chroma shards are stopped by their builder)."""
+        with self._lock:
+            shards, self._shards = list(self._shards.values()), {}
+        for store in shards:
+            if isinstance(store, NumpyVectorStore):
+                store.close()
+
+    def _all_shards(self) -> List[Tuple[str, Any]]:
+        names = self.shard_names()
+        if len(names) > MANY_SHARDS_WARNING and not self._warned_shard_count:
+            self._warned_shard_count = True
+            logger.warning(
+                f"{len(names)} shards in {self.storage_path}; every search queries all of them. "
+                f"Rebuild with the hash strategy to bound the shard count"
+            )
+        return [(name, self._shard(name)) for name in names]
+
+    def _map(self, func: Callable, items: Sequence) -> List:
+        """Apply func to every item on the shard pool, keeping the order."""
+        if len(items) <= 1:
+            return [func(item) for item in items]
+        return list(_shard_executor.map(func, items))
+
+    def _group(self, metadatas: Sequence[Dict]) -> Dict[str, List[int]]:
+        groups: Dict[str, List[int]] = {}
+        for index, metadata in enumerate(metadatas):
+            groups.setdefault(shard_for(metadata or {}, self.strategy, self.num_shards), []).append(index)
+        return groups
+
+    # Reading
+
+    def count(self) -> int:
+        return sum(_collection(store).count() for _, store in self._all_shards())
+
+    def shard_counts(self) -> Dict[str, int]:
+        """Number of chunks per shard."""
+        return {name: _collection(store).count() for name, store in self._all_shards()}
+
+    def similarity_search_by_vectors(self, embeddings: Sequence[Sequence[float]], k: int = 4,
+                                     filter: Optional[Dict] = None) -> List[List[Document]]:
+        """
+        Search every shard concurrently and merge the results.
+
+        Returns:
+            For each embedding, the k nearest chunks over all shards, best first
+        """
+        stores = [store for _, store in self._all_shards()]
+        per_shard = self._map(lambda store: _scored_search(store, embeddings, k, filter), stores)
+        results = []
+        for query_index in range(len(embeddings)):
+            candidates = (
+                (distance, shard_index, rank, doc)
+                for shard_index, shard_results in enumerate(per_shard)
+                for rank, (distance, doc) in enumerate(shard_results[query_index])
+            )
+            results.append([item[3] for item in heapq.nsmallest(k, candidates, key=lambda item: item[:3])])
+        return results
+
+    def similarity_search_by_vector(self, embedding: Sequence[float], k: int = 4,
+                                    filter: Optional[Dict] = None) -> List[Document]:
+        return self.similarity_search_by_vectors([embedding], k=k, filter=filter)[0]
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[Dict] = None) -> List[Document]:
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k=k, filter=filter)
+
+    def get(self, ids: Optional[Sequence[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: Optional[int] = None, include: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Chroma-compatible get over all shards. Pages (limit/offset) run through
+        the shards in name order.
+        """
+        include = include if include is not None else ["metadatas", "documents"]
+        shards = [store for _, store in self._all_shards()]
+        if ids is not None or limit is None:
+            ids = list(ids) if ids is not None else None
+            return _concat_pages(self._map(
+                lambda store: _collection(store).get(ids=ids, where=where, include=include), shards
+            ))
+
+        pages = []
+        skip = offset or 0
+        remaining = limit
+        for store in shards:
+            collection = _collection(store)
+            size = len(collection.get(where=where, include=[])["ids"]) if where else collection.count()
+            if skip >= size:
+                skip -= size
+                continue
+            page = collection.get(where=where, limit=remaining, offset=skip, include=include)
+            pages.append(page)
+            remaining -= len(page["ids"])
+            skip = 0
+            if remaining <= 0:
+                break
+        return _concat_pages(pages or [{"ids": [], **{key: [] for key in include}}])
+
+    def get_by_ids(self, ids: Sequence[str]) -> List[Document]:
+        page = self.get(ids=ids)
+        return [
+            Document(page_content=text, metadata=metadata or {}, id=id_)
+            for id_, text, metadata in zip(page["ids"], page["documents"], page["metadatas"])
+        ]
+
+    # Writing
+
+    def upsert(self, ids: List[str], embeddings: List[List[float]], metadatas: List[Dict], documents: List[str]) -> None:
+        """
+        Add or replace chunks with precomputed embeddings, writing shards in parallel.
+        """
+        def write(item):
+            name, indexes = item
+            collection = _collection(self._shard(name))
+            for start in range(0, len(indexes), SHARD_WRITE_BATCH_SIZE):
+                part = indexes[start:start + SHARD_WRITE_BATCH_SIZE]
+                collection.upsert(
+                    ids=[ids[i] for i in part], embeddings=[embeddings[i] for i in part],
+                    metadatas=[metadatas[i] for i in part], documents=[documents[i] for i in part]
+                )
+        self._map(write, list(self._group(metadatas).items()))
+
+    def add_documents(self, documents: List[Document], ids: List[str]) -> List[str]:
+        """
+        Embed and add or replace chunks. Each shard embeds and writes its own
+        chunks, in parallel with the other shards.
+        """
+        def write(item):
+            name, indexes = item
+            store = self._shard(name)
+            for start in range(0, len(indexes), SHARD_WRITE_BATCH_SIZE):
+                part = indexes[start:start + SHARD_WRITE_BATCH_SIZE]
+                store.add_documents([documents[i] for i in part], ids=[ids[i] for i in part])
+        self._map(write, list(self._group([doc.metadata for doc in documents]).items()))
+        return ids
+
+    def delete(self, ids: List[str]) -> None:
+        """
+        Delete chunks by ID from whichever shards hold them.
+        """
+        if not ids:
+            return
+        def delete(store):
+            # Chroma logs a warning for every ID it does not hold
+            present = _collection(store).get(ids=ids, include=[])["ids"]
+            if present:
+                store.delete(ids=list(present))
+        self._map(delete, [store for _, store in self._all_shards()])
+
+    def clear_shard(self, name: str) -> None:
+        """
+        Delete every chunk of one shard; the other shards are not touched.
+        """
+        if name not in self.shard_names():
+            return
+        store = self._shard(name)
+        while True:
+            ids = _collection(store).get(limit=SHARD_WRITE_BATCH_SIZE, include=[])["ids"]
+            if not ids:
+                break
+            store.delete(ids=list(ids))
+        logger.info(f"Cleared shard {name} in {self.storage_path}")
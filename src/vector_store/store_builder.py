@@ -1,36 +1,212 @@
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain.schema.document import Document
-from typing import List, Optional
+from typing import Dict, List, Optional
 import logging
+import os
+import threading
+import uuid
+
+from src.vector_store.embedding_cache import with_embedding_cache
+from src.vector_store.bm25_index import BM25_INDEX_FILENAME, BM25Index, get_bm25_index, hybrid_search
+from src.vector_store.query_embeddings import embed_query_cached
+from src.vector_store.numpy_store import NumpyVectorStore
+from src.vector_store.generations import index_write_version, mark_index_written, resolve_storage_path
+from src.vector_store.numpy_store import NUMPY_INDEX_FILENAME
+from src.vector_store.sharding import (
+    SHARD_STRATEGIES, ShardedVectorStore, read_shard_config, shard_for, write_shard_config
+)
 
 logger = logging.getLogger(__name__)
 
+UPSERT_BATCH_SIZE = 1000
+
+# Page size used when reading every chunk back from the collection
+READ_BATCH_SIZE = 5000
+
+# "chroma" (HNSW, persisted by Chroma) or "numpy" (memory-mapped exact search)
+VECTOR_STORE_BACKENDS = ("chroma", "numpy")
+
+# HNSW index settings accepted in hnsw_config, with their Chroma metadata keys
+# and the environment variables that provide defaults
+HNSW_PARAMETERS = {
+    "space": ("hnsw:space", "HNSW_SPACE", str),
+    "m": ("hnsw:M", "HNSW_M", int),
+    "construction_ef": ("hnsw:construction_ef", "HNSW_CONSTRUCTION_EF", int),
+    "search_ef": ("hnsw:search_ef", "HNSW_SEARCH_EF", int),
+}
+HNSW_SPACES = ("l2", "cosine", "ip")
+
+# Open builders per Chroma system (by id): a system is stopped when the last
+# builder using it is closed
+_chroma_system_users: Dict[int, int] = {}
+_chroma_system_lock = threading.Lock()
+
+def hnsw_collection_metadata(hnsw_config: Optional[Dict] = None) -> Optional[Dict]:
+    """
+    Translates HNSW settings into Chroma collection metadata.
+    
+    Settings missing from hnsw_config are read from the HNSW_SPACE, HNSW_M,
+    HNSW_CONSTRUCTION_EF and HNSW_SEARCH_EF environment variables; anything still
+    unset keeps Chroma's default.
+    
+    Args:
+        hnsw_config: Optional dict with "space" (l2, cosine or ip), "m",
+            "construction_ef" and "search_ef"
+        
+    Returns:
+        Collection metadata, or None if nothing is configured
+    """
+    hnsw_config = hnsw_config or {}
+    unknown = set(hnsw_config) - set(HNSW_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown HNSW settings {sorted(unknown)}, expected {sorted(HNSW_PARAMETERS)}")
+    
+    metadata = {}
+    for name, (key, env_var, cast) in HNSW_PARAMETERS.items():
+        value = hnsw_config.get(name)
+        if value is None and os.getenv(env_var):
+            value = os.getenv(env_var)
+        if value is not None:
+            metadata[key] = cast(value)
+    if metadata.get("hnsw:space", "l2") not in HNSW_SPACES:
+        raise ValueError(f"Unknown HNSW space '{metadata['hnsw:space']}', expected one of {HNSW_SPACES}")
+    return metadata or None
+
+def get_collection(vector_store):
+    """
+    Return the object exposing get/upsert/count for a loaded store: the Chroma
+    collection, or the NumpyVectorStore itself, which implements the same calls.
+    """
+    return getattr(vector_store, "_collection", vector_store)
+
+def batch_similarity_search(vector_store, embeddings: List[List[float]], k: int = 4,
+                            where: Optional[Dict] = None) -> List[List[Document]]:
+    """
+    Runs several vector lookups in one call and returns one result list per embedding.
+    
+    Args:
+        vector_store: Loaded Chroma or NumpyVectorStore
+        embeddings: Query embeddings
+        k: Number of results per query
+        where: Optional metadata filter shared by all queries
+        
+    Returns:
+        List of document chunk lists, one per embedding
+    """
+    if isinstance(vector_store, (NumpyVectorStore, ShardedVectorStore)):
+        return vector_store.similarity_search_by_vectors(embeddings, k=k, filter=where)
+    
+    response = vector_store._collection.query(
+        query_embeddings=embeddings, n_results=k, where=where,
+        include=["documents", "metadatas", "distances"]
+    )
+    return [
+        [
+            Document(page_content=text, metadata=metadata or {}, id=id_)
+            for id_, text, metadata in zip(ids, texts, metadatas)
+        ]
+        for ids, texts, metadatas in zip(response["ids"], response["documents"], response["metadatas"])
+    ]
+
 class VectorStoreBuilder:
     """
     Class for creating and managing vector stores from document chunks.
+    
+    backend selects the store: "chroma" (default) or "numpy", an in-process
+    exact-search index on a memory-mapped matrix for small and medium corpora.
+    It defaults to the VECTOR_STORE_BACKEND environment variable.
+    
+    If storage_path is a store root with index generations, the builder works on
+    the generation that is live when it is created.
+    
+    hnsw_config sets the Chroma HNSW index parameters (see hnsw_collection_metadata).
+    Chroma applies them when the collection is created, so changing them requires
+    a full rebuild.
+    
+    vector_encoding selects how the numpy backend stores the vectors it scans:
+    "float32" (default), "float16" or "pq" (see NumpyVectorStore). It defaults
+    to the VECTOR_ENCODING environment variable and is fixed for an index once
+    vectors are written.
+    
+    shard_strategy splits a new index into independently built shards ("source",
+    "period" or "hash", see ShardedVectorStore); num_shards sets the shard count
+    of the hash strategy. They default to the SHARD_STRATEGY and SHARD_COUNT
+    environment variables. An existing index keeps the layout it was built with.
+    
+    Every write bumps the index's write version (see mark_index_written).
+    write_version holds the version seen when the store was loaded. A Chroma
+    client keeps the HNSW index it loaded, so readers reopen the store when the
+    version changes (see registry.get_shared_store).
     """
-    def __init__(self, storage_path='_vector_db'):
-        self.storage_path = storage_path
+    def __init__(self, storage_path='_vector_db', embedder=None, backend=None, hnsw_config=None,
+                 vector_encoding=None, shard_strategy=None, num_shards=None):
+        self.storage_path = resolve_storage_path(storage_path)
         self.vector_store = None
-        self.embedder = OpenAIEmbeddings()
+        self.embedder = embedder or with_embedding_cache(OpenAIEmbeddings())
+        self.backend = backend or os.getenv("VECTOR_STORE_BACKEND", "chroma")
+        if self.backend not in VECTOR_STORE_BACKENDS:
+            raise ValueError(f"Unknown vector store backend '{self.backend}', expected one of {VECTOR_STORE_BACKENDS}")
+        self.hnsw_config = hnsw_config
+        self.collection_metadata = hnsw_collection_metadata(hnsw_config)
+        if vector_encoding and vector_encoding != "float32" and self.backend != "numpy":
+            raise ValueError(f"Vector encoding '{vector_encoding}' requires the numpy backend")
+        self.vector_encoding = vector_encoding
+        self.shard_strategy = shard_strategy or os.getenv("SHARD_STRATEGY") or None
+        if self.shard_strategy and self.shard_strategy not in SHARD_STRATEGIES:
+            raise ValueError(f"Unknown shard strategy '{self.shard_strategy}', expected one of {SHARD_STRATEGIES}")
+        self.num_shards = num_shards or os.getenv("SHARD_COUNT")
+        self.write_version = None
+        # Chroma systems behind the directories this builder opened
+        self._chroma_systems = []
+
+    def for_storage_path(self, storage_path: str) -> "VectorStoreBuilder":
+        """
+        Returns a builder for another directory (e.g. a newer index generation)
+        with the same embedder and store settings as this one.
+        """
+        return VectorStoreBuilder(
+            storage_path=storage_path,
+            embedder=self.embedder,
+            backend=self.backend,
+            hnsw_config=self.hnsw_config,
+            vector_encoding=self.vector_encoding,
+            shard_strategy=self.shard_strategy,
+            num_shards=self.num_shards
+        )
 
-    def build_and_save(self, documents: List[Document]):
+    def build_and_save(self, documents: List[Document], ids: Optional[List[str]] = None, scheduler=None):
         """
-        Creates and persists a Chroma vector store from document chunks.
+        Creates and persists a vector store from document chunks.
         
         Args:
             documents: List of document chunks to store
+            ids: Optional list of chunk IDs, one per document
+            scheduler: Optional EmbeddingScheduler that embeds batches concurrently
+                and writes each one to the store as soon as it completes
         """
         logger.info(f"Creating vector store with {len(documents)} documents in {self.storage_path}")
-        self.vector_store = Chroma.from_documents(
-            documents=documents,
-            embedding=self.embedder,
-            persist_directory=self.storage_path
-        )
+        if scheduler is not None:
+            self.load()
+            ids = ids or [str(uuid.uuid4()) for _ in documents]
+            scheduler.embed_and_store(documents, ids, self.upsert_embeddings)
+        elif self.backend == "numpy" or self.shard_strategy:
+            self.load()
+            self.upsert(documents, ids or [str(uuid.uuid4()) for _ in documents])
+        else:
+            self.vector_store = Chroma.from_documents(
+                documents=documents,
+                embedding=self.embedder,
+                ids=ids,
+                persist_directory=self.storage_path,
+                collection_metadata=self.collection_metadata
+            )
+            self._track_chroma_system(self.vector_store, self.storage_path)
         # Note: persist() is automatically called when persist_directory is provided
         # in Chroma.from_documents, so we don't need to call it explicitly
         
+        mark_index_written(self.storage_path)
+        self.rebuild_lexical_index()
         logger.info(f"Stored {len(documents)} documents in vector store at {self.storage_path}")
         return self.vector_store
     
@@ -38,19 +214,261 @@ class VectorStoreBuilder:
         """
         Loads an existing vector store from storage.
         """
-        self.vector_store = Chroma(
+        # Read before opening, so a write that lands in between is not missed
+        self.write_version = index_write_version(self.storage_path)
+        config = read_shard_config(self.storage_path)
+        if config is None and self.shard_strategy and not self._has_unsharded_index():
+            config = write_shard_config(self.storage_path, self.shard_strategy, self.num_shards)
+        if config is not None:
+            self.vector_store = ShardedVectorStore(
+                self.storage_path, config, self._open_store, embedding_function=self.embedder
+            )
+        else:
+            self.vector_store = self._open_store(self.storage_path)
+        return self.vector_store
+    
+    def _has_unsharded_index(self) -> bool:
+        return any(
+            os.path.exists(os.path.join(self.storage_path, name)) for name in ("chroma.sqlite3", NUMPY_INDEX_FILENAME)
+        )
+    
+    def _open_store(self, path: str):
+        """
+        Opens the Chroma or NumPy store in one directory (the index, or one shard of it).
+        """
+        if self.backend == "numpy":
+            return NumpyVectorStore(persist_directory=path, embedding_function=self.embedder, encoding=self.vector_encoding)
+        vector_store = Chroma(
             embedding_function=self.embedder,
-            persist_directory=self.storage_path
+            persist_directory=path,
+            collection_metadata=self.collection_metadata
         )
-        return self.vector_store
+        self._track_chroma_system(vector_store, path)
+        existing = vector_store._collection.metadata or {}
+        changed = {
+            key: value for key, value in (self.collection_metadata or {}).items() if existing.get(key) != value
+        }
+        if changed:
+            logger.warning(
+                f"Collection in {path} was created with different HNSW settings than {changed}; "
+                f"they only take effect after a full rebuild"
+            )
+        return vector_store
+    
+    def _track_chroma_system(self, vector_store, path: str):
+        try:
+            system = vector_store._client._system
+        except (AttributeError, KeyError):
+            logger.warning(f"Cannot track the Chroma system of {path}; it will not be reopened after writes")
+            return
+        self._chroma_systems.append(system)
+        with _chroma_system_lock:
+            _chroma_system_users[id(system)] = _chroma_system_users.get(id(system), 0) + 1
+    
+    def upsert(self, documents: List[Document], ids: List[str]):
+        """
+        Adds or replaces document chunks in the vector store by ID.
+        
+        Args:
+            documents: List of document chunks to store
+            ids: List of chunk IDs, one per document
+        """
+        if not documents:
+            return
+        if not self.vector_store:
+            self.load()
+        
+        # Chroma rejects oversized upserts, so write in bounded batches; a sharded
+        # store batches per shard and writes all shards at once
+        batch_size = len(documents) if isinstance(self.vector_store, ShardedVectorStore) else UPSERT_BATCH_SIZE
+        for start in range(0, len(documents), batch_size):
+            end = start + batch_size
+            self.vector_store.add_documents(documents[start:end], ids=ids[start:end])
+        mark_index_written(self.storage_path)
+        logger.info(f"Upserted {len(documents)} documents in vector store at {self.storage_path}")
     
-    def similarity_search(self, query: str, k: int = 4) -> List[Document]:
+    def upsert_embeddings(self, documents: List[Document], embeddings: List[List[float]], ids: List[str]):
+        """
+        Adds or replaces document chunks whose embeddings were computed elsewhere.
+        
+        Args:
+            documents: List of document chunks to store
+            embeddings: List of embedding vectors, one per document
+            ids: List of chunk IDs, one per document
+        """
+        if not documents:
+            return
+        if not self.vector_store:
+            self.load()
+        
+        for start in range(0, len(documents), UPSERT_BATCH_SIZE):
+            end = start + UPSERT_BATCH_SIZE
+            get_collection(self.vector_store).upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                metadatas=[doc.metadata for doc in documents[start:end]],
+                documents=[doc.page_content for doc in documents[start:end]]
+            )
+        mark_index_written(self.storage_path)
+        logger.info(f"Upserted {len(documents)} pre-embedded documents in vector store at {self.storage_path}")
+    
+    def delete(self, ids: List[str]):
+        """
+        Deletes document chunks from the vector store by ID.
+        
+        Args:
+            ids: List of chunk IDs to delete
+        """
+        if not ids:
+            return
+        if not self.vector_store:
+            self.load()
+        
+        self.vector_store.delete(ids=ids)
+        mark_index_written(self.storage_path)
+        logger.info(f"Deleted {len(ids)} documents from vector store at {self.storage_path}")
+    
+    def rebuild_shard(self, shard: str, documents: List[Document], ids: List[str]):
+        """
+        Replaces the contents of one shard of a sharded store. Other shards are
+        not read or written.
+        
+        Args:
+            shard: Shard name (see shard_for)
+            documents: Every chunk that belongs to the shard
+            ids: List of chunk IDs, one per document
+        """
+        if not self.vector_store:
+            self.load()
+        if not isinstance(self.vector_store, ShardedVectorStore):
+            raise ValueError(f"Vector store at {self.storage_path} is not sharded")
+        store = self.vector_store
+        foreign = {shard_for(doc.metadata, store.strategy, store.num_shards) for doc in documents} - {shard}
+        if foreign:
+            raise ValueError(f"Documents for shard {shard} also belong to shards {sorted(foreign)}")
+        
+        store.clear_shard(shard)
+        mark_index_written(self.storage_path)
+        self.upsert(documents, ids)
+        self.rebuild_lexical_index()
+        logger.info(f"Rebuilt shard {shard} with {len(documents)} documents in {self.storage_path}")
+    
+    def detach(self):
+        """
+        Stop sharing this builder's Chroma systems with stores opened later in
+        the process, so they load the index from disk again.
+        
+        Chroma keeps one system per directory and process, and its HNSW index
+        never reloads writes made by other processes. This builder keeps working
+        on the systems it already has.
+        """
+        if not self._chroma_systems:
+            return
+        try:
+            from chromadb.api.client import SharedSystemClient
+            systems = SharedSystemClient._identifier_to_system
+        except (ImportError, AttributeError):
+            logger.warning("Cannot reopen Chroma stores with this chromadb version; restart to see new writes")
+            return
+        for identifier, system in list(systems.items()):
+            if any(system is own for own in self._chroma_systems):
+                systems.pop(identifier, None)
+    
+    def close(self):
+        """
+        Release the loaded store; the builder cannot search or write afterwards.
+        
+        NumPy stores close their files. Chroma systems are detached and stopped
+        once no other open builder in the process uses them.
+        """
+        self.detach()
+        if isinstance(self.vector_store, (NumpyVectorStore, ShardedVectorStore)):
+            self.vector_store.close()
+        self.vector_store = None
+        systems, self._chroma_systems = self._chroma_systems, []
+        for system in systems:
+            with _chroma_system_lock:
+                users = _chroma_system_users.get(id(system), 1) - 1
+                if users:
+                    _chroma_system_users[id(system)] = users
+                else:
+                    _chroma_system_users.pop(id(system), None)
+            if not users:
+                system.stop()
+    
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Embeds a search query through the process-wide query-vector cache.
+        
+        Args:
+            query: The search query
+            
+        Returns:
+            Query embedding
+        """
+        return embed_query_cached(self.embedder, query)
+    
+    def similarity_search(self, query: str, k: int = 4, where: Optional[Dict] = None) -> List[Document]:
         """
         Performs a similarity search on the vector store.
         
         Args:
             query: The search query
             k: Number of results to return
+            where: Optional Chroma metadata filter
+            
+        Returns:
+            List of document chunks
+        """
+        return self.similarity_search_by_vector(self.embed_query(query), k=k, where=where)
+    
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 4,
+                                    where: Optional[Dict] = None) -> List[Document]:
+        """
+        Performs a similarity search with a precomputed query embedding.
+        
+        Args:
+            embedding: Query embedding
+            k: Number of results to return
+            where: Optional Chroma metadata filter
+            
+        Returns:
+            List of document chunks
+        """
+        if not self.vector_store:
+            self.load()
+        
+        return self.vector_store.similarity_search_by_vector(embedding, k=k, filter=where)
+    
+    def similarity_search_by_vectors(self, embeddings: List[List[float]], k: int = 4,
+                                     where: Optional[Dict] = None) -> List[List[Document]]:
+        """
+        Performs a batch of similarity searches with precomputed query embeddings.
+        
+        Args:
+            embeddings: Query embeddings
+            k: Number of results per query
+            where: Optional metadata filter shared by all queries
+            
+        Returns:
+            List of document chunk lists, one per embedding
+        """
+        if not self.vector_store:
+            self.load()
+        
+        return batch_similarity_search(self.vector_store, embeddings, k=k, where=where)
+    
+    def hybrid_search(self, query: str, k: int = 4, where: Optional[Dict] = None,
+                      embedding: Optional[List[float]] = None) -> List[Document]:
+        """
+        Performs a BM25 + vector search fused with reciprocal rank fusion.
+        Falls back to similarity search if the lexical index has not been built.
+        
+        Args:
+            query: The search query
+            k: Number of results to return
+            where: Optional Chroma metadata filter
+            embedding: Optional precomputed query embedding
             
         Returns:
             List of document chunks
@@ -58,5 +476,42 @@ class VectorStoreBuilder:
         if not self.vector_store:
             self.load()
         
-        results = self.vector_store.similarity_search(query, k=k)
-        return results 
\ No newline at end of file
+        if embedding is None:
+            embedding = self.embed_query(query)
+        return hybrid_search(
+            self.vector_store, get_bm25_index(self.storage_path), query, k=k, where=where, embedding=embedding
+        )
+    
+    def iter_stored_texts(self, batch_size: int = READ_BATCH_SIZE):
+        """
+        Yields (chunk ID, text) pairs for every chunk in the vector store, page by page.
+        """
+        if not self.vector_store:
+            self.load()
+        
+        offset = 0
+        while True:
+            page = get_collection(self.vector_store).get(limit=batch_size, offset=offset, include=["documents"])
+            if not page["ids"]:
+                break
+            yield from zip(page["ids"], page["documents"])
+            offset += len(page["ids"])
+    
+    def has_lexical_index(self) -> bool:
+        """
+        Returns whether a BM25 index has been saved for this vector store.
+        """
+        return os.path.exists(os.path.join(self.storage_path, BM25_INDEX_FILENAME))
+    
+    def rebuild_lexical_index(self) -> BM25Index:
+        """
+        Rebuilds the BM25 index from the current contents of the vector store and
+        saves it next to the Chroma files, so hybrid search sees every stored chunk.
+        
+        Returns:
+            The rebuilt index
+        """
+        index = BM25Index.build(self.iter_stored_texts())
+        index.save(self.storage_path)
+        logger.info(f"Rebuilt BM25 index over {len(index)} chunks in {self.storage_path}")
+        return index
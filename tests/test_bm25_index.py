@@ -0,0 +1,61 @@
+from langchain.schema.document import Document
+
+from src.vector_store.bm25_index import (
+    BM25Index, fuse_with_lexical, get_bm25_index, reciprocal_rank_fusion, tokenize
+)
+
+CHUNKS = [
+    ("assets", "Total assets were $31,346 million at the end of the year."),
+    ("deposits", "Deposits grew in the third quarter of 2024."),
+    ("liabilities", "Liabilities and deficiency for 2023 exceeded total assets of the fund."),
+]
+
+
+class _FakeStore:
+    def __init__(self, texts):
+        self.texts = texts
+
+    def get_by_ids(self, ids):
+        return [Document(page_content=self.texts[id_], id=id_) for id_ in ids if id_ in self.texts]
+
+
+def test_tokenize_keeps_figures_and_drops_stopwords():
+    assert tokenize("The total was $31,346.5 million in 2024") == ["total", "31346.5", "million", "2024"]
+
+
+def test_search_ranks_exact_figures_and_terms():
+    index = BM25Index.build(CHUNKS)
+
+    assert [id_ for id_, _ in index.search("31346")] == ["assets"]
+    assert [id_ for id_, _ in index.search("total assets", k=2)] == ["assets", "liabilities"]
+    assert index.search("unknown words") == []
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = BM25Index.build(CHUNKS)
+    index.save(str(tmp_path))
+
+    loaded = BM25Index.load(str(tmp_path))
+    assert len(loaded) == 3
+    assert loaded.search("deposits quarter") == index.search("deposits quarter")
+    assert get_bm25_index(str(tmp_path)) is get_bm25_index(str(tmp_path))
+    assert BM25Index.load(str(tmp_path / "missing")) is None
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+
+    assert [id_ for id_, _ in fused] == ["b", "a", "d", "c"]
+    assert fused[0][1] == 1 / 62 + 1 / 61
+
+
+def test_fusion_fetches_lexical_hits_and_skips_deleted_chunks():
+    index = BM25Index.build(CHUNKS)
+    texts = dict(CHUNKS)
+    del texts["assets"]
+    store = _FakeStore(texts)
+    vector_docs = [Document(page_content=texts["deposits"], id="deposits")]
+
+    results = fuse_with_lexical(store, index, "total assets", vector_docs, k=3, fetch_k=3)
+
+    assert [doc.id for doc in results] == ["deposits", "liabilities"]
@@ -0,0 +1,49 @@
+from langchain.schema.document import Document
+import pytest
+
+from src.document_processing.deduplication import MinHashDeduplicator
+from src.ingestion.manifest import IndexManifest
+
+BOILERPLATE = (
+    "The Bank's financial statements are prepared in accordance with International Financial "
+    "Reporting Standards and should be read together with the annual report."
+)
+
+
+def _chunk(text, source):
+    return Document(page_content=text, metadata={"source": source, "source_filename": source})
+
+
+def test_keeps_first_occurrence_and_lists_every_source():
+    chunks = [
+        _chunk(BOILERPLATE, "a.md"),
+        _chunk("Something else entirely about interest revenue.", "a.md"),
+        _chunk(BOILERPLATE, "b.md"),
+        _chunk(BOILERPLATE.replace("annual report", "annual report "), "c.md"),
+    ]
+
+    kept = MinHashDeduplicator(threshold=0.9).deduplicate(chunks)
+
+    assert [chunk.metadata["source"] for chunk in kept] == ["a.md", "a.md"]
+    assert kept[0].metadata["source_filenames"] == "a.md; b.md; c.md"
+    assert kept[0].metadata["duplicate_count"] == 3
+    assert kept[1].metadata["duplicate_count"] == 1
+
+
+def test_chunks_with_different_figures_are_kept():
+    chunks = [
+        _chunk(f"Total assets were $120 million at the end of the quarter. {BOILERPLATE}", "a.md"),
+        _chunk(f"Total assets were $125 million at the end of the quarter. {BOILERPLATE}", "b.md"),
+    ]
+
+    assert len(MinHashDeduplicator(threshold=0.8).deduplicate(chunks)) == 2
+
+
+def test_deduplicated_index_rejects_file_updates(tmp_path):
+    manifest = IndexManifest(str(tmp_path))
+    manifest.options["deduplicate"] = True
+    manifest.save()
+
+    with pytest.raises(ValueError, match="--dedup"):
+        IndexManifest(str(tmp_path)).load().check_file_updates()
+    IndexManifest(str(tmp_path / "plain")).load().check_file_updates()
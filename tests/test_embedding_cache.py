@@ -0,0 +1,113 @@
+from langchain_core.embeddings import Embeddings
+import asyncio
+import multiprocessing
+import threading
+import zlib
+
+import numpy as np
+import pytest
+
+from src.vector_store.embedding_cache import CachedEmbeddings, EmbeddingCache
+
+DIM = 8
+
+
+def _vector(text):
+    return np.random.default_rng(zlib.crc32(text.encode())).standard_normal(DIM).astype(np.float32).tolist()
+
+
+def _fill_cache(cache_dir, worker, rounds):
+    # Small enough that rows are evicted and reused throughout
+    cache = EmbeddingCache(cache_dir, max_bytes=20 * DIM * 4)
+    for number in range(rounds):
+        texts = [f"worker {worker} text {number} part {part}" for part in range(3)]
+        cache.put_many("model", texts, [_vector(text) for text in texts])
+        for text, vector in zip(texts, cache.get_many("model", texts)):
+            assert vector is None or np.allclose(vector, _vector(text)), text
+
+
+def test_round_trip_and_normalized_keys(tmp_path):
+    cache = EmbeddingCache(str(tmp_path))
+    cache.put_many("model", ["Total  assets\n"], [[1.0, 2.0]])
+
+    assert cache.get_many("model", ["Total assets", "other"]) == [[1.0, 2.0], None]
+    assert cache.get_many("other-model", ["Total assets"]) == [None]
+
+
+def test_evicts_least_recently_used_rows(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=2 * 2 * 4)
+    cache.put_many("model", ["a", "b"], [[1.0, 1.0], [2.0, 2.0]])
+    cache.get_many("model", ["a"])
+    cache.put_many("model", ["c"], [[3.0, 3.0]])
+
+    assert cache.get_many("model", ["a", "b", "c"]) == [[1.0, 1.0], None, [3.0, 3.0]]
+
+
+def test_failed_insert_never_leaves_entries_pointing_at_other_vectors(tmp_path, monkeypatch):
+    cache = EmbeddingCache(str(tmp_path), max_bytes=2 * 2 * 4)
+    cache.put_many("model", ["a", "b"], [[1.0, 1.0], [2.0, 2.0]])
+
+    def fail(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr("src.vector_store.embedding_cache.os.fsync", fail)
+    with pytest.raises(OSError):
+        cache.put_many("model", ["c"], [[3.0, 3.0]])
+    monkeypatch.undo()
+
+    assert cache.get_many("model", ["a", "b", "c"]) == [None, [2.0, 2.0], None]
+    cache.put_many("model", ["c"], [[3.0, 3.0]])
+    assert cache.get_many("model", ["b", "c"]) == [[2.0, 2.0], [3.0, 3.0]]
+
+
+def test_processes_sharing_a_cache_never_return_another_texts_vector(tmp_path):
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_fill_cache, args=(str(tmp_path), worker, 40)) for worker in range(3)]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join(60)
+
+    assert [process.exitcode for process in workers] == [0, 0, 0]
+    cache = EmbeddingCache(str(tmp_path))
+    texts = [f"worker {worker} text {number} part {part}"
+             for worker in range(3) for number in range(40) for part in range(3)]
+    cached = cache.get_many("model", texts)
+    assert 0 < sum(vector is not None for vector in cached) <= 20
+    for text, vector in zip(texts, cached):
+        assert vector is None or np.allclose(vector, _vector(text)), text
+
+
+class _CountingEmbedder(Embeddings):
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.extend(texts)
+        return [_vector(text) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def test_async_embeddings_use_the_cache_off_the_event_loop(tmp_path, monkeypatch):
+    embedder = _CountingEmbedder()
+    cached = CachedEmbeddings(embedder, EmbeddingCache(str(tmp_path)), model="model")
+    threads = set()
+    get_many = cached.cache.get_many
+
+    def recording_get_many(*args):
+        threads.add(threading.get_ident())
+        return get_many(*args)
+
+    monkeypatch.setattr(cached.cache, "get_many", recording_get_many)
+
+    async def embed():
+        await cached.aembed_documents(["a", "b", "a"])
+        return await cached.aembed_query("b"), await cached.aembed_query("c")
+
+    query_b, query_c = asyncio.run(embed())
+
+    assert np.allclose(query_b, _vector("b")) and np.allclose(query_c, _vector("c"))
+    assert embedder.calls == ["a", "b", "c"]
+    assert threading.get_ident() not in threads
@@ -0,0 +1,114 @@
+from langchain.schema.document import Document
+import asyncio
+
+import numpy as np
+
+from src.ingestion.embedding_scheduler import AdaptiveRateLimiter, EmbeddingScheduler, FakeEmbeddingEndpoint
+from src.vector_store.embedding_cache import EmbeddingCache
+from src.vector_store.fake_embeddings import deterministic_vector
+
+
+class _RecordingEndpoint(FakeEmbeddingEndpoint):
+    def __init__(self, **kwargs):
+        super().__init__(size=8, latency=0.01, **kwargs)
+        self.texts = []
+
+    async def embed(self, texts):
+        vectors = await super().embed(texts)
+        self.texts.extend(texts)
+        return vectors
+
+
+def _documents(count):
+    return [Document(page_content=f"chunk number {number} about total assets") for number in range(count)]
+
+
+def _run(scheduler, documents):
+    delivered = []
+
+    def on_batch(docs, vectors, ids):
+        delivered.extend(zip(ids, (doc.page_content for doc in docs), vectors))
+
+    stats = scheduler.embed_and_store(documents, [str(number) for number in range(len(documents))], on_batch)
+    return stats, delivered
+
+
+def _assert_delivered_once(documents, delivered):
+    assert sorted(id_ for id_, _, _ in delivered) == sorted(str(number) for number in range(len(documents)))
+    for id_, text, vector in delivered:
+        assert text == documents[int(id_)].page_content
+        assert np.allclose(vector, deterministic_vector(text, 8))
+
+
+def test_batches_respect_token_and_size_budgets():
+    scheduler = EmbeddingScheduler(endpoint=None, max_batch_tokens=10, max_batch_size=3)
+
+    assert scheduler.make_batches([4, 4, 4, 1, 1, 1, 1, 20, 2]) == [[0, 1], [2, 3, 4], [5, 6], [7], [8]]
+    assert scheduler.make_batches([]) == []
+
+
+def test_concurrency_is_capped_and_every_id_delivered_once():
+    endpoint = _RecordingEndpoint()
+    scheduler = EmbeddingScheduler(endpoint, max_batch_size=2, max_concurrency=3)
+    documents = _documents(30)
+
+    stats, delivered = _run(scheduler, documents)
+
+    assert 1 < endpoint.max_in_flight <= 3
+    assert (stats["batches"], stats["requests"]) == (15, 15)
+    _assert_delivered_once(documents, delivered)
+
+
+def test_rate_limited_requests_are_retried_after_retry_after(monkeypatch):
+    delays = []
+    on_rate_limited = AdaptiveRateLimiter.on_rate_limited
+
+    def recording(self, delay):
+        delays.append(delay)
+        on_rate_limited(self, delay)
+
+    monkeypatch.setattr(AdaptiveRateLimiter, "on_rate_limited", recording)
+    endpoint = _RecordingEndpoint(rate_limit_every=3, retry_after=0.01)
+    scheduler = EmbeddingScheduler(endpoint, max_batch_size=2, max_concurrency=2)
+    documents = _documents(12)
+
+    stats, delivered = _run(scheduler, documents)
+
+    assert stats["rate_limited"] == endpoint.rate_limited > 0
+    assert stats["requests"] == 6 + stats["rate_limited"]
+    assert delays == [0.01] * stats["rate_limited"]
+    _assert_delivered_once(documents, delivered)
+
+
+def test_limiter_scales_down_on_429_and_recovers():
+    async def exercise():
+        limiter = AdaptiveRateLimiter(requests_per_minute=600, tokens_per_minute=100000, min_scale=0.2)
+        limiter.on_rate_limited(0.05)
+        assert limiter.scale == 0.5
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await limiter.acquire(10)
+        assert loop.time() - start >= 0.04
+        limiter.on_rate_limited(0)
+        limiter.on_rate_limited(0)
+        assert limiter.scale == 0.2
+        limiter.on_success()
+        assert round(limiter.scale, 2) == 0.25
+
+    asyncio.run(exercise())
+
+
+def test_cached_texts_skip_the_endpoint(tmp_path):
+    endpoint = _RecordingEndpoint()
+    cache = EmbeddingCache(str(tmp_path))
+    documents = _documents(10)
+    cached_texts = [doc.page_content for doc in documents[:6]]
+    cache.put_many(endpoint.model, cached_texts, [deterministic_vector(text, 8) for text in cached_texts])
+    scheduler = EmbeddingScheduler(endpoint, max_batch_size=3, cache=cache)
+
+    stats, delivered = _run(scheduler, documents)
+
+    assert stats["cached"] == 6
+    assert sorted(endpoint.texts) == sorted(doc.page_content for doc in documents[6:])
+    _assert_delivered_once(documents, delivered)
+    assert cache.get_many(endpoint.model, [documents[9].page_content])[0] is not None
@@ -0,0 +1,83 @@
+import os
+import time
+
+from src.vector_store.generations import (
+    GENERATIONS_DIRNAME, RETIRED_MARKER_FILENAME, collect_generations, current_generation,
+    discard_generation, index_write_version, list_generations, mark_index_written,
+    new_generation, publish_generation, resolve_storage_path
+)
+
+
+def _retire_at(root, name, seconds_ago):
+    marker = os.path.join(root, GENERATIONS_DIRNAME, name, RETIRED_MARKER_FILENAME)
+    retired_at = time.time() - seconds_ago
+    os.utime(marker, (retired_at, retired_at))
+
+
+def test_store_without_generations_resolves_to_root(tmp_path):
+    root = str(tmp_path)
+
+    assert current_generation(root) is None
+    assert resolve_storage_path(root) == root
+    assert list_generations(root) == []
+
+
+def test_publish_switches_readers_and_retires_previous(tmp_path):
+    root = str(tmp_path)
+    first = new_generation(root)
+    # Not visible before it is published
+    assert resolve_storage_path(root) == root
+
+    publish_generation(root, first)
+    assert resolve_storage_path(root) == first
+
+    second = new_generation(root)
+    publish_generation(root, second)
+    assert resolve_storage_path(root) == second
+    assert os.path.exists(os.path.join(first, RETIRED_MARKER_FILENAME))
+    assert not os.path.exists(os.path.join(second, RETIRED_MARKER_FILENAME))
+    assert not [name for name in os.listdir(root) if name.endswith(".tmp")]
+
+
+def test_collect_respects_grace_period_and_keep(tmp_path):
+    root = str(tmp_path)
+    paths = [new_generation(root) for _ in range(4)]
+    for path in paths:
+        publish_generation(root, path)
+    names = [os.path.basename(path) for path in paths]
+    _retire_at(root, names[0], 600)
+    _retire_at(root, names[1], 500)
+    _retire_at(root, names[2], 10)
+
+    # The most recently retired generation is kept; older ones go once past the grace period
+    assert collect_generations(root, grace_seconds=550, keep=1) == [names[0]]
+    assert collect_generations(root, grace_seconds=300, keep=1) == [names[1]]
+    assert set(list_generations(root)) == {names[2], names[3]}
+
+    assert collect_generations(root, grace_seconds=0, keep=0) == [names[2]]
+    assert list_generations(root) == [names[3]]
+    assert resolve_storage_path(root) == paths[3]
+
+
+def test_collect_keeps_unpublished_generations(tmp_path):
+    root = str(tmp_path)
+    live = new_generation(root)
+    publish_generation(root, live)
+    building = new_generation(root)
+
+    assert collect_generations(root, grace_seconds=0, keep=0) == []
+    assert set(list_generations(root)) == {os.path.basename(live), os.path.basename(building)}
+
+    discard_generation(building)
+    assert list_generations(root) == [os.path.basename(live)]
+
+
+def test_write_version_changes_on_every_write(tmp_path):
+    path = str(tmp_path)
+    assert index_write_version(path) == ""
+
+    first = mark_index_written(path)
+    assert index_write_version(path) == first
+    second = mark_index_written(path)
+    assert second != first
+    assert index_write_version(path) == second
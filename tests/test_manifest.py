@@ -0,0 +1,24 @@
+import pytest
+
+from src.ingestion.manifest import IndexManifest
+
+
+def test_chunking_options_are_recorded_and_enforced(tmp_path):
+    manifest = IndexManifest(str(tmp_path))
+    manifest.check_chunking({"chunker": "token", "max_chunk_tokens": 128})
+    manifest.save()
+
+    reloaded = IndexManifest(str(tmp_path)).load()
+    assert reloaded.options["chunking"] == {"chunker": "token", "max_chunk_tokens": 128}
+    assert reloaded.check_chunking({"chunker": "token", "max_chunk_tokens": 128})["chunker"] == "token"
+    with pytest.raises(ValueError):
+        reloaded.check_chunking({"chunker": "recursive", "max_chunk_tokens": 128})
+    with pytest.raises(ValueError):
+        reloaded.check_chunking({"chunker": "token", "max_chunk_tokens": 256})
+
+
+def test_recursive_chunker_ignores_token_limit(tmp_path):
+    manifest = IndexManifest(str(tmp_path))
+    manifest.check_chunking({})
+
+    assert manifest.check_chunking({"chunker": "recursive", "max_chunk_tokens": 64}) == {"chunker": "recursive"}
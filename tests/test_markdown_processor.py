@@ -0,0 +1,28 @@
+from src.document_processing.markdown_processor import MarkdownProcessor
+
+
+def _write_corpus(folder):
+    # Created out of name order, so filesystem order differs from sorted order
+    for name in ["c.md", "a.md", "sub/b.md", "d.md"]:
+        path = folder / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"# {name}\n\n## Part\n\nText of {name}. " * 3, encoding="utf-8")
+
+
+def _load_and_split(folder, workers):
+    processor = MarkdownProcessor(folder_path=str(folder), workers=workers)
+    processor.load_markdown_files()
+    processor.extract_chunks()
+    return processor
+
+
+def test_serial_and_parallel_modes_produce_the_same_order(tmp_path):
+    _write_corpus(tmp_path)
+
+    serial = _load_and_split(tmp_path, workers=1)
+    parallel = _load_and_split(tmp_path, workers=2)
+
+    sources = [doc.metadata["source"] for doc in serial.loaded_docs]
+    assert sources == sorted(sources)
+    assert sources == [doc.metadata["source"] for doc in parallel.loaded_docs]
+    assert [chunk.page_content for chunk in serial.chunks] == [chunk.page_content for chunk in parallel.chunks]
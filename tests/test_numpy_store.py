@@ -0,0 +1,204 @@
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.vector_store import numpy_store
+from src.vector_store.numpy_store import NumpyVectorStore
+
+DIM = 8
+
+
+def _vectors(count, seed=0):
+    return np.random.default_rng(seed).standard_normal((count, DIM)).astype(np.float32)
+
+
+def _fill(store, count, seed=0):
+    vectors = _vectors(count, seed)
+    ids = [f"chunk-{i}" for i in range(count)]
+    store.upsert(
+        ids=ids,
+        embeddings=vectors.tolist(),
+        metadatas=[{"source": f"file-{i % 3}.md", "page": i} for i in range(count)],
+        documents=[f"text {i}" for i in range(count)]
+    )
+    return ids, vectors
+
+
+def _unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def _exact_top_k(vectors, query, k):
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return [f"chunk-{i}" for i in np.argsort(-scores)[:k]]
+
+
+def test_search_matches_brute_force(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    _, vectors = _fill(store, 50)
+    queries = _vectors(5, seed=1)
+
+    results = store.search_rows(queries.tolist(), k=5)
+
+    assert [[id_ for id_, _ in hits] for hits in results] == [
+        _exact_top_k(vectors, query, 5) for query in queries
+    ]
+
+
+def test_where_filter_and_paged_get(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    _fill(store, 12)
+
+    hits = store.search_rows(_vectors(1, seed=1).tolist(), k=20, where={"source": "file-1.md"})[0]
+    assert {id_ for id_, _ in hits} == {f"chunk-{i}" for i in range(1, 12, 3)}
+
+    pages = [store.get(where={"source": "file-0.md"}, limit=2, offset=offset)["ids"] for offset in (0, 2, 4)]
+    assert pages == [["chunk-0", "chunk-3"], ["chunk-6", "chunk-9"], []]
+    assert store.count() == 12
+
+
+def test_upsert_writes_replacements_to_fresh_rows(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    _fill(store, 8)
+    before = store._current_snapshot()
+    old_row = before.row_ids.index("chunk-2")
+    old_vector = before.matrix[old_row].copy()
+
+    store.upsert(ids=["chunk-2"], embeddings=[[1.0] * DIM], metadatas=[{"page": 2}], documents=["new text"])
+
+    # A reader still holding the old generation sees the old vector
+    assert np.array_equal(before.matrix[old_row], old_vector)
+    result = store.get(ids=["chunk-2"], include=["documents", "embeddings"])
+    assert result["documents"] == ["new text"]
+    assert np.allclose(result["embeddings"][0], _unit([1.0] * DIM))
+    assert store.count() == 8
+
+
+def test_failed_upsert_leaves_previous_version(tmp_path, monkeypatch):
+    store = NumpyVectorStore(str(tmp_path))
+    _, vectors = _fill(store, 4)
+
+    def fail(**values):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "_set_meta", fail)
+    with pytest.raises(OSError):
+        store.upsert(ids=["chunk-1"], embeddings=[[1.0] * DIM], metadatas=[{}], documents=["new text"])
+    monkeypatch.undo()
+
+    result = store.get(ids=["chunk-1"], include=["documents", "embeddings"])
+    assert result["documents"] == ["text 1"]
+    assert np.allclose(result["embeddings"][0], _unit(vectors[1]))
+
+
+def test_reads_do_not_see_uncommitted_writes(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    _fill(store, 4)
+    inside = threading.Event()
+    release = threading.Event()
+    original = store._set_meta
+
+    def slow_set_meta(**values):
+        original(**values)
+        inside.set()
+        release.wait(5)
+
+    store._set_meta = slow_set_meta
+    writer = threading.Thread(target=store.delete, args=(["chunk-0", "chunk-1"],))
+    writer.start()
+    try:
+        assert inside.wait(5)
+        assert store.count() == 4
+        assert store.get(ids=["chunk-0"])["ids"] == ["chunk-0"]
+    finally:
+        release.set()
+        writer.join()
+    assert store.count() == 2
+
+
+def test_delete_compacts_dead_rows(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    ids, vectors = _fill(store, 8)
+
+    store.delete(ids[:4])
+
+    meta = store._meta()
+    assert int(meta["next_row"]) == 4
+    assert store.get(include=["embeddings"])["ids"] == ids[4:]
+    hits = store.search_rows([vectors[5].tolist()], k=1)[0]
+    assert hits[0][0] == "chunk-5"
+    assert hits[0][1] == pytest.approx(1.0, abs=1e-5)
+
+
+def test_repeated_replacements_are_compacted(tmp_path):
+    store = NumpyVectorStore(str(tmp_path))
+    _fill(store, 8)
+
+    for round_ in range(5):
+        store.upsert(ids=["chunk-0", "chunk-1"], embeddings=_vectors(2, seed=round_ + 10).tolist(),
+                     metadatas=[{}, {}], documents=["a", "b"])
+
+    assert store.count() == 8
+    assert int(store._meta()["next_row"]) < 8 / (1 - 0.25) + 2
+
+
+def test_pq_codebook_is_retrained_as_the_index_grows(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store, "PQ_TRAIN_MIN_ROWS", 300)
+    store = NumpyVectorStore(str(tmp_path), encoding="pq")
+    _fill(store, 299)
+    assert "codebook_file" not in store._meta()
+
+    store.upsert(ids=["extra-0"], embeddings=_vectors(1, seed=5).tolist(), metadatas=[{}], documents=["x"])
+    first = store._meta()
+    assert first["trained_rows"] == "300"
+
+    store.upsert(ids=[f"more-{i}" for i in range(200)], embeddings=_vectors(200, seed=6).tolist(),
+                 metadatas=[{}] * 200, documents=["y"] * 200)
+    assert store._meta()["codebook_file"] == first["codebook_file"]
+
+    vectors = _vectors(100, seed=7)
+    store.upsert(ids=[f"last-{i}" for i in range(100)], embeddings=vectors.tolist(),
+                 metadatas=[{}] * 100, documents=["z"] * 100)
+    second = store._meta()
+    assert second["codebook_file"] != first["codebook_file"]
+    assert second["trained_rows"] == "600"
+    assert not os.path.exists(os.path.join(str(tmp_path), first["codebook_file"]))
+    assert store.search_rows([vectors[3].tolist()], k=1)[0][0][0] == "last-3"
+
+
+def test_training_does_not_block_searches_or_writes(tmp_path, monkeypatch):
+    store = NumpyVectorStore(str(tmp_path), encoding="pq")
+    _fill(store, 300)
+    training = threading.Event()
+    release = threading.Event()
+    train = numpy_store.train_pq_codebook
+
+    def slow_train(vectors):
+        training.set()
+        release.wait(5)
+        return train(vectors)
+
+    monkeypatch.setattr(numpy_store, "train_pq_codebook", slow_train)
+    trainer = threading.Thread(target=store.train_quantizer)
+    trainer.start()
+    try:
+        assert training.wait(5)
+        started = time.perf_counter()
+        vectors = _vectors(2, seed=8)
+        store.upsert(ids=["during-0", "during-1"], embeddings=vectors.tolist(), metadatas=[{}, {}],
+                     documents=["a", "b"])
+        assert store.search_rows([vectors[0].tolist()], k=1)[0][0][0] == "during-0"
+        assert time.perf_counter() - started < 2
+    finally:
+        release.set()
+        trainer.join()
+
+    # Rows written during training are encoded with the new codebook
+    assert "codebook_file" in store._meta()
+    assert store._current_snapshot().codes.shape[0] == 302
+    assert store.search_rows([vectors[1].tolist()], k=1)[0][0][0] == "during-1"
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from src.vector_store.quantization import (
+    default_pq_subvectors, pq_encode, pq_lookup_table, pq_scores, train_pq_codebook
+)
+
+
+def _unit_vectors(rows, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((rows, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_default_subvectors_divide_the_dimension():
+    assert default_pq_subvectors(1536) == 96
+    for dim in (7, 64, 100, 384):
+        subvectors = default_pq_subvectors(dim)
+        assert dim % subvectors == 0 and subvectors <= max(1, dim // 16)
+
+
+def test_encode_shapes_and_dtype():
+    vectors = _unit_vectors(600, 32)
+    codebook = train_pq_codebook(vectors, subvectors=4, iterations=5)
+
+    codes = pq_encode(vectors, codebook)
+
+    assert codebook.shape == (4, 256, 8)
+    assert codes.shape == (600, 4) and codes.dtype == np.uint8
+
+
+def test_scores_match_inner_product_with_reconstruction():
+    vectors = _unit_vectors(500, 16)
+    codebook = train_pq_codebook(vectors, subvectors=4, iterations=5)
+    codes = pq_encode(vectors, codebook)
+    query = _unit_vectors(1, 16, seed=1)[0]
+
+    scores = pq_scores(codes, pq_lookup_table(query, codebook), codebook.shape[1])
+
+    reconstructed = np.concatenate([codebook[index][codes[:, index]] for index in range(4)], axis=1)
+    np.testing.assert_allclose(scores, reconstructed @ query, rtol=1e-4, atol=1e-5)
+    # The approximation ranks the true nearest neighbour near the top
+    assert int(np.argmax(vectors @ query)) in np.argsort(-scores)[:20]
+
+
+def test_rejects_subvectors_that_do_not_divide_dim():
+    with pytest.raises(ValueError):
+        train_pq_codebook(_unit_vectors(300, 10), subvectors=3)
@@ -0,0 +1,62 @@
+from langchain.schema.document import Document
+
+from src.tools.query_filters import parse_quarters, parse_query_filters, parse_sections, parse_years
+from src.vector_store.section_store import SectionStore
+
+
+def _section(source, *titles):
+    metadata = {f"Level {level}": title for level, title in enumerate(titles, start=1)}
+    headers = " > ".join(titles)
+    return Document(page_content=f"# {headers}", metadata={
+        **metadata, "parent_id": f"{source}:{headers}", "source": source, "header_path": headers
+    })
+
+
+def test_years_and_ranges():
+    assert parse_years("total assets in 2023") == {"year": 2023}
+    assert parse_years("2024 versus 2022") == {"year": {"$in": [2022, 2024]}}
+    assert parse_years("from 2024 to 2021") == {"$and": [{"year": {"$gte": 2021}}, {"year": {"$lte": 2024}}]}
+    assert parse_years("12345 shares") == {}
+
+
+def test_quarters():
+    assert parse_quarters("deposits in Q3") == {"quarter": 3}
+    assert parse_quarters("first and second quarters") == {"quarter": {"$in": [1, 2]}}
+    assert parse_quarters("quarterly results") == {}
+
+
+def test_sections_prefer_the_longest_title():
+    where = parse_sections("show the Consolidated Balance Sheets", ["Balance Sheets", "Consolidated Balance Sheets"])
+
+    assert where == {"$or": [{f"Level {level}": "Consolidated Balance Sheets"} for level in range(1, 5)]}
+
+
+def test_query_filters_combine_clauses():
+    assert parse_query_filters("what happened") is None
+    assert parse_query_filters("Q2 2024 balance sheets", ["Balance Sheets"]) == {"$and": [
+        {"year": 2024},
+        {"quarter": 2},
+        {"$or": [{f"Level {level}": "Balance Sheets"} for level in range(1, 5)]},
+    ]}
+
+
+def test_section_store_titles_follow_updates(tmp_path):
+    store = SectionStore(str(tmp_path))
+    store.replace_documents([_section("a.md", "Report", "Balance Sheets"), _section("b.md", "Notes")])
+    assert store.titles() == {"Report", "Balance Sheets", "Notes"}
+
+    store.replace_documents([_section("a.md", "Report", "Cash Flows")])
+    assert store.titles() == {"Report", "Cash Flows", "Notes"}
+
+    other_process = SectionStore(str(tmp_path))
+    other_process.remove_sources(["b.md"])
+    assert store.titles() == {"Report", "Cash Flows"}
+
+
+def test_section_store_fills_in_titles_of_older_stores(tmp_path):
+    store = SectionStore(str(tmp_path))
+    store.replace_documents([_section("a.md", "Report", "Balance Sheets")])
+    store._conn.execute("DELETE FROM section_titles")
+    store._conn.execute("PRAGMA user_version = 0")
+
+    assert SectionStore(str(tmp_path)).titles() == {"Report", "Balance Sheets"}
@@ -0,0 +1,95 @@
+from langchain.schema.document import Document
+import multiprocessing
+
+import pytest
+
+from src.vector_store import registry
+from src.vector_store.fake_embeddings import FakeEmbeddings
+from src.vector_store.generations import new_generation, publish_generation
+from src.vector_store.store_builder import VectorStoreBuilder
+
+
+def _write_in_other_process(storage_path, text):
+    VectorStoreBuilder(storage_path, embedder=FakeEmbeddings(size=16), backend="chroma").upsert(
+        [Document(page_content=text)], [text]
+    )
+
+
+@pytest.fixture
+def fake_embedder(monkeypatch):
+    monkeypatch.setitem(registry._embedders, "", FakeEmbeddings(size=16))
+
+
+def test_chroma_readers_see_writes_from_other_processes(tmp_path, fake_embedder):
+    storage_path = str(tmp_path)
+    builder = VectorStoreBuilder(storage_path, embedder=FakeEmbeddings(size=16), backend="chroma")
+    builder.build_and_save([Document(page_content="total assets")], ["total assets"])
+    builder.close()
+    store = registry.get_shared_store(storage_path, backend="chroma")
+    assert registry.get_shared_store(storage_path, backend="chroma") is store
+
+    with registry.lease_shared_store(storage_path, backend="chroma") as leased:
+        assert leased is store
+        process = multiprocessing.get_context("spawn").Process(
+            target=_write_in_other_process, args=(storage_path, "deposits in the third quarter")
+        )
+        process.start()
+        process.join(60)
+        assert process.exitcode == 0
+
+        reopened = registry.get_shared_store(storage_path, backend="chroma")
+        assert reopened is not store
+        found = reopened.vector_store.similarity_search("deposits in the third quarter", k=1)
+        assert [doc.page_content for doc in found] == ["deposits in the third quarter"]
+        # Searches still holding the previous handle can finish on it
+        assert len(store.vector_store.similarity_search("total assets", k=1)) == 1
+        systems = list(store._chroma_systems)
+
+    # Closed with the last lease, and its Chroma system stopped
+    assert store.vector_store is None
+    assert all(not system._running for system in systems)
+    assert len(reopened.vector_store.similarity_search("total assets", k=1)) == 1
+
+
+def _build_generation(root, texts):
+    path = new_generation(root)
+    VectorStoreBuilder(path, embedder=FakeEmbeddings(size=16), backend="numpy").build_and_save(
+        [Document(page_content=text) for text in texts], texts
+    )
+    publish_generation(root, path)
+    return path
+
+
+def test_replaced_generation_is_closed_after_its_searches(tmp_path, fake_embedder):
+    root = str(tmp_path)
+    first = _build_generation(root, ["total assets"])
+    store = registry.get_shared_store(root, backend="numpy")
+    assert store.storage_path == first
+
+    with registry.lease_shared_store(root, backend="numpy") as leased:
+        second = _build_generation(root, ["total assets", "net income"])
+        with registry.lease_shared_store(root, backend="numpy") as current:
+            assert current.storage_path == second
+        # Still open for the search that holds it
+        assert leased.vector_store.count() == 1
+    assert store.vector_store is None
+
+    # Without a lease the replaced store is closed right away
+    _build_generation(root, ["net income"])
+    replaced = current
+    assert registry.get_shared_store(root, backend="numpy") is not replaced
+    assert replaced.vector_store is None
+
+
+def test_closing_keeps_chroma_systems_of_other_builders(tmp_path, fake_embedder):
+    storage_path = str(tmp_path)
+    builder = VectorStoreBuilder(storage_path, embedder=FakeEmbeddings(size=16), backend="chroma")
+    builder.build_and_save([Document(page_content="total assets")], ["total assets"])
+    store = registry.get_shared_store(storage_path, backend="chroma")
+    assert store._chroma_systems[0] is builder._chroma_systems[0]
+
+    registry.release_shared_store(storage_path, backend="chroma")
+
+    assert store.vector_store is None
+    assert len(builder.vector_store.similarity_search("total assets", k=1)) == 1
+    assert registry.get_shared_store(storage_path, backend="chroma") is not store
@@ -0,0 +1,46 @@
+from src.utils.semantic_cache import SemanticQueryCache
+
+
+def test_similar_query_in_the_same_scope_hits():
+    cache = SemanticQueryCache(threshold=0.95)
+    cache.put([1.0, 0.0, 0.0], "liabilities 2023", scope=("store", 4))
+
+    assert cache.get([0.99, 0.05, 0.0], scope=("store", 4)) == "liabilities 2023"
+    assert cache.get([0.99, 0.05, 0.0], scope=("store", 8)) is None
+    assert cache.get([0.0, 1.0, 0.0], scope=("store", 4)) is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 2)
+    assert stats["hit_similarity"]["p50"] > 0.95
+    assert stats["miss_similarity"]["p50"] == 0.0
+
+
+def test_same_query_replaces_its_entry():
+    cache = SemanticQueryCache(max_entries=2)
+    cache.put([1.0, 0.0], "old")
+    cache.put([2.0, 0.0], "new")
+
+    assert cache.get([1.0, 0.0]) == "new"
+    assert cache.stats()["size"] == 1
+
+
+def test_evicts_least_recently_used_entry():
+    cache = SemanticQueryCache(max_entries=2, threshold=0.99)
+    cache.put([1.0, 0.0, 0.0], "a")
+    cache.put([0.0, 1.0, 0.0], "b")
+    cache.get([1.0, 0.0, 0.0])
+    cache.put([0.0, 0.0, 1.0], "c")
+
+    assert cache.get([0.0, 1.0, 0.0]) is None
+    assert (cache.get([1.0, 0.0, 0.0]), cache.get([0.0, 0.0, 1.0])) == ("a", "c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_embedding_dimension_change_starts_over():
+    cache = SemanticQueryCache()
+    cache.put([1.0, 0.0], "two dimensions")
+    cache.put([1.0, 0.0, 0.0], "three dimensions")
+
+    assert cache.get([1.0, 0.0]) is None
+    assert cache.get([1.0, 0.0, 0.0]) == "three dimensions"
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,112 @@
+from langchain.schema.document import Document
+import os
+
+import pytest
+
+from src.vector_store.fake_embeddings import FakeEmbeddings
+from src.vector_store.sharding import ShardedVectorStore, shard_for
+from src.vector_store.store_builder import VectorStoreBuilder
+
+DIM = 16
+SOURCES = [f"docs/report-{number}.md" for number in range(5)]
+
+
+def _documents():
+    docs, ids = [], []
+    for source in SOURCES:
+        for part in range(4):
+            text = f"{source} part {part}"
+            docs.append(Document(page_content=text, metadata={"source": source, "part": part}))
+            ids.append(text)
+    return docs, ids
+
+
+def _build(path, backend="numpy", **shards):
+    builder = VectorStoreBuilder(str(path), embedder=FakeEmbeddings(size=DIM), backend=backend, **shards)
+    builder.build_and_save(*_documents())
+    return builder
+
+
+def test_shard_for_routes_files_consistently():
+    metadata = {"source": "docs/Annual Report 2023.md", "year": 2023}
+
+    assert shard_for(metadata, "source") == shard_for({"source": "docs/Annual Report 2023.md"}, "source")
+    assert shard_for(metadata, "source").startswith("Annual-Report-2023-")
+    assert shard_for(metadata, "source") != shard_for({"source": "other/Annual Report 2023.md"}, "source")
+    assert shard_for(metadata, "period") == "year-2023"
+    assert shard_for({"source": "notes.md"}, "period") == "undated"
+    assert {shard_for({"source": source}, "hash", 3) for source in SOURCES} <= {"hash-000", "hash-001", "hash-002"}
+    with pytest.raises(ValueError):
+        shard_for(metadata, "size")
+
+
+def test_sharded_search_matches_unsharded(tmp_path):
+    sharded = _build(tmp_path / "sharded", shard_strategy="hash", num_shards=3)
+    single = _build(tmp_path / "single")
+    assert isinstance(sharded.vector_store, ShardedVectorStore)
+    assert len(sharded.vector_store.shard_names()) > 1
+
+    embedder = FakeEmbeddings(size=DIM)
+    queries = [embedder.embed_query(f"question {number}") for number in range(5)]
+    for k in (1, 5, 30):
+        assert [[doc.id for doc in docs] for docs in sharded.vector_store.similarity_search_by_vectors(queries, k=k)] == [
+            [doc.id for doc in docs] for docs in single.vector_store.similarity_search_by_vectors(queries, k=k)
+        ]
+    where = {"source": SOURCES[2]}
+    assert [doc.id for doc in sharded.vector_store.similarity_search_by_vector(queries[0], k=10, filter=where)] == [
+        doc.id for doc in single.vector_store.similarity_search_by_vector(queries[0], k=10, filter=where)
+    ]
+
+
+def test_chroma_shards_smaller_than_k_are_merged(tmp_path):
+    builder = _build(tmp_path, backend="chroma", shard_strategy="source")
+    store = builder.vector_store
+
+    results = store.similarity_search_by_vector(FakeEmbeddings(size=DIM).embed_query("question"), k=10)
+
+    assert len(results) == 10
+    assert len({doc.id for doc in results}) == 10
+    assert store.similarity_search_by_vector([0.1] * DIM, k=3, filter={"source": "missing.md"}) == []
+    builder.close()
+
+
+def test_paged_get_visits_every_chunk_once(tmp_path):
+    store = _build(tmp_path, shard_strategy="source").vector_store
+    all_ids = [id_ for _, id_ in zip(*_documents())]
+
+    pages = [store.get(limit=3, offset=offset, include=["documents"]) for offset in range(0, 24, 3)]
+
+    paged = [id_ for page in pages for id_ in page["ids"]]
+    assert sorted(paged) == sorted(all_ids)
+    assert all(page["documents"] == page["ids"] for page in pages)
+    assert pages[-1]["ids"] == []
+
+    where = {"part": 1}
+    filtered = [id_ for offset in range(0, 6, 2) for id_ in store.get(where=where, limit=2, offset=offset)["ids"]]
+    assert sorted(filtered) == sorted(f"{source} part 1" for source in SOURCES)
+    assert sorted(store.get(ids=[all_ids[0], all_ids[-1]])["ids"]) == sorted([all_ids[0], all_ids[-1]])
+
+
+def test_rebuild_shard_replaces_only_that_shard(tmp_path):
+    builder = _build(tmp_path, shard_strategy="source")
+    store = builder.vector_store
+    shard = shard_for({"source": SOURCES[0]}, "source")
+    before = store.shard_counts()
+
+    new_docs = [Document(page_content="rewritten", metadata={"source": SOURCES[0]})]
+    builder.rebuild_shard(shard, new_docs, ["rewritten"])
+
+    after = store.shard_counts()
+    assert after[shard] == 1
+    assert {name: count for name, count in after.items() if name != shard} == {
+        name: count for name, count in before.items() if name != shard
+    }
+    assert store.get(where={"source": SOURCES[0]})["ids"] == ["rewritten"]
+
+    with pytest.raises(ValueError):
+        builder.rebuild_shard(shard, [Document(page_content="other", metadata={"source": SOURCES[1]})], ["other"])
+
+    store.clear_shard(shard)
+    assert store.shard_counts()[shard] == 0
+    assert store.count() == 16
+    assert os.path.isdir(os.path.join(str(tmp_path), "shards", shard))
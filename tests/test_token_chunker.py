@@ -0,0 +1,29 @@
+from langchain.schema.document import Document
+
+from src.document_processing.token_chunker import TokenAwareMarkdownChunker
+from src.utils.tokens import count_tokens
+
+
+def test_oversized_sentence_keeps_text_order():
+    chunker = TokenAwareMarkdownChunker(max_tokens=20)
+    long_sentence = " ".join(f"word{i}" for i in range(60)) + "."
+    text = f"First short sentence. {long_sentence} Last short sentence."
+
+    parts = chunker._split_oversized("paragraph", text, count_tokens(text))
+
+    assert " ".join(part for part, _ in parts).split() == text.split()
+    assert all(tokens <= 20 for _, tokens in parts)
+
+
+def test_split_document_tracks_headers_and_budget():
+    chunker = TokenAwareMarkdownChunker(max_tokens=30)
+    body = " ".join(f"Sentence number {i} is here." for i in range(20))
+    doc = Document(page_content=f"# Title\n\n## Part\n\n{body}\n\n| a | b |\n| - | - |\n", metadata={"source": "a.md"})
+
+    chunks, sections = chunker.split_document(doc)
+
+    assert sections == 2
+    assert all(chunk.metadata["Level 1"] == "Title" for chunk in chunks)
+    assert all(chunk.metadata["source_filename"] == "a.md" for chunk in chunks)
+    assert all(count_tokens(chunk.page_content) <= 30 for chunk in chunks)
+    assert "| a | b |" in chunks[-1].page_content
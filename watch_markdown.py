@@ -0,0 +1,59 @@
+from src.ingestion.incremental import IncrementalIndexer
+from src.ingestion.watcher import MarkdownWatcher
+import argparse
+import logging
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables from .env file
+load_dotenv()
+
+# Check for OpenAI API key
+if not os.getenv("OPENAI_API_KEY"):
+    raise ValueError("OPENAI_API_KEY environment variable is not set. Please add it to your .env file.")
+
+# Get vector database path from environment variables
+vector_db_path = os.getenv("VECTOR_DB_PATH", "_vector_db")
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Watch the markdown folder and keep the vector store up to date"""
+    parser = argparse.ArgumentParser(description="Auto-ingest changed markdown files into the vector store")
+    parser.add_argument("--folder", default="./markdown_files",
+                      help="Folder of markdown files to watch")
+    parser.add_argument("--debounce", type=float, default=2.0,
+                      help="Seconds without further events before a changed file is re-indexed")
+    parser.add_argument("--no-initial-sync", action="store_true",
+                      help="Skip the catch-up sync of changes made while the watcher was not running")
+    parser.add_argument("--lexical-refresh", type=float, default=30.0,
+                      help="Minimum seconds between BM25 index rebuilds after changes")
+    args = parser.parse_args()
+    
+    if not os.path.isdir(args.folder):
+        logger.error(f"Folder not found: {args.folder}")
+        sys.exit(1)
+    
+    try:
+        indexer = IncrementalIndexer(
+            folder_path=args.folder, storage_path=vector_db_path, lexical_refresh_seconds=args.lexical_refresh
+        )
+        watcher = MarkdownWatcher(
+            indexer,
+            debounce_seconds=args.debounce,
+            initial_sync=not args.no_initial_sync
+        )
+        watcher.run_forever()
+    except Exception as e:
+        logger.error(f"Unexpected error in watcher: {str(e)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()